@@ -0,0 +1,9 @@
+import os
+import sys
+
+# torcp2 modules import each other flat (import torinfo, from ratelimit import ...).
+# The app imports them the same way, so that each is loaded once: one
+# TorrentParser cache, one category_stats, one TMDbThrottled class.
+_TORCP2 = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2'))
+if _TORCP2 not in sys.path:
+    sys.path.insert(0, _TORCP2)
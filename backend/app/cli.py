@@ -0,0 +1,114 @@
+"""
+Resolve torrent names in bulk, without going through the HTTP API.
+
+    python -m app.cli [names.txt] [--concurrency 8] [--offset 0]
+
+Reads one torrent name per line from the file (or stdin) and writes one
+JSON line per name to stdout, in input order:
+
+    {"line": 0, "name": "...", "media_id": 12, "tmdb_id": 603, "tmdb_cat": "movie",
+     "stage": "blind_search", "elapsed_ms": 412.3}
+
+`stage` is the step of crud.resolve_media_async() that decided, `error`
+is set instead when a name fails. Names are read lazily and at most
+`concurrency` are in flight, so memory stays flat on any input size. To
+resume an interrupted run, pass the `line` after the last one written as
+--offset.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from itertools import islice
+from typing import Callable, Iterable, TextIO
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app import crud
+from torinfo import TorrentParser
+
+
+async def resolve_name(line: int, name: str, searcher, session_factory: Callable[[], Session]) -> dict:
+    start = time.perf_counter()
+    result = {"line": line, "name": name, "media_id": None, "tmdb_id": None, "tmdb_cat": None, "stage": None}
+    try:
+        torinfo = TorrentParser.parse(name)
+        if not torinfo.media_title:
+            result["error"] = "Could not parse a valid media title from torname"
+        else:
+            # One session per name, so that names in flight don't share a transaction
+            db = session_factory()
+            try:
+                media, result["stage"] = await crud.resolve_media_async(db, torinfo, searcher)
+                if media:
+                    result.update(media_id=media.id, tmdb_id=media.tmdb_id, tmdb_cat=media.tmdb_cat)
+            finally:
+                db.close()
+    except Exception as e:
+        logger.error(f"Failed to resolve {name}: {e}")
+        result["error"] = str(e) or type(e).__name__
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+async def resolve_lines(lines: Iterable[str], searcher, session_factory: Callable[[], Session],
+                        out: TextIO, concurrency: int = 8, offset: int = 0) -> int:
+    """Resolves every name in `lines` from `offset` on, writing JSON lines to `out`. Returns the count."""
+    pending = deque()
+    written = 0
+
+    def flush(result):
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    try:
+        for line, raw in enumerate(islice(lines, offset, None), start=offset):
+            name = raw.strip()
+            if not name:
+                continue
+            pending.append(asyncio.create_task(resolve_name(line, name, searcher, session_factory)))
+            if len(pending) >= concurrency:
+                flush(await pending.popleft())
+                written += 1
+        while pending:
+            flush(await pending.popleft())
+            written += 1
+    finally:
+        for task in pending:
+            task.cancel()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Resolve torrent names to media, as JSON lines.")
+    parser.add_argument("input", nargs="?", type=argparse.FileType("r", encoding="utf-8"), default=sys.stdin,
+                        help="file with one torrent name per line (default: stdin)")
+    parser.add_argument("--concurrency", type=int, default=8, help="names resolved at the same time (default: 8)")
+    parser.add_argument("--offset", type=int, default=0, help="skip this many input lines, to resume a run")
+    parser.add_argument("--log-level", default="WARNING", help="loguru level of the log on stderr (default: WARNING)")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level.upper())
+
+    # Same searcher, cache and rate limit settings as the API server
+    from app.main import searcher
+    from app.models import SessionLocal, create_db_and_tables
+
+    async def run():
+        try:
+            return await resolve_lines(args.input, searcher, SessionLocal, sys.stdout,
+                                       concurrency=max(1, args.concurrency), offset=args.offset)
+        finally:
+            await searcher.aclose()
+
+    create_db_and_tables()
+    count = asyncio.run(run())
+    logger.info(f"Resolved {count} names")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,53 @@ class Settings:
         if not self.tmdb_api_key or self.tmdb_api_key == 'your_api_key_here':
             raise ValueError("API key not found or not set in [tmdb] section of config.ini")
 
+        # HTTP connection pool of the async TMDb client
+        self.tmdb_max_connections = parser.getint("tmdb", "max_connections", fallback=20)
+        self.tmdb_max_concurrency = parser.getint("tmdb", "max_concurrency", fallback=50)
+        self.tmdb_timeout = parser.getfloat("tmdb", "timeout", fallback=10.0)
+        self.tmdb_http2 = parser.getboolean("tmdb", "http2", fallback=True)
+        # Blind-search candidates sent at once, 0 searches them one at a time
+        self.tmdb_speculative_searches = parser.getint("tmdb", "speculative_searches", fallback=0)
+        # Client-side rate limit (requests per second, 0 for none) and retries of 429 responses
+        self.tmdb_rate_limit = parser.getfloat("tmdb", "rate_limit", fallback=40.0)
+        self.tmdb_rate_burst = parser.getfloat("tmdb", "rate_burst", fallback=0) or None
+        self.tmdb_max_retries = parser.getint("tmdb", "max_retries", fallback=3)
+
+        # Database, see models.make_engine; the pragmas only apply to SQLite
+        self.database_url = parser.get("database", "url", fallback="sqlite:///./tmdb_media.db")
+        self.sqlite_pragmas = {
+            "journal_mode": parser.get("database", "journal_mode", fallback="WAL"),
+            "synchronous": parser.get("database", "synchronous", fallback="NORMAL"),
+            "mmap_size": parser.getint("database", "mmap_size", fallback=268435456),
+            "cache_size": parser.getint("database", "cache_size", fallback=-65536),
+            "busy_timeout": parser.getint("database", "busy_timeout", fallback=5000),
+        }
+        self.database_pool = {
+            "pool_size": parser.getint("database", "pool_size", fallback=8),
+            "max_overflow": parser.getint("database", "max_overflow", fallback=16),
+            "pool_timeout": parser.getfloat("database", "pool_timeout", fallback=30.0),
+        }
+        if not self.database_url.startswith("sqlite"):
+            # Server connections can be dropped behind the pool's back
+            self.database_pool["pool_pre_ping"] = parser.getboolean("database", "pool_pre_ping", fallback=True)
+            self.database_pool["pool_recycle"] = parser.getint("database", "pool_recycle", fallback=1800)
+
+        # Seconds a single item of /api/query/batch may take, 0 for no limit
+        self.batch_item_timeout = parser.getfloat("query", "batch_item_timeout", fallback=60.0)
+
+        # Parsed torrent names kept in memory, 0 disables the cache
+        self.parser_cache_size = parser.getint("parser", "cache_size", fallback=4096)
+
+        # Persistent TMDb response cache, an empty path disables it
+        self.tmdb_cache_path = parser.get("cache", "path", fallback="tmdb_cache.db")
+        self.tmdb_cache_max_entries = parser.getint("cache", "max_entries", fallback=100000)
+        # ttl_<kind> = seconds, for kind in search, movie, tv, find
+        self.tmdb_cache_ttls = {
+            key[len("ttl_"):]: int(value)
+            for key, value in (parser.items("cache") if parser.has_section("cache") else [])
+            if key.startswith("ttl_")
+        }
+
 # --- Main Configuration Loading Logic ---
 
 # Path to the config.ini file, expected to be in the `backend` directory
@@ -1,48 +1,102 @@
-from sqlalchemy.orm import Session
-import re
+import asyncio
+import base64
+import inspect
+import json
+from typing import Iterable
+from sqlalchemy import event, func, inspect as sa_inspect, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from . import models, schemas
-from torcp2.torinfo import TorrentInfo
-from torcp2.tmdbsearcher import TMDbSearcher
+from torinfo import TorrentInfo
+from tmdbsearcher import TMDbSearcher
 from loguru import logger
 from app.utils import format_genres
+from app.regex_index import get_regex_index
+from app.singleflight import SingleFlight
 
 # --- Read Operations ---
 
-def get_media(db: Session, media_id: int):
-    return db.query(models.Media).filter(models.Media.id == media_id).first()
+def get_media(db: Session, media_id: int, with_torrents: bool = False):
+    query = db.query(models.Media)
+    if with_torrents:
+        query = query.options(selectinload(models.Media.torrents))
+    return query.filter(models.Media.id == media_id).first()
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from . import models, schemas
+def encode_media_cursor(tmdb_id: int) -> str:
+    """Opaque `after` token for the groups following `tmdb_id`."""
+    return base64.urlsafe_b64encode(json.dumps({"tmdb_id": tmdb_id}).encode()).decode().rstrip("=")
+
+def decode_media_cursor(cursor: str) -> int:
+    """Raises ValueError for anything encode_media_cursor() did not make."""
+    try:
+        tmdb_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["tmdb_id"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(tmdb_id, int):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return tmdb_id
+
+def count_media_groups(db: Session) -> int:
+    """COUNT(DISTINCT tmdb_id) of media, without reading media."""
+    return db.query(func.count()).select_from(models.MediaGroup).scalar()
+
+def get_all_media(db: Session, skip: int = 0, limit: int = 100, after: str | None = None):
+    """
+    One page of media, grouped by tmdb_id in tmdb_id order.
 
-def get_all_media(db: Session, skip: int = 0, limit: int = 100):
-    # 1. Get the total count of distinct groups (tmdb_id)
-    total_groups = db.query(func.count(models.Media.tmdb_id.distinct())).scalar()
+    With `after` (the `next_cursor` of the previous page) the page starts
+    right after that group, a range scan of the tmdb_id index that costs the
+    same on any page; `skip` is ignored then. Without it, `skip` groups are
+    skipped with OFFSET as before.
+    """
+    # 1. Get the total count of groups, kept in media_groups
+    total_groups = count_media_groups(db)
 
-    # 2. Get the paginated list of distinct tmdb_id's
-    paginated_tmdb_ids_query = db.query(models.Media.tmdb_id).distinct().offset(skip).limit(limit)
-    paginated_tmdb_ids = [id[0] for id in paginated_tmdb_ids_query.all()]
+    # 2. Get the tmdb_id's of the page, one more to know if there is a next page
+    paginated_tmdb_ids_query = (db.query(models.Media.tmdb_id)
+                                .filter(models.Media.tmdb_id != None)
+                                .distinct()
+                                .order_by(models.Media.tmdb_id))
+    if after is not None:
+        paginated_tmdb_ids_query = paginated_tmdb_ids_query.filter(models.Media.tmdb_id > decode_media_cursor(after))
+    else:
+        paginated_tmdb_ids_query = paginated_tmdb_ids_query.offset(skip)
+    paginated_tmdb_ids = [id[0] for id in paginated_tmdb_ids_query.limit(limit + 1).all()]
+    next_cursor = encode_media_cursor(paginated_tmdb_ids[limit - 1]) if 0 < limit < len(paginated_tmdb_ids) else None
+    paginated_tmdb_ids = paginated_tmdb_ids[:limit]
 
     if not paginated_tmdb_ids:
-        return {"items": [], "total": total_groups}
+        return {"items": [], "total": total_groups, "next_cursor": None}
 
-    # 3. Get all media items that belong to the paginated tmdb_id's
-    media_items = db.query(models.Media).filter(models.Media.tmdb_id.in_(paginated_tmdb_ids)).all()
-    
-    return {"items": media_items, "total": total_groups}
+    # 3. Get all media items that belong to the paginated tmdb_id's, and their
+    # torrents in one more query instead of one per item when serialized
+    media_items = (db.query(models.Media)
+                   .options(selectinload(models.Media.torrents))
+                   .filter(models.Media.tmdb_id.in_(paginated_tmdb_ids))
+                   .order_by(models.Media.tmdb_id, models.Media.id)
+                   .all())
+
+    return {"items": media_items, "total": total_groups, "next_cursor": next_cursor}
 
 def find_torrent_by_name(db: Session, name: str) -> models.Torrent | None:
     return db.query(models.Torrent).filter(models.Torrent.name == name).first()
 
+def _regex_still_matches(index, media_id: int, media: models.Media | None, title: str) -> bool:
+    if media is None or media.torname_regex != index.get(media_id):
+        # The row was changed behind the index's back, resync this entry
+        index.set(media_id, media.torname_regex if media else None)
+        return media is not None and index.is_match(media_id, title)
+    return True
+
 def find_media_by_torname_regex(db: Session, title: str) -> models.Media | None:
-    all_media = db.query(models.Media).filter(models.Media.torname_regex != None).all()
-    for media in all_media:
-        try:
-            if re.search(media.torname_regex, title, re.IGNORECASE):
-                logger.info(f"Found media by regex: {media.torname_regex} for title: {title}")
-                return media
-        except re.error:
+    index = get_regex_index(db)
+    for media_id in index.matches(title):
+        media = get_media(db, media_id)
+        if not _regex_still_matches(index, media_id, media, title):
             continue
+        logger.info(f"Found media by regex: {media.torname_regex} for title: {title}")
+        return media
     return None
 
 def find_media_by_tmdb_id(db: Session, tmdb_cat: str, tmdb_id: int) -> models.Media | None:
@@ -51,10 +105,101 @@ def find_media_by_tmdb_id(db: Session, tmdb_cat: str, tmdb_id: int) -> models.Me
 def find_media_by_imdb_id(db: Session, imdb_id: str) -> models.Media | None:
     return db.query(models.Media).filter(models.Media.imdb_id == imdb_id).first()
 
+# --- Batch lookups: one query per kind for many items ---
+
+def get_media_many(db: Session, media_ids: Iterable[int]) -> dict[int, models.Media]:
+    """Media rows by id, with their torrents: two queries for any number of ids."""
+    media_ids = set(media_ids)
+    if not media_ids:
+        return {}
+    rows = db.query(models.Media).options(selectinload(models.Media.torrents)).filter(models.Media.id.in_(media_ids))
+    return {m.id: m for m in rows}
+
+def find_torrents_by_names(db: Session, names: Iterable[str]) -> dict[str, models.Torrent]:
+    names = set(names)
+    if not names:
+        return {}
+    # With their media in the same query, every hit needs it
+    rows = db.query(models.Torrent).options(joinedload(models.Torrent.media)).filter(models.Torrent.name.in_(names))
+    return {t.name: t for t in rows}
+
+def find_media_by_tmdb_ids(db: Session, keys: Iterable[tuple[str, int]]) -> dict[tuple[str, int], models.Media]:
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = (db.query(models.Media)
+            .filter(tuple_(models.Media.tmdb_cat, models.Media.tmdb_id).in_(keys))
+            .order_by(models.Media.id.desc()))
+    # Descending, so that the lowest id wins like in find_media_by_tmdb_id
+    return {(m.tmdb_cat, m.tmdb_id): m for m in rows}
+
+def find_media_by_imdb_ids(db: Session, imdb_ids: Iterable[str]) -> dict[str, models.Media]:
+    imdb_ids = set(imdb_ids)
+    if not imdb_ids:
+        return {}
+    rows = db.query(models.Media).filter(models.Media.imdb_id.in_(imdb_ids)).order_by(models.Media.id.desc())
+    return {m.imdb_id: m for m in rows}
+
+def find_media_by_torname_regex_many(db: Session, titles: Iterable[str]) -> dict[str, models.Media]:
+    """find_media_by_torname_regex() for many titles, loading all candidate rows at once."""
+    index = get_regex_index(db)
+    matched = {title: list(index.matches(title)) for title in set(titles)}
+    ids = {media_id for ids in matched.values() for media_id in ids}
+    rows = {m.id: m for m in db.query(models.Media).filter(models.Media.id.in_(ids))} if ids else {}
+    found = {}
+    for title, ids in matched.items():
+        for media_id in ids:
+            media = rows.get(media_id)
+            if _regex_still_matches(index, media_id, media, title):
+                found[title] = media
+                break
+    return found
+
 
 # --- Create Operations ---
+# Writes take `commit`: with commit=False they only flush (so new rows get
+# their ids) and leave the commit to the caller, which lets one resolution,
+# or a whole batch of them, go to the database as a single transaction.
+# No refresh() after commit: sessions don't expire on commit (SessionLocal),
+# so what a write returns is serialized without another SELECT.
 
-def create_media(db: Session, torinfo: TorrentInfo) -> models.Media:
+def _after_commit(db: Session, fn):
+    """Runs `fn` once the current transaction of `db` commits, drops it on rollback."""
+    db.info.setdefault('after_commit', []).append(fn)
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit(session):
+    for fn in session.info.pop('after_commit', ()):
+        fn()
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_after_commit(session):
+    session.info.pop('after_commit', None)
+
+def _finish(db: Session, commit: bool):
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+
+def _index_after_commit(db: Session, media_id: int, regex: str | None):
+    # Only an index that is already loaded needs the change, and no SQL may run after commit
+    index = get_regex_index(db, load=False)
+    _after_commit(db, lambda: index.set(media_id, regex))
+
+# INSERT ... ON CONFLICT, per dialect
+_UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def create_media(db: Session, media: schemas.MediaCreate, commit: bool = True) -> models.Media:
+    # An empty torrents list, known without asking the database
+    db_media = models.Media(**media.model_dump(), torrents=[])
+    db.add(db_media)
+    db.flush()
+    _index_after_commit(db, db_media.id, db_media.torname_regex)
+    _finish(db, commit)
+    return db_media
+
+def create_media_from_torinfo(db: Session, torinfo: TorrentInfo, commit: bool = True) -> models.Media:
     tmdb_genres = format_genres(torinfo)
 
     media_create = schemas.MediaCreate(
@@ -73,111 +218,269 @@ def create_media(db: Session, torinfo: TorrentInfo) -> models.Media:
         production_countries=torinfo.production_countries,
         tmdb_genres=tmdb_genres
     )
-    db_media = models.Media(**media_create.model_dump())
-    db.add(db_media)
-    db.commit()
-    db.refresh(db_media)
-    return db_media
+    return create_media(db, media_create, commit=commit)
 
-def create_torrent(db: Session, torinfo: TorrentInfo, media_id: int) -> models.Torrent:
+def create_torrent(db: Session, torinfo: TorrentInfo, media_id: int, commit: bool = True) -> models.Torrent:
+    """
+    Records that `torinfo.torname` is `media_id`. A name that is already there
+    keeps its media and that row is returned, so two workers resolving the
+    same name at once both succeed and the first one's answer stays.
+    """
     torrent_create = schemas.TorrentCreate(name=torinfo.torname, infolink=torinfo.infolink)
-    db_torrent = models.Torrent(**torrent_create.model_dump(), media_id=media_id)
-    db.add(db_torrent)
-    db.commit()
-    db.refresh(db_torrent)
+    insert = _UPSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        db_torrent = models.Torrent(**torrent_create.model_dump(), media_id=media_id)
+        db.add(db_torrent)
+        _finish(db, commit)
+        return db_torrent
+
+    stmt = insert(models.Torrent).values(**torrent_create.model_dump(), media_id=media_id)
+    stmt = stmt.on_conflict_do_nothing(index_elements=[models.Torrent.name])
+    db_torrent = db.scalars(stmt.returning(models.Torrent)).one_or_none()
+    if db_torrent is None:
+        db_torrent = find_torrent_by_name(db, torinfo.torname)
+    else:
+        # The insert went around the unit of work: add it to a loaded Media.torrents
+        media = db.identity_map.get(Session.identity_key(models.Media, media_id))
+        if media is not None and 'torrents' not in sa_inspect(media).unloaded:
+            set_committed_value(media, 'torrents', [*media.torrents, db_torrent])
+    _finish(db, commit)
     return db_torrent
 
 # --- Update Operations ---
 
-def update_media(db: Session, media_id: int, media_update: schemas.MediaUpdate) -> models.Media | None:
-    db_media = get_media(db, media_id)
+def update_media(db: Session, media_id: int, media_update: schemas.MediaUpdate, commit: bool = True) -> models.Media | None:
+    db_media = get_media(db, media_id, with_torrents=True)
     if db_media:
         for key, value in media_update.model_dump(exclude_unset=True).items():
             setattr(db_media, key, value)
-        db.commit()
-        db.refresh(db_media)
+        _index_after_commit(db, db_media.id, db_media.torname_regex)
+        _finish(db, commit)
     return db_media
 
 # --- Delete Operations ---
 
-def delete_media(db: Session, media_id: int) -> models.Media | None:
+def delete_media(db: Session, media_id: int, commit: bool = True) -> models.Media | None:
     db_media = get_media(db, media_id)
     if db_media:
         db.delete(db_media)
-        db.commit()
+        _index_after_commit(db, media_id, None)
+        _finish(db, commit)
     return db_media
 
-def delete_torrent(db: Session, torrent_id: int) -> models.Torrent | None:
+def delete_torrent(db: Session, torrent_id: int, commit: bool = True) -> models.Torrent | None:
     db_torrent = db.query(models.Torrent).filter(models.Torrent.id == torrent_id).first()
     if db_torrent:
         db.delete(db_torrent)
-        db.commit()
+        _finish(db, commit)
     return db_torrent
 
 # --- Main Search Logic ---
 
-def search_and_create_media(db: Session, torinfo: TorrentInfo, searcher: TMDbSearcher) -> models.Media | None:
+# Which step of resolve_media_async() decided the result
+STAGE_TORRENT = 'torrent'                   # torrent name already known
+STAGE_TMDB_ID = 'tmdb_id'                   # given TMDb id, media known locally
+STAGE_TMDB_ID_SEARCH = 'tmdb_id_search'     # given TMDb id, fetched from TMDb
+STAGE_IMDB_ID = 'imdb_id'
+STAGE_IMDB_ID_SEARCH = 'imdb_id_search'
+STAGE_REGEX = 'regex'                       # a media's torname_regex matched the title
+STAGE_BLIND_LOCAL = 'blind_search_local'    # blind search found a media known locally
+STAGE_BLIND_SEARCH = 'blind_search'         # blind search, new media created
+STAGE_LOW_CONFIDENCE = 'low_confidence'     # blind search match rejected
+STAGE_NOT_FOUND = 'not_found'
+
+async def _searcher_call(method, torinfo: TorrentInfo):
+    # Works with both the blocking TMDbSearcher and AsyncTMDbSearcher
+    result = method(torinfo)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+def search_and_create_media(db: Session, torinfo: TorrentInfo, searcher: TMDbSearcher, commit: bool = True) -> models.Media | None:
+    """Blocking entry point, for use with a TMDbSearcher."""
+    coro = search_and_create_media_async(db, torinfo, searcher, commit=commit)
+    # With a blocking searcher the coroutine never suspends, so it runs to completion here
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    coro.close()
+    raise RuntimeError("search_and_create_media() needs a blocking searcher, await search_and_create_media_async() instead")
+
+def _tmdb_key(torinfo: TorrentInfo) -> tuple[str, int] | None:
+    try:
+        return torinfo.tmdb_cat, int(torinfo.tmdb_id)
+    except (TypeError, ValueError):
+        return None
+
+def resolve_local_many(db: Session, torinfos: list[TorrentInfo], commit: bool = True) -> list[tuple[models.Media | None, str | None]]:
+    """
+    Steps 1-4 of resolve_media_async() for many names at once, with one
+    query per lookup kind. Returns (media, stage) per torinfo, with stage
+    None for those that need TMDb (or that resolve_media_async() should
+    look at again). Torrent names must be distinct. The torrents of all
+    local hits are written in one transaction.
+    """
+    torrents = find_torrents_by_names(db, (t.torname for t in torinfos))
+    by_tmdb = find_media_by_tmdb_ids(db, filter(None, (_tmdb_key(t) for t in torinfos if t.tmdb_id and t.tmdb_cat)))
+    by_imdb = find_media_by_imdb_ids(db, (t.imdb_id for t in torinfos if t.imdb_id and t.tmdb_cat == 'movie'))
+    by_regex = find_media_by_torname_regex_many(db, (t.media_title for t in torinfos))
+
+    results = []
+    for torinfo in torinfos:
+        media, stage = None, None
+        if torrent := torrents.get(torinfo.torname):
+            media, stage = torrent.media, STAGE_TORRENT
+        elif torinfo.tmdb_id and torinfo.tmdb_cat:
+            # Not known locally: TMDb comes before the IMDb and regex steps
+            if media := by_tmdb.get(_tmdb_key(torinfo)):
+                stage = STAGE_TMDB_ID
+        elif torinfo.imdb_id and torinfo.tmdb_cat == 'movie':
+            if media := by_imdb.get(torinfo.imdb_id):
+                stage = STAGE_IMDB_ID
+        elif media := by_regex.get(torinfo.media_title):
+            stage = STAGE_REGEX
+        if stage and stage != STAGE_TORRENT:
+            create_torrent(db, torinfo, media.id, commit=False)
+        results.append((media, stage))
+    if commit:
+        db.commit()
+    return results
+
+async def search_and_create_media_async(db: Session, torinfo: TorrentInfo, searcher: TMDbSearcher, commit: bool = True,
+                                        run_db=None) -> models.Media | None:
+    media, _ = await resolve_media_async(db, torinfo, searcher, commit=commit, run_db=run_db)
+    return media
+
+async def _run_inline(fn, *args):
+    return fn(*args)
+
+def _media_of_torrent(db: Session, name: str) -> models.Media | None:
+    torrent = db.query(models.Torrent).options(joinedload(models.Torrent.media)).filter(models.Torrent.name == name).first()
+    return torrent.media if torrent else None
+
+def _create_media_and_torrent(db: Session, torinfo: TorrentInfo, commit: bool) -> models.Media:
+    new_media = create_media_from_torinfo(db, torinfo, commit=False)
+    create_torrent(db, torinfo, new_media.id, commit=commit)
+    return new_media
+
+# Media being created per (tmdb_cat, tmdb_id) by this process
+_media_flight = SingleFlight()
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+async def _find_or_create_media(db: Session, torinfo: TorrentInfo, commit: bool, run_db,
+                                fetch_details=None) -> tuple[models.Media, bool]:
+    """
+    Creates the media TMDb identified `torinfo` as, with its torrent, unless
+    one with that TMDb id exists by now. Returns (media, created).
+
+    Names for the same title resolved at the same time would otherwise each
+    create a media: they coalesce on the TMDb id, the first one fetches the
+    details and creates it, the others record their torrent for it once it
+    is committed. Uncommitted (commit=False) media are not seen by the
+    others, which then create their own.
+    """
+    async def create():
+        if await run_db(find_media_by_tmdb_id, db, torinfo.tmdb_cat, torinfo.tmdb_id):
+            return None
+        if fetch_details:
+            await _searcher_call(fetch_details, torinfo)
+        return torinfo, await run_db(_create_media_and_torrent, db, torinfo, commit)
+
+    key = _tmdb_key(torinfo)
+    if key is not None and _in_event_loop():
+        created = await _media_flight.do(key, create)
+    else:
+        # search_and_create_media() runs without a loop, and alone
+        created = await create()
+    if created and created[0] is torinfo:
+        return created[1], True
+    if media := await run_db(find_media_by_tmdb_id, db, torinfo.tmdb_cat, torinfo.tmdb_id):
+        await run_db(create_torrent, db, torinfo, media.id, commit)
+        return media, False
+    # Created by another name but not committed
+    if fetch_details:
+        await _searcher_call(fetch_details, torinfo)
+    return await run_db(_create_media_and_torrent, db, torinfo, commit), True
+
+async def resolve_media_async(db: Session, torinfo: TorrentInfo, searcher: TMDbSearcher, commit: bool = True,
+                              run_db=None) -> tuple[models.Media | None, str]:
+    """
+    search_and_create_media_async() that also says which step decided, one
+    of the STAGE_ names. Whatever the resolution writes is committed once,
+    at the end, or left to the caller with commit=False.
+
+    Every database step goes through `await run_db(fn, *args)`. The API
+    passes starlette's run_in_threadpool, so that lock waits and server
+    round trips don't stall the event loop; by default the steps run inline,
+    which is what search_and_create_media() needs.
+    """
+    run_db = run_db or _run_inline
+
     # 1. Exact torrent name match
-    if torrent := find_torrent_by_name(db, torinfo.torname):
+    if media := await run_db(_media_of_torrent, db, torinfo.torname):
         logger.info(f"LOCAL: Found existing torrent by name: {torinfo.torname}")
-        return torrent.media
+        return media, STAGE_TORRENT
 
     # 2. TMDb ID provided
     if torinfo.tmdb_id and torinfo.tmdb_cat:
         logger.info(f"INFO: TMDb ID provided: {torinfo.tmdb_cat}-{torinfo.tmdb_id}")
-        if media := find_media_by_tmdb_id(db, torinfo.tmdb_cat, torinfo.tmdb_id):
+        if media := await run_db(find_media_by_tmdb_id, db, torinfo.tmdb_cat, torinfo.tmdb_id):
             logger.info(f"LOCAL: Found media by TMDb ID: {media.tmdb_title}")
-            create_torrent(db, torinfo, media.id)
-            return media
+            await run_db(create_torrent, db, torinfo, media.id, commit)
+            return media, STAGE_TMDB_ID
         else:
             # If not in local DB, fetch from TMDb and create
-            if searcher.search_tmdb_by_tmdbid(torinfo):
+            if await _searcher_call(searcher.search_tmdb_by_tmdbid, torinfo):
                 logger.info(f"TMDb: Found media by TMDb ID: {torinfo.tmdb_title}")
-                new_media = create_media(db, torinfo)
-                create_torrent(db, torinfo, new_media.id)
-                return new_media
+                media, created = await _find_or_create_media(db, torinfo, commit, run_db)
+                return media, STAGE_TMDB_ID_SEARCH if created else STAGE_TMDB_ID
 
     # 3. IMDb ID provided (for movies)
     if torinfo.imdb_id and torinfo.tmdb_cat == 'movie':
         logger.info(f"INFO: IMDb ID provided: {torinfo.imdb_id}")
-        if media := find_media_by_imdb_id(db, torinfo.imdb_id):
+        if media := await run_db(find_media_by_imdb_id, db, torinfo.imdb_id):
             logger.info(f"LOCAL: Found media by IMDb ID: {media.tmdb_title}")
-            create_torrent(db, torinfo, media.id)
-            return media
+            await run_db(create_torrent, db, torinfo, media.id, commit)
+            return media, STAGE_IMDB_ID
         else:
             # If not in local DB, fetch from TMDb and create
-            if searcher.searchTMDbByIMDbId(torinfo):
+            if await _searcher_call(searcher.searchTMDbByIMDbId, torinfo):
                 logger.info(f"TMDb: Found media by IMDb ID: {torinfo.tmdb_title}")
-                new_media = create_media(db, torinfo)
-                create_torrent(db, torinfo, new_media.id)
-                return new_media
+                media, created = await _find_or_create_media(db, torinfo, commit, run_db)
+                return media, STAGE_IMDB_ID_SEARCH if created else STAGE_IMDB_ID
 
     # 4. Regex match on torrent name
-    if media := find_media_by_torname_regex(db, torinfo.media_title):
+    if media := await run_db(find_media_by_torname_regex, db, torinfo.media_title):
         logger.info(f"LOCAL: Found media by regex: {torinfo.media_title}")
-        create_torrent(db, torinfo, media.id)
-        return media
+        await run_db(create_torrent, db, torinfo, media.id, commit)
+        return media, STAGE_REGEX
 
     # 5. Blind search on TMDb
     logger.info(f"INFO: No local match found. Performing blind search on TMDb for: {torinfo.media_title}")
-    if searcher.searchTMDb(torinfo):
-        # After blind search, torinfo is populated with TMDb data.
-        # Check again if this TMDb ID already exists locally.
-        if media := find_media_by_tmdb_id(db, torinfo.tmdb_cat, torinfo.tmdb_id):
+    if await _searcher_call(searcher.identifyTMDb, torinfo):
+        # The search result only identifies the media (tmdb_cat, tmdb_id);
+        # check if this TMDb ID already exists locally before fetching details.
+        if media := await run_db(find_media_by_tmdb_id, db, torinfo.tmdb_cat, torinfo.tmdb_id):
             logger.info(f"LOCAL: Found media by TMDb ID after blind search: {media.tmdb_title}")
-            create_torrent(db, torinfo, media.id)
-            return media
+            await run_db(create_torrent, db, torinfo, media.id, commit)
+            return media, STAGE_BLIND_LOCAL
 
         # If confidence is too low, reject
         if torinfo.confidence < 30:
             logger.warning(f"BLIND confidence too low: {torinfo.confidence} for {torinfo.torname}")
-            return None
+            return None, STAGE_LOW_CONFIDENCE
 
         # Create new media and torrent
         logger.info(f"TMDb: Found media by blind search: {torinfo.tmdb_title}")
-        new_media = create_media(db, torinfo)
-        create_torrent(db, torinfo, new_media.id)
-        return new_media
+        media, created = await _find_or_create_media(db, torinfo, commit, run_db, searcher.fillTMDbDetails)
+        return media, STAGE_BLIND_SEARCH if created else STAGE_BLIND_LOCAL
 
     logger.warning(f"FAIL: Could not find any match for: {torinfo.torname}")
-    return None
\ No newline at end of file
+    return None, STAGE_NOT_FOUND
\ No newline at end of file
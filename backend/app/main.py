@@ -1,29 +1,68 @@
-import os
-import sys
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List
+from loguru import logger
 
-# Adjust sys.path to allow imports from the parent `backend` directory
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
-
-from torcp2.tmdbsearcher import TMDbSearcher
-from torcp2.torinfo import TorrentParser, TorrentInfo
+# app/__init__.py puts torcp2 on sys.path, its modules are imported flat
 from app import crud, models, schemas
-from app.models import SessionLocal, create_db_and_tables
+from asynctmdbsearcher import AsyncTMDbSearcher
+from tmdbcache import MissCache, TMDbCache
+from ratelimit import RateLimiter, TMDbThrottled
+from torinfo import TorrentParser, TorrentInfo
+from torcategory import category_stats
+from app.models import SessionLocal, configure_engine, create_db_and_tables
 from app.config import settings
 from app.utils import format_genres
+from app.singleflight import SingleFlight
 
 app = FastAPI()
 
+configure_engine(settings.database_url, settings.sqlite_pragmas, **settings.database_pool)
+
 # Initialize TMDbSearcher at startup using the key from config
 # pydantic will raise an error on startup if the key is missing.
-searcher = TMDbSearcher(tmdb_api_key=settings.tmdb_api_key)
+tmdb_cache = None
+if settings.tmdb_cache_path:
+    tmdb_cache = TMDbCache(settings.tmdb_cache_path,
+                           ttls=settings.tmdb_cache_ttls,
+                           max_entries=settings.tmdb_cache_max_entries)
+    tmdb_misses = tmdb_cache
+else:
+    # Misses are still remembered, in memory
+    tmdb_misses = MissCache(settings.tmdb_cache_ttls.get("miss", TMDbCache.DEFAULT_TTLS["miss"]))
+tmdb_limiter = RateLimiter(settings.tmdb_rate_limit, settings.tmdb_rate_burst)
+searcher = AsyncTMDbSearcher(tmdb_api_key=settings.tmdb_api_key, cache=tmdb_cache,
+                             speculative=settings.tmdb_speculative_searches,
+                             limiter=tmdb_limiter,
+                             max_retries=settings.tmdb_max_retries,
+                             max_connections=settings.tmdb_max_connections,
+                             max_concurrency=settings.tmdb_max_concurrency,
+                             timeout=settings.tmdb_timeout,
+                             http2=settings.tmdb_http2,
+                             misses=tmdb_misses)
+
+TorrentParser.configure_cache(settings.parser_cache_size)
+
+# Identical /api/query requests in flight at the same time share one search
+query_flight = SingleFlight()
 
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await searcher.aclose()
+
+@app.exception_handler(TMDbThrottled)
+async def tmdb_throttled_handler(request: Request, exc: TMDbThrottled):
+    # Not a miss: the client should try again later
+    headers = {"Retry-After": str(int(exc.retry_after + 0.999))} if exc.retry_after else None
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -37,12 +76,9 @@ def parse_tmdb_str(tmdb_str: str):
     parts = tmdb_str.split('-')
     return parts[0], parts[1] if len(parts) > 1 else None
 
-@app.post("/api/query", response_model=schemas.Media)
-def search_media_by_torname_post(query: schemas.Query, db: Session = Depends(get_db)):
-    """
-    This endpoint mirrors the logic of the original Flask query, accepting a JSON body.
-    """
-    torinfo = TorrentParser.parse(query.torname)
+def torinfo_from_query(query: schemas.Query) -> TorrentInfo:
+    # A private copy, so setting the fields below leaves the cached parse alone
+    torinfo = TorrentParser.parse_cached(query.torname)
     if not torinfo.media_title:
         raise HTTPException(status_code=400, detail="Could not parse a valid media title from torname")
 
@@ -55,22 +91,125 @@ def search_media_by_torname_post(query: schemas.Query, db: Session = Depends(get
         torinfo.tmdb_cat, torinfo.tmdb_id = parse_tmdb_str(query.tmdbstr)
     if query.infolink:
         torinfo.infolink = query.infolink
+    return torinfo
+
+def query_key(query: schemas.Query) -> tuple:
+    """Queries with the same key get the same answer."""
+    return (query.torname.strip(), query.extitle or '', query.imdbid or '', query.tmdbstr or '')
+
+async def resolve_query(db: Session, query: schemas.Query, torinfo: TorrentInfo) -> schemas.Media:
+    async def run_query():
+        # Own session: the work may outlive the request that started it, and
+        # followers get a detached copy of the result. Database steps run on
+        # the thread pool, so they never stall the event loop.
+        flight_db = Session(bind=db.get_bind(), autoflush=False, expire_on_commit=False)
+        try:
+            media = await crud.search_and_create_media_async(flight_db, torinfo, searcher, run_db=run_in_threadpool)
+            return await run_in_threadpool(schemas.Media.model_validate, media) if media else None
+        finally:
+            await run_in_threadpool(flight_db.close)
 
-    # Call the main search logic in crud
-    media_result = crud.search_and_create_media(db, torinfo, searcher)
+    # Call the main search logic in crud, once for identical concurrent queries
+    media_result = await query_flight.do(query_key(query), run_query)
 
     if media_result:
         return media_result
-    
+
     raise HTTPException(status_code=404, detail=f"Could not find or create a media match for \"{query.torname}\"")
 
+@app.post("/api/query", response_model=schemas.Media)
+async def search_media_by_torname_post(query: schemas.Query, db: Session = Depends(get_db)):
+    """
+    This endpoint mirrors the logic of the original Flask query, accepting a JSON body.
+    """
+    torinfo = torinfo_from_query(query)
+    return await resolve_query(db, query, torinfo)
+
+@app.post("/api/query/batch", response_model=List[schemas.QueryResult])
+async def search_media_by_torname_batch(queries: List[schemas.Query], db: Session = Depends(get_db)):
+    """
+    /api/query for many names. Results come back in request order, one per
+    query; a query that fails gets its status and error instead of media.
+    Repeated queries (same query_key) are resolved once, local matches are
+    looked up for all names together, and only the rest go to TMDb,
+    concurrently.
+    """
+    results: dict[tuple, schemas.QueryResult] = {}
+    todo: dict[tuple, tuple[schemas.Query, TorrentInfo]] = {}
+    for query in queries:
+        key = query_key(query)
+        if key in results or key in todo:
+            continue
+        try:
+            todo[key] = (query, torinfo_from_query(query))
+        except HTTPException as e:
+            results[key] = schemas.QueryResult(torname=query.torname, status=e.status_code, error=e.detail)
+
+    def resolve_local(torinfos: list[TorrentInfo]) -> list[schemas.Media | None]:
+        local = crud.resolve_local_many(db, torinfos)
+        # The torrents of all hits, at once
+        found = crud.get_media_many(db, (media.id for media, stage in local if stage))
+        return [schemas.Media.model_validate(found[media.id]) if stage else None for media, stage in local]
+
+    local = await run_in_threadpool(resolve_local, [torinfo for _, torinfo in todo.values()])
+    remote = []
+    for (key, (query, torinfo)), media in zip(list(todo.items()), local):
+        if media:
+            results[key] = schemas.QueryResult(torname=query.torname, media=media)
+        else:
+            remote.append((key, query, torinfo))
+    batch_cancelled = False
+
+    async def resolve_remote(query: schemas.Query, torinfo: TorrentInfo) -> schemas.QueryResult:
+        try:
+            # resolve_query() works in a session of its own, items run concurrently
+            media = await asyncio.wait_for(resolve_query(db, query, torinfo),
+                                           settings.batch_item_timeout or None)
+            return schemas.QueryResult(torname=query.torname, media=media)
+        except HTTPException as e:
+            return schemas.QueryResult(torname=query.torname, status=e.status_code, error=e.detail)
+        except TMDbThrottled as e:
+            return schemas.QueryResult(torname=query.torname, status=503, error=str(e))
+        except asyncio.TimeoutError:
+            return schemas.QueryResult(torname=query.torname, status=504, error="Timed out")
+        except asyncio.CancelledError:
+            # Only the batch itself being cancelled ends the batch
+            if batch_cancelled:
+                raise
+            logger.error(f"Batch query cancelled for {query.torname}")
+            return schemas.QueryResult(torname=query.torname, status=500, error="Cancelled")
+        except Exception as e:
+            logger.error(f"Batch query failed for {query.torname}: {e}")
+            return schemas.QueryResult(torname=query.torname, status=500, error=str(e) or type(e).__name__)
+
+    tasks = {key: asyncio.ensure_future(resolve_remote(query, torinfo)) for key, query, torinfo in remote}
+    try:
+        if tasks:
+            await asyncio.wait(tasks.values())
+    except asyncio.CancelledError:
+        # Tells the items apart from one that was cancelled on its own
+        batch_cancelled = True
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    results.update((key, task.result()) for key, task in tasks.items())
+    answers = []
+    for query in queries:
+        result = results[query_key(query)]
+        # Each query gets its own name back, also when it shared the result of another
+        if result.torname != query.torname:
+            result = result.model_copy(update={"torname": query.torname})
+        answers.append(result)
+    return answers
+
 # --- Standard CRUD for Media ---
 @app.post("/api/media/", response_model=schemas.Media)
 def create_media(media: schemas.MediaCreate, db: Session = Depends(get_db)):
     return crud.create_media(db=db, media=media)
 
 @app.post("/api/media/from-tmdb/", response_model=schemas.Media)
-def create_media_from_tmdb(
+async def create_media_from_tmdb(
     torname_regex: str,
     tmdb_cat: str,
     tmdb_id: int,
@@ -81,7 +220,7 @@ def create_media_from_tmdb(
         n1 = TorrentInfo()
         n1.tmdb_cat = tmdb_cat
         n1.tmdb_id = str(tmdb_id)
-        r = searcher.search_tmdb_by_tmdbid(n1)
+        r = await searcher.search_tmdb_by_tmdbid(n1)
 
         if not r:
             raise HTTPException(status_code=404, detail=f"Could not find TMDb details for ID {tmdb_id} and category {tmdb_cat}")
@@ -104,18 +243,23 @@ def create_media_from_tmdb(
             tmdb_genres=tmdb_genres,
             tmdb_overview=tmdb_overview
         )
-        new_media = crud.create_media(db, media_create)
+        new_media = await run_in_threadpool(crud.create_media, db, media_create)
         return new_media
+    except TMDbThrottled:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create media from TMDb: {e}")
 
 @app.get("/api/media/", response_model=schemas.MediaPage)
-def read_all_media(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_all_media(db, skip=skip, limit=limit)
+def read_all_media(skip: int = 0, limit: int = 10, after: str | None = None, db: Session = Depends(get_db)):
+    try:
+        return crud.get_all_media(db, skip=skip, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/media/{media_id}", response_model=schemas.Media)
 def read_media(media_id: int, db: Session = Depends(get_db)):
-    db_media = crud.get_media(db, media_id=media_id)
+    db_media = crud.get_media(db, media_id=media_id, with_torrents=True)
     if db_media is None:
         raise HTTPException(status_code=404, detail="Media not found")
     return db_media
@@ -135,11 +279,11 @@ def delete_media(media_id: int, db: Session = Depends(get_db)):
     return db_media
 
 @app.get("/api/tmdb/details", response_model=dict)
-def get_tmdb_details(tmdb_id: int, tmdb_cat: str):
+async def get_tmdb_details(tmdb_id: int, tmdb_cat: str):
     n1 = TorrentInfo()
     n1.tmdb_cat = tmdb_cat
     n1.tmdb_id = str(tmdb_id)
-    r = searcher.search_tmdb_by_tmdbid(n1)
+    r = await searcher.search_tmdb_by_tmdbid(n1)
     if not r:
         raise HTTPException(status_code=404, detail=f"TMDb details not found for ID {tmdb_id} and category {tmdb_cat}")
 
@@ -161,20 +305,41 @@ def get_tmdb_details(tmdb_id: int, tmdb_cat: str):
         "year": n1.year
     }
 
-    if n1.tmdbDetails and hasattr(n1.tmdbDetails, 'genres'):
-        tmdb_details_dict["genres"] = [{"id": g.id, "name": g.name} for g in n1.tmdbDetails.genres]
+    if n1.tmdbDetails and n1.tmdbDetails.genres:
+        tmdb_details_dict["genres"] = [{"id": gid, "name": name} for gid, name in n1.tmdbDetails.genres]
     elif n1.genre_ids:
         tmdb_details_dict["genres"] = [{"name": g} for g in n1.genre_ids]
 
     return tmdb_details_dict
 
+@app.get("/api/stats", response_model=dict)
+def get_stats():
+    return {
+        "tmdb_cache": tmdb_cache.stats() if tmdb_cache else None,
+        "tmdb_misses": None if tmdb_cache else tmdb_misses.stats(),
+        "query_coalescing": query_flight.stats(),
+        "parser_cache": TorrentParser.cache_stats(),
+        "categories": category_stats.snapshot(),
+        "tmdb_rate_limit": tmdb_limiter.stats(),
+    }
+
+@app.delete("/api/tmdb/cache/misses", response_model=dict)
+def clear_tmdb_misses():
+    return {"cleared": tmdb_misses.clear_misses()}
+
 # --- Standard CRUD for Torrents ---
 @app.post("/api/torrents/", response_model=schemas.Torrent)
 def create_torrent_for_media(media_id: int, torrent: schemas.TorrentCreate, db: Session = Depends(get_db)):
     db_media = crud.get_media(db, media_id=media_id)
     if db_media is None:
         raise HTTPException(status_code=404, detail="Media not found")
-    return crud.create_torrent(db=db, torrent=torrent, media_id=media_id)
+    if crud.find_torrent_by_name(db, torrent.name):
+        raise HTTPException(status_code=409, detail="Torrent already exists")
+    db_torrent = crud.create_torrent(db, TorrentInfo(torname=torrent.name, infolink=torrent.infolink), media_id)
+    if db_torrent.media_id != media_id:
+        # Recorded by another request since the check above
+        raise HTTPException(status_code=409, detail="Torrent already exists")
+    return db_torrent
 
 @app.delete("/api/torrents/{torrent_id}", response_model=schemas.Torrent)
 def delete_torrent(torrent_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,131 @@
+"""
+Versioned schema changes for databases made by older versions.
+
+The version a database is at is the one row of `schema_version`. A new
+database gets the current schema from the models and the latest version
+at once; an existing one runs the MIGRATIONS above its version, in order,
+in one transaction. Databases from before this table count as version 0.
+
+To change the schema: change the models (new databases), and append a
+migration that makes the same change to an existing database (upgrades).
+"""
+from typing import Callable
+
+from loguru import logger
+from sqlalchemy import Column, Integer, MetaData, Table, func, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+
+from app import models
+
+schema_version = Table("schema_version", MetaData(), Column("version", Integer, nullable=False))
+
+
+def _media_groups(conn: Connection):
+    # Databases that ran the first release with media_groups already counted them
+    if inspect(conn).has_table(models.MediaGroup.__tablename__):
+        return
+    models.MediaGroup.__table__.create(conn)
+    conn.execute(insert(models.MediaGroup).from_select(
+        ["tmdb_id", "media_count"],
+        select(models.Media.tmdb_id, func.count())
+        .where(models.Media.tmdb_id != None)
+        .group_by(models.Media.tmdb_id),
+    ))
+
+
+def _lookup_indexes(conn: Connection):
+    tables = inspect(conn).get_table_names()
+    for table, name in [(models.Media.__table__, "ix_media_tmdb_cat_tmdb_id"),
+                        (models.Torrent.__table__, "ix_torrents_media_id")]:
+        if table.name in tables:
+            next(index for index in table.indexes if index.name == name).create(conn, checkfirst=True)
+
+
+# (version, description, upgrade step)
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "media_groups counter table", _media_groups),
+    (2, "(tmdb_cat, tmdb_id) and torrents.media_id indexes", _lookup_indexes),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def _lock(conn: Connection):
+    """
+    Makes workers starting together on the same database migrate one at a
+    time, and creates schema_version if it is not there yet.
+    """
+    create = CreateTable(schema_version, if_not_exists=True)
+    if conn.dialect.name == "postgresql":
+        # Before the CREATE, so no two workers read version 0 of a new database
+        conn.execute(text("SELECT pg_advisory_xact_lock(7470648)"))
+        conn.execute(create)
+    else:
+        # pysqlite runs DDL outside the transaction, IF NOT EXISTS keeps it safe;
+        # the write after it takes SQLite's write lock before anything is read
+        conn.execute(create)
+        conn.execute(schema_version.update().values(version=schema_version.c.version))
+
+
+def upgrade(engine: Engine) -> int:
+    """Brings the database of `engine` to LATEST. Returns the version it was at (None if new)."""
+    with engine.begin() as conn:
+        _lock(conn)
+        current = conn.execute(select(schema_version.c.version)).scalar()
+        if current is None and not inspect(conn).has_table(models.Media.__tablename__):
+            models.Base.metadata.create_all(bind=conn)
+            conn.execute(schema_version.insert().values(version=LATEST))
+            logger.info(f"Created database schema version {LATEST}")
+            return None
+        if current is None:
+            conn.execute(schema_version.insert().values(version=0))
+            current = 0
+        for version, description, step in MIGRATIONS:
+            if version > current:
+                logger.info(f"Migrating database to version {version}: {description}")
+                step(conn)
+        # Tables that are newer than the database, with their indexes
+        models.Base.metadata.create_all(bind=conn)
+        if current < LATEST:
+            conn.execute(schema_version.update().values(version=LATEST))
+        return current
+
+
+# Hot-path queries and the index each must search with
+HOT_QUERIES = [
+    ("torrent by name",
+     "SELECT id, media_id FROM torrents WHERE name = :name",
+     "sqlite_autoindex_torrents_1"),
+    ("torrents of media",
+     "SELECT id, name FROM torrents WHERE media_id IN (:a, :b)",
+     "ix_torrents_media_id"),
+    ("media by tmdb id",
+     "SELECT id FROM media WHERE tmdb_cat = :cat AND tmdb_id = :id",
+     "ix_media_tmdb_cat_tmdb_id"),
+    ("media by imdb id",
+     "SELECT id FROM media WHERE imdb_id = :imdb",
+     "ix_media_imdb_id"),
+    ("listing page after cursor",
+     "SELECT DISTINCT tmdb_id FROM media WHERE tmdb_id IS NOT NULL AND tmdb_id > :after "
+     "ORDER BY tmdb_id LIMIT 11",
+     "ix_media_tmdb_id"),
+]
+
+
+def check_query_plans(engine: Engine) -> list[str]:
+    """
+    Runs EXPLAIN QUERY PLAN for HOT_QUERIES (SQLite only) and logs a
+    warning for each that does not search its index. Returns the warnings.
+    """
+    if engine.dialect.name != "sqlite":
+        return []
+    problems = []
+    with engine.connect() as conn:
+        for label, sql, index in HOT_QUERIES:
+            params = {name: None for name in text(sql).compile().params}
+            plan = " / ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params))
+            if f"INDEX {index} (" not in plan:
+                problems.append(f"{label} does not search {index}: {plan}")
+    for problem in problems:
+        logger.warning(f"Query plan: {problem}")
+    return problems
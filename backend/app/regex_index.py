@@ -0,0 +1,300 @@
+import re
+import threading
+import time
+import weakref
+from typing import Iterable, Iterator, Optional, Pattern
+from sqlalchemy.orm import Session
+from loguru import logger
+from . import models
+
+# Characters that re.IGNORECASE treats as equal to an ASCII letter but that
+# str.lower() does not map onto it.
+_FOLD_TABLE = str.maketrans({'ı': 'i', 'İ': 'i', 'ſ': 's', 'K': 'k'})
+
+# Longest gram used as a prefilter key
+_GRAM = 8
+
+# Seconds after which refresh() reloads the whole index
+RELOAD_INTERVAL = 300.0
+
+
+def _fold(text: str) -> str:
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def _keyable(gram: str) -> bool:
+    # Only ASCII and caseless (e.g. CJK) characters fold the same way as re.IGNORECASE does
+    return all(c.isascii() or c.lower() == c.upper() for c in gram)
+
+
+def _grams(text: str) -> set:
+    return {text[i:i + n] for n in range(1, _GRAM + 1) for i in range(len(text) - n + 1)}
+
+
+def required_literals(regex: str) -> list[str]:
+    """
+    Returns literal runs that must appear in any string `regex` matches.
+
+    Anything the scanner is not sure about (alternation, groups, classes,
+    escapes that stand for other characters, global flags) either ends the
+    current run or, where it could change the meaning of what follows, makes
+    the whole pattern unanalysable, in which case an empty list is returned.
+    """
+    if re.match(r'\(\?[a-zA-Z]', regex):
+        return []
+    runs, run = [], ''
+    i, n = 0, len(regex)
+    while i < n:
+        c = regex[i]
+        atom = None
+        if c == '\\':
+            if i + 1 >= n or regex[i + 1] in 'xuUN0123456789':
+                return []
+            if not regex[i + 1].isalnum():
+                atom = regex[i + 1]
+            i += 2
+        elif c == '[':
+            i = _skip_class(regex, i)
+        elif c == '(':
+            i = _skip_group(regex, i)
+            if i < 0:
+                return []
+        elif c == '|':
+            return []
+        elif c in '{}':
+            m = re.match(r'\{\d*,?\d*\}', regex[i:])
+            if not m:
+                return []
+            i += m.end()
+        elif c in '.^$*+?':
+            i += 1
+        else:
+            atom = c
+            i += 1
+
+        if atom is not None and i < n and regex[i] in '*?{':
+            atom = None  # optional atom
+        if atom is not None:
+            run += atom
+        if atom is None or (i < n and regex[i] == '+'):
+            if run:
+                runs.append(run)
+            run = ''
+    if run:
+        runs.append(run)
+    return runs
+
+
+def _skip_class(regex: str, i: int) -> int:
+    i += 1
+    if i < len(regex) and regex[i] == '^':
+        i += 1
+    if i < len(regex) and regex[i] == ']':
+        i += 1
+    while i < len(regex) and regex[i] != ']':
+        i += 2 if regex[i] == '\\' else 1
+    return i + 1
+
+
+def _skip_group(regex: str, i: int) -> int:
+    depth = 0
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            i = _skip_class(regex, i)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+class MediaRegexIndex:
+    """
+    In-process index of compiled `Media.torname_regex` patterns.
+
+    Only `(id, torname_regex)` is loaded, once, on first use. Afterwards the
+    crud layer keeps the index current through `set()` and `discard()`, so a
+    lookup never goes back to the database for the full list of patterns.
+    Invalid patterns are remembered (compiled as None) and skipped.
+
+    Other processes on the same database (several workers on PostgreSQL)
+    don't go through this index, `refresh()` picks up their new rows.
+
+    Each pattern is filed under one substring (up to 8 characters) of a literal it requires
+    (most stored patterns are plain titles), so a lookup only runs the
+    patterns whose key occurs in the title, plus the few that have no
+    usable literal.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # media id -> (raw regex, compiled pattern or None if invalid)
+        self._entries: dict[int, tuple[str, Optional[Pattern]]] = {}
+        # gram -> ids filed under it; ids of valid patterns without a key
+        self._postings: dict[str, set] = {}
+        self._unkeyed: set = set()
+        self._keys: dict[int, str] = {}
+        self._max_id = 0
+        self._loaded = False
+        self._loaded_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, db: Session):
+        rows = (db.query(models.Media.id, models.Media.torname_regex)
+                .filter(models.Media.torname_regex != None)
+                .all())
+        self.reset(rows)
+        logger.info(f"Regex index loaded with {len(rows)} patterns")
+
+    def reset(self, rows: Iterable[tuple[int, str]]):
+        with self._lock:
+            self._entries, self._postings, self._unkeyed, self._keys = {}, {}, set(), {}
+            self._max_id = 0
+            for media_id, regex in rows:
+                self._add(media_id, regex)
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db: Session):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load(db)
+
+    def refresh(self, db: Session):
+        """
+        Loads the index on first use, then adds the rows with ids above the
+        highest one seen. Every RELOAD_INTERVAL seconds it reloads instead,
+        for what that misses: rows other processes changed or deleted, and
+        ids committed out of order.
+        """
+        if not self._loaded or time.monotonic() - self._loaded_at > RELOAD_INTERVAL:
+            with self._lock:
+                if not self._loaded or time.monotonic() - self._loaded_at > RELOAD_INTERVAL:
+                    self.load(db)
+            return
+        rows = (db.query(models.Media.id, models.Media.torname_regex)
+                .filter(models.Media.id > self._max_id, models.Media.torname_regex != None)
+                .all())
+        if rows:
+            with self._lock:
+                for media_id, regex in rows:
+                    if media_id not in self._entries:
+                        self._add(media_id, regex)
+
+    def set(self, media_id: int, regex: Optional[str]):
+        """Adds or replaces the pattern of a media row."""
+        if not self._loaded:
+            return
+        if regex is None:
+            self.discard(media_id)
+            return
+        with self._lock:
+            existing = self._entries.get(media_id)
+            if existing and existing[0] == regex:
+                return
+            self._remove(media_id)
+            self._add(media_id, regex)
+
+    def discard(self, media_id: int):
+        with self._lock:
+            self._remove(media_id)
+
+    def get(self, media_id: int) -> Optional[str]:
+        entry = self._entries.get(media_id)
+        return entry[0] if entry else None
+
+    def is_match(self, media_id: int, title: str) -> bool:
+        entry = self._entries.get(media_id)
+        return bool(entry and entry[1] and entry[1].search(title))
+
+    def candidates(self, title: str) -> list[int]:
+        """Ids of the patterns that may match `title`, in id order."""
+        with self._lock:
+            found = set(self._unkeyed)
+            for gram in _grams(_fold(title)):
+                if ids := self._postings.get(gram):
+                    found.update(ids)
+        return sorted(found)
+
+    def matches(self, title: str) -> Iterator[int]:
+        """Yields the ids of media whose pattern matches `title`, in id order."""
+        for media_id in self.candidates(title):
+            if self.is_match(media_id, title):
+                yield media_id
+
+    def _add(self, media_id: int, regex: str):
+        pattern = self._compile(media_id, regex)
+        self._entries[media_id] = (regex, pattern)
+        self._max_id = max(self._max_id, media_id)
+        if pattern is None:
+            return
+        key = self._pick_key(regex)
+        if key is None:
+            self._unkeyed.add(media_id)
+        else:
+            self._keys[media_id] = key
+            self._postings.setdefault(key, set()).add(media_id)
+
+    def _remove(self, media_id: int):
+        self._entries.pop(media_id, None)
+        self._unkeyed.discard(media_id)
+        key = self._keys.pop(media_id, None)
+        if key is not None:
+            ids = self._postings[key]
+            ids.discard(media_id)
+            if not ids:
+                del self._postings[key]
+
+    def _pick_key(self, regex: str) -> Optional[str]:
+        # Longest grams first, then the one with the shortest posting list
+        best = None
+        for literal in required_literals(regex):
+            literal = _fold(literal)
+            n = min(_GRAM, len(literal))
+            for i in range(len(literal) - n + 1):
+                gram = literal[i:i + n]
+                if not _keyable(gram):
+                    continue
+                rank = (-len(gram), len(self._postings.get(gram, ())))
+                if best is None or rank < best[0]:
+                    best = (rank, gram)
+        return best[1] if best else None
+
+    @staticmethod
+    def _compile(media_id: int, regex: str) -> Optional[Pattern]:
+        try:
+            return re.compile(regex, re.IGNORECASE)
+        except re.error as e:
+            logger.warning(f"Invalid torname_regex for media {media_id}: {regex!r} ({e})")
+            return None
+
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_regex_index(db: Session, load: bool = True) -> MediaRegexIndex:
+    """Returns the index for the database `db` is bound to, loaded and refreshed unless `load` is False."""
+    bind = db.get_bind()
+    index = _indexes.get(bind)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(bind, MediaRegexIndex())
+    if load:
+        index.refresh(db)
+    return index
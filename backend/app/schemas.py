@@ -74,6 +74,15 @@ class Media(MediaBase):
     class Config:
         from_attributes = True
 
+class QueryResult(BaseModel):
+    """One item of a /api/query/batch response: media, or status and error."""
+    torname: str
+    media: Optional[Media] = None
+    status: int = 200
+    error: Optional[str] = None
+
 class MediaPage(BaseModel):
     items: List[Media]
-    total: int
\ No newline at end of file
+    total: int
+    # `after` for the next page, None on the last one
+    next_cursor: Optional[str] = None
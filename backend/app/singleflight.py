@@ -0,0 +1,46 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight await the same result (or exception) instead of repeating it. Once
+    the call finishes the key is forgotten, so nothing is cached. Coalescing
+    is per process and per event loop. The work is not cancelled when its
+    callers go away, it finishes for whoever asks next while it runs.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if (task := self._calls.get(key)) is not None:
+            self.shared += 1
+        else:
+            # The work runs in its own task, which every caller, the first one
+            # included, only awaits through shield(): a caller that times out
+            # or disconnects leaves, the others still get the result.
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.calls += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here, so no warning if every caller left
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
@@ -0,0 +1,70 @@
+"""
+Cost of a /api/media/ page by page number, OFFSET against cursor.
+
+    python benchmarks/bench_pagination.py [rows] [limit]
+
+Fills a temporary SQLite file with `rows` media rows (two per tmdb_id) and
+times crud.get_all_media() for the first, middle and last page, once
+with skip and once with the `after` cursor of the page before, and the
+`total` from media_groups against a COUNT(DISTINCT tmdb_id) of media.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+
+
+def best_of(fn, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(rows=1_000_000, limit=10):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = models.configure_engine(f"sqlite:///{tmp}/bench.db", models.SQLITE_PRAGMAS)
+        # Bulk insert first, then let create_db_and_tables() count the groups
+        models.Media.__table__.create(bind=engine)
+        with engine.begin() as conn:
+            for start in range(0, rows, 100_000):
+                conn.execute(insert(models.Media), [
+                    {"torname_regex": f"Title {i}", "tmdb_id": i // 2, "tmdb_cat": "movie"}
+                    for i in range(start, min(rows, start + 100_000))
+                ])
+        models.create_db_and_tables()
+        groups = (rows + 1) // 2
+        last = (groups - 1) // limit
+        with sessionmaker(bind=engine)() as db:
+            distinct = best_of(lambda: db.query(func.count(models.Media.tmdb_id.distinct())).scalar())
+            count = best_of(lambda: crud.count_media_groups(db))
+            assert crud.count_media_groups(db) == groups
+            print(f"{rows} rows, {groups} groups, {limit} per page")
+            print(f"total: COUNT(DISTINCT) {distinct * 1000:.2f} ms, media_groups {count * 1000:.2f} ms")
+            print(f"{'page':>8}  {'skip ms':>8}  {'after ms':>8}")
+            for page in (0, last // 2, last):
+                # The cursor the page before hands out: its last tmdb_id
+                after = crud.encode_media_cursor(page * limit - 1) if page else None
+                skip_page = crud.get_all_media(db, skip=page * limit, limit=limit)
+                after_page = crud.get_all_media(db, limit=limit, after=after)
+                assert [m.id for m in skip_page["items"]] == [m.id for m in after_page["items"]]
+                by_skip = best_of(lambda: crud.get_all_media(db, skip=page * limit, limit=limit))
+                by_after = best_of(lambda: crud.get_all_media(db, limit=limit, after=after))
+                print(f"{page + 1:>8}  {by_skip * 1000:8.2f}  {by_after * 1000:8.2f}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,74 @@
+"""
+Torrent name parsing throughput, per stage, on the checked-in corpus.
+
+    python benchmarks/bench_parser.py [count] [rounds]
+
+Prints names/s and the p50/p99 latency of a single name for TorCategory,
+TorTitle, NameTokens.media_info, the whole TorrentParser.parse, and the
+title cleanup the blind search does before querying TMDb
+(TMDbSearcher._clean_title), then names/s of TorrentParser.parse_many on
+one process per CPU. Each stage is timed name by name, `rounds` times
+over; the fastest round is reported. Runs offline, the corpus is in
+benchmarks/corpus (see parser_corpus.py).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+import parser_corpus
+import torcategory
+import tortitle
+import tortoken
+from tmdbsearcher import TMDbSearcher
+from torinfo import TorrentParser
+
+
+def best_round(fn, items, rounds):
+    """Per-item seconds of the fastest of `rounds` passes over `items`."""
+    best = None
+    clock = time.perf_counter
+    for _ in range(rounds):
+        times = []
+        for item in items:
+            start = clock()
+            fn(item)
+            times.append(clock() - start)
+        if best is None or sum(times) < sum(best):
+            best = times
+    return best
+
+
+def percentile(sorted_times, p):
+    return sorted_times[min(len(sorted_times) - 1, int(len(sorted_times) * p))]
+
+
+def main(count=None, rounds=5):
+    names = parser_corpus.load_names()[:count]
+    titles = [TorrentParser.parse(name).media_title for name in names]
+    searcher = TMDbSearcher(None)
+
+    stages = [
+        ('TorCategory', torcategory.TorCategory, names),
+        ('TorTitle', tortitle.TorTitle, names),
+        ('media_info', lambda name: tortoken.NameTokens(name).media_info, names),
+        ('TorrentParser.parse', TorrentParser.parse, names),
+        ('_clean_title', searcher._clean_title, titles),
+    ]
+    print(f"{len(names)} names from corpus {parser_corpus.VERSION}, best of {rounds}")
+    print(f"{'stage':>20}  {'names/s':>10}  {'p50 us':>8}  {'p99 us':>8}")
+    for label, fn, items in stages:
+        times = sorted(best_round(fn, items, rounds))
+        rate = len(times) / sum(times)
+        print(f"{label:>20}  {rate:10.0f}  {percentile(times, 0.5) * 1e6:8.1f}  {percentile(times, 0.99) * 1e6:8.1f}")
+
+    workers = os.cpu_count() or 1
+    elapsed = min(best_round(lambda batch: TorrentParser.parse_many(batch, workers=workers), [names], rounds))
+    print(f"{'parse_many x' + str(workers):>20}  {len(names) / elapsed:10.0f}")
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,60 @@
+"""
+Regex index lookup cost as the media library grows.
+
+    python benchmarks/bench_regex_index.py [sizes...]
+
+Patterns are synthetic titles like the ones create_media stores; lookups
+use titles that mostly miss, the worst case for a linear scan.
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from app.regex_index import MediaRegexIndex
+
+WORDS = ("the of a night last dark star war king lord ring love city blue red house game man woman "
+         "secret life world day time return rise fall dead land sea sky fire ice shadow moon sun").split()
+CJK = "流浪地球三体狂飙庆余年琅琊榜甄嬛传长安十二时辰隐秘的角落漫长季节繁花让子弹飞霸王别姬无间道"
+
+
+def make_title(rng):
+    if rng.random() < 0.3:
+        return ''.join(rng.choice(CJK) for _ in range(rng.randint(2, 6)))
+    return ' '.join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4))) + f' {rng.randint(1, 99999)}'
+
+
+def bench(size, lookups=2000, seed=0):
+    rng = random.Random(seed)
+    rows = [(i, make_title(rng)) for i in range(1, size + 1)]
+    queries = [make_title(rng) for _ in range(lookups)]
+
+    index = MediaRegexIndex()
+    start = time.perf_counter()
+    index.reset(rows)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for title in queries:
+        next(index.matches(title), None)
+    indexed = (time.perf_counter() - start) / lookups
+
+    compiled = [(media_id, re.compile(regex, re.IGNORECASE)) for media_id, regex in rows[:100000]]
+    sample = queries[:max(1, lookups // 20)]
+    start = time.perf_counter()
+    for title in sample:
+        next((media_id for media_id, pattern in compiled if pattern.search(title)), None)
+    linear = (time.perf_counter() - start) / len(sample) * size / len(compiled)
+
+    print(f"{size:>9} patterns  build {build:6.2f}s  indexed {indexed * 1e6:8.1f} us/lookup"
+          f"  linear ~{linear * 1e6:10.1f} us/lookup")
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or [10000, 100000, 1000000]
+    for size in sizes:
+        bench(size)
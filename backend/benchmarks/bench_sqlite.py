@@ -0,0 +1,105 @@
+"""
+Read latency on the SQLite database while a writer is busy, per storage profile.
+
+    python benchmarks/bench_sqlite.py [seconds] [readers]
+
+One thread keeps creating media + torrent rows (a commit each), like a
+backfill, while `readers` threads look up torrents and media by name and
+id, like /api/query hits. For the old defaults (rollback journal, full
+sync) and for models.SQLITE_PRAGMAS, prints writes/s, reads/s, read
+latency p50/p99/max and the number of "database is locked" errors.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from torinfo import TorrentInfo
+
+PROFILES = [
+    ('default', {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 0}),
+    ('tuned', models.SQLITE_PRAGMAS),
+]
+SEED_ROWS = 2000
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] if sorted_values else 0.0
+
+
+def run(pragmas, seconds, readers):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = models.make_engine(f"sqlite:///{tmp}/bench.db", pragmas, pool_size=readers + 1)
+        models.Base.metadata.create_all(bind=engine)
+        make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with make_session() as db:
+            for i in range(SEED_ROWS):
+                media = crud.create_media(db, schemas.MediaCreate(torname_regex=f"Seed {i}", tmdb_id=i, tmdb_cat='movie'), commit=False)
+                crud.create_torrent(db, TorrentInfo(torname=f"Seed.{i}.1080p"), media.id, commit=False)
+            db.commit()
+
+        stop = threading.Event()
+        writes, locked = [0], [0]
+        latencies = [[] for _ in range(readers)]
+
+        def writer():
+            i = SEED_ROWS
+            while not stop.is_set():
+                with make_session() as db:
+                    try:
+                        media = crud.create_media(db, schemas.MediaCreate(torname_regex=f"New {i}", tmdb_id=i, tmdb_cat='movie'), commit=False)
+                        crud.create_torrent(db, TorrentInfo(torname=f"New.{i}.1080p"), media.id)
+                        writes[0] += 1
+                    except OperationalError:
+                        locked[0] += 1
+                i += 1
+
+        def reader(n):
+            k = n
+            while not stop.is_set():
+                k = (k * 7919 + 1) % SEED_ROWS
+                start = time.perf_counter()
+                with make_session() as db:
+                    try:
+                        torrent = crud.find_torrent_by_name(db, f"Seed.{k}.1080p")
+                        crud.get_media(db, torrent.media_id)
+                    except OperationalError:
+                        locked[0] += 1
+                        continue
+                latencies[n].append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    reads = sorted(x for per_reader in latencies for x in per_reader)
+    return writes[0] / seconds, len(reads) / seconds, reads, locked[0]
+
+
+def main(seconds=5, readers=4):
+    print(f"{seconds}s, 1 writer, {readers} readers")
+    print(f"{'profile':>8}  {'writes/s':>8}  {'reads/s':>8}  {'p50 ms':>7}  {'p99 ms':>7}  {'max ms':>7}  {'locked':>6}")
+    for label, pragmas in PROFILES:
+        write_rate, read_rate, reads, locked = run(pragmas, seconds, readers)
+        print(f"{label:>8}  {write_rate:8.0f}  {read_rate:8.0f}  {percentile(reads, 0.5) * 1000:7.2f}  "
+              f"{percentile(reads, 0.99) * 1000:7.2f}  {(reads[-1] if reads else 0) * 1000:7.2f}  {locked:6d}")
+
+
+if __name__ == '__main__':
+    from loguru import logger
+    logger.remove()
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
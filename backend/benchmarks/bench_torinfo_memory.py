@@ -0,0 +1,71 @@
+"""
+Memory held per TorrentInfo, on the fixed benchmark corpus.
+
+    python benchmarks/bench_torinfo_memory.py [count]
+
+Prints the bytes each parsed TorrentInfo keeps alive, then the bytes after
+the details of a TMDb match have been applied to it, with a details
+response shaped like a real one (genres, cast, seasons, images...).
+Measured with tracemalloc, so the numbers include everything the
+instances reference.
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from tmdbv3api.as_obj import AsObj
+
+import make_corpus
+from tmdbsearcher import TMDbSearcher
+from torinfo import TorrentParser
+
+
+def details_body(i):
+    return {
+        'id': 1000 + i, 'name': f'Show {i}', 'original_name': f'Show {i}', 'overview': 'An overview. ' * 20,
+        'first_air_date': '2019-05-01', 'vote_average': 7.5, 'popularity': 12.5,
+        'origin_country': ['US'], 'production_countries': [{'iso_3166_1': 'US', 'name': 'United States'}],
+        'genres': [{'id': 18, 'name': '剧情'}, {'id': 80, 'name': '犯罪'}],
+        'seasons': [{'id': i * 10 + s, 'season_number': s, 'episode_count': 10, 'name': f'Season {s}',
+                     'overview': 'Season overview. ' * 5, 'poster_path': f'/s{s}.jpg'} for s in range(5)],
+        'credits': {'cast': [{'id': c, 'name': f'Actor {c}', 'character': f'Role {c}', 'profile_path': f'/p{c}.jpg'}
+                             for c in range(30)]},
+        'images': {'backdrops': [{'file_path': f'/b{b}.jpg', 'width': 1920, 'height': 1080} for b in range(10)]},
+    }
+
+
+def measure(build, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return (after - before) / count
+
+
+def main(count=20000):
+    names = make_corpus.generate(count)
+    searcher = TMDbSearcher(None)
+
+    def parsed():
+        return [TorrentParser.parse(name) for name in names]
+
+    def enriched():
+        infos = parsed()
+        for i, info in enumerate(infos):
+            info.tmdb_id, info.tmdb_cat = str(1000 + i), 'tv'
+            searcher._apply_details(info, AsObj(details_body(i)))
+        return infos
+
+    print(f"{count} names")
+    print(f"{'parsed':>10}  {measure(parsed, count):8.0f} bytes/TorrentInfo")
+    print(f"{'enriched':>10}  {measure(enriched, count):8.0f} bytes/TorrentInfo")
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,120 @@
+"""
+Query throughput as the number of worker processes on one database grows.
+
+    python benchmarks/bench_workers.py [url] [--workers 1,2,4,8] [--count N]
+
+Like uvicorn --workers N: every process has its own engine, pool and regex
+index, and resolves its share of the corpus names through
+crud.search_and_create_media() with a stand-in searcher, so nothing waits
+on TMDb. Half of the titles are in the catalog beforehand (found locally),
+the other half create media and torrent rows, so workers write
+concurrently too. Prints resolutions/s per worker count.
+
+`url` defaults to a temporary SQLite file with the models.SQLITE_PRAGMAS
+profile. Pass a PostgreSQL URL (postgresql+psycopg://...) to compare:
+its tables are DROPPED and recreated for every run, use a throwaway
+database.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from sqlalchemy.orm import sessionmaker
+
+import parser_corpus
+from app import crud, models, schemas
+from torinfo import TorrentParser
+
+
+class StandInSearcher:
+    """Finds every title, under an id derived from it, so all workers agree."""
+
+    def identifyTMDb(self, torinfo):
+        torinfo.tmdb_cat, torinfo.tmdb_title = 'movie', torinfo.media_title
+        torinfo.tmdb_id = zlib.crc32(torinfo.media_title.encode('utf-8'))
+        torinfo.confidence = 100
+        return True
+
+    def fillTMDbDetails(self, torinfo):
+        return torinfo
+
+    search_tmdb_by_tmdbid = searchTMDbByIMDbId = identifyTMDb
+
+
+def engine_for(url):
+    return models.make_engine(url, models.SQLITE_PRAGMAS if url.startswith('sqlite') else None)
+
+
+def reset(url, names):
+    """Recreates the tables with media rows for every other title."""
+    engine = engine_for(url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    titles = sorted({TorrentParser.parse(name).media_title for name in names})[::2]
+    with sessionmaker(bind=engine)() as db:
+        for title in titles:
+            crud.create_media(db, schemas.MediaCreate(torname_regex=title, tmdb_cat='movie',
+                                                      tmdb_id=zlib.crc32(title.encode('utf-8'))), commit=False)
+        db.commit()
+    engine.dispose()
+
+
+def worker(url, names, barrier, results):
+    engine = engine_for(url)
+    make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    searcher = StandInSearcher()
+    torinfos = [TorrentParser.parse(name) for name in names]
+    with make_session() as db:
+        crud.find_media_by_torname_regex(db, '')  # load the regex index outside the timing
+    barrier.wait()
+    start = time.perf_counter()
+    for torinfo in torinfos:
+        with make_session() as db:
+            crud.search_and_create_media(db, torinfo, searcher)
+    results.put((len(torinfos), time.perf_counter() - start))
+    engine.dispose()
+
+
+def run(url, names, workers):
+    reset(url, names)
+    barrier = multiprocessing.Barrier(workers)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(url, names[i::workers], barrier, results))
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    done = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    # All started together, the slowest one ends the run
+    return sum(count for count, _ in done) / max(elapsed for _, elapsed in done)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('url', nargs='?')
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--count', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    names = [name for name in dict.fromkeys(parser_corpus.load_names()) if TorrentParser.parse(name).media_title]
+    names = names[:args.count]
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{tmp}/bench.db"
+        print(f"{len(names)} names, {url.split('://')[0]}, {os.cpu_count()} CPUs")
+        for workers in [int(w) for w in args.workers.split(',')]:
+            print(f"{workers:>3} workers  {run(url, names, workers):8.0f} resolutions/s")
+
+
+if __name__ == '__main__':
+    from loguru import logger
+    logger.remove()
+    main()
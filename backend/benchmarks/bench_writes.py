@@ -0,0 +1,81 @@
+"""
+Write throughput of the resolution pipeline on a SQLite file, as in a backfill.
+
+    python benchmarks/bench_writes.py [count]
+
+Resolves `count` names from the corpus with a stand-in searcher, so every
+name creates a media row and a torrent row and nothing waits on TMDb.
+Prints resolutions/s with one session per name (like /api/query), all in
+one session, and one session committing every `group` resolutions
+(commit=False, like a bulk backfill).
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import parser_corpus
+from app import crud, models
+from torinfo import TorrentParser
+
+
+class NewMediaSearcher:
+    """Finds a different TMDb id for every name."""
+
+    def __init__(self):
+        self.next_id = 0
+
+    def identifyTMDb(self, torinfo):
+        self.next_id += 1
+        torinfo.tmdb_cat, torinfo.tmdb_id, torinfo.tmdb_title = 'movie', self.next_id, torinfo.media_title
+        torinfo.confidence = 100
+        return True
+
+    def fillTMDbDetails(self, torinfo):
+        return torinfo
+
+
+def run(names, per_name_session, group=1):
+    torinfos = [TorrentParser.parse(name) for name in names]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        models.Base.metadata.create_all(bind=engine)
+        make_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        searcher = NewMediaSearcher()
+        start = time.perf_counter()
+        if per_name_session:
+            for torinfo in torinfos:
+                with make_session() as db:
+                    crud.search_and_create_media(db, torinfo, searcher)
+        else:
+            with make_session() as db:
+                for i, torinfo in enumerate(torinfos, start=1):
+                    crud.search_and_create_media(db, torinfo, searcher, commit=group == 1)
+                    if group > 1 and i % group == 0:
+                        db.commit()
+                db.commit()
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+    return len(torinfos) / elapsed
+
+
+def main(count=1000, group=100):
+    names = [name for name in dict.fromkeys(parser_corpus.load_names()) if TorrentParser.parse(name).media_title][:count]
+    print(f"{len(names)} new media + torrents")
+    print(f"{'session per name':>20}  {run(names, True):8.0f} resolutions/s")
+    print(f"{'one session':>20}  {run(names, False):8.0f} resolutions/s")
+    print(f"{f'commit every {group}':>20}  {run(names, False, group):8.0f} resolutions/s")
+
+
+if __name__ == '__main__':
+    from loguru import logger
+    logger.remove()
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,171 @@
+"""
+Deterministic corpus of synthetic torrent names for the parser benchmarks.
+
+    python benchmarks/make_corpus.py [count] > names.txt
+
+Scene releases, TV packs, CJK titles, music, ebooks, BDMV and odd names,
+weighted roughly like the traffic /api/query sees.
+"""
+import random
+import sys
+
+SEED = 20250814
+
+EN_TITLES = ["The Matrix", "Dune Part Two", "Oppenheimer", "Breaking Bad", "Friends", "CoComelon", "The Last of Us",
+    "Blade Runner 2049", "Rocky II", "Star Wars Episode IV A New Hope", "Fast and Furious VI", "Spider-Man No Way Home",
+    "Game of Thrones", "The Office", "House of the Dragon", "Alien", "Aliens", "The Godfather Part III",
+    "Mission Impossible Dead Reckoning Part One", "John Wick Chapter 4", "Top Gun Maverick", "The Lord of the Rings The Return of the King",
+    "Ghost in the Shell", "Your Name", "Spirited Away", "Parasite", "Amelie", "Leon The Professional", "Se7en", "12 Angry Men",
+    "Doctor Who", "Sherlock", "The Crown", "Stranger Things", "Black Mirror", "Planet Earth II", "Cosmos A Spacetime Odyssey",
+    "Pokemon The Movie", "Detective Conan The Movie", "Jade Solid Gold", "Attack on Titan", "One Piece", "Naruto Shippuden",
+    "The Mandalorian", "Andor", "Severance", "Succession", "Chernobyl", "Band of Brothers", "The Wire", "Twin Peaks",
+    "Mad Max Fury Road", "Inception", "Interstellar", "Tenet", "Memento", "Heat", "Collateral", "Ran", "Seven Samurai",
+    "The Complete Series", "Hannibal", "Dexter New Blood", "Better Call Saul", "Fargo", "True Detective", "Rome",
+    "Extended Edition", "Director's Cut", "Halo", "Arcane", "Blue Eye Samurai", "Shogun"]
+CN_TITLES = ["流浪地球", "三体", "狂飙", "庆余年", "琅琊榜", "甄嬛传", "长安十二时辰", "隐秘的角落", "漫长的季节", "繁花",
+    "让子弹飞", "霸王别姬", "无间道", "卧虎藏龙", "英雄", "功夫", "大话西游之大圣娶亲", "攻壳机动队真人版", "阿拉丁真人版",
+    "普契尼《托斯卡》", "星球大战：新希望", "速度与激情6", "蜘蛛侠：英雄无归", "权力的游戏", "请回答1988", "鬼灭之刃",
+    "进击的巨人", "名侦探柯南", "海贼王", "火影忍者", "千与千寻", "你的名字", "寄生虫", "沙丘2", "奥本海默", "疾速追杀4",
+    "中国奇谭", "西游记", "红楼梦", "水浒传", "三国演义", "天龙八部", "射雕英雄传", "神雕侠侣", "倚天屠龙记", "笑傲江湖",
+    "人世间", "觉醒年代", "山海情", "去有风的地方", "县委大院", "三大队", "封神第一部", "满江红", "消失的她", "孤注一掷"]
+GROUPS = ["SPARKS", "FLUX", "NTb", "CMCT", "FRDS", "CHDWEB", "PTerWEB", "HaresWEB", "OurTV", "ADWeb", "HDSky", "WiKi",
+    "CtrlHD", "EbP", "DON", "NPMS", "EVOLVE", "RARBG", "YTS", "TEPES", "CMCTV", "FLTTH", "PTerMV", "Melon", "PTHAudio",
+    "HDSAB", "RL", "iYY", "QHStudio", "HDCTV", "beAst", "CHD", "MTeam", "TJUPT", "HHWEB", "Audies", "ADE", "BeiTai", "GodDramas"]
+RES = ["2160p", "1080p", "1080i", "720p", "576p", "480p", "4K", ""]
+SRC = ["BluRay", "Blu-ray", "UHD BluRay", "WEB-DL", "WEBRip", "WEB", "HDTV", "NF WEB-DL", "AMZN WEB-DL", "DSNP WEB-DL", "BDRip", "Remux", "BluRay REMUX", "DVD", "DVDRip", ""]
+VC = ["x264", "x265", "x265 10bit", "H.264", "H.265", "H264", "HEVC", "AVC", "DoVi HDR HEVC", "HEVC HDR", "H.265 DV", ""]
+AC = ["DTS-HD MA 5.1", "DTS-HD MA 7.1", "TrueHD 7.1 Atmos", "DDP5.1", "DDP 5.1 Atmos", "DDP2.0", "AAC", "AAC 2.0", "FLAC 2.0", "LPCM 2.0", "DTS", "DD+ 5.1", "DD 5.1", "AC3", ""]
+EXT = ["", "", "", ".mkv", ".mp4", ".ts", ".iso", ".torrent", ".m2ts"]
+TAGS = ["", "", "", "REPACK", "PROPER", "EXTENDED", "UNRATED", "REMASTERED", "iNTERNAL", "LIMITED", "COMPLETE", "Director's Cut"]
+YEARS = list(range(1954, 2026))
+
+
+def sep(parts, s):
+    return s.join(p for p in parts if p)
+
+
+def scene(rng):
+    t = rng.choice(EN_TITLES)
+    y = str(rng.choice(YEARS)) if rng.random() < 0.85 else ""
+    s = rng.choice(['.', '.', ' ', '_'])
+    parts = t.split() + [y, rng.choice(TAGS).replace(' ', s), rng.choice(RES), rng.choice(SRC).replace(' ', s), rng.choice(AC).replace(' ', s), rng.choice(VC).replace(' ', s)]
+    name = sep(parts, s)
+    if rng.random() < 0.8:
+        name += '-' + rng.choice(GROUPS)
+    return name + rng.choice(EXT)
+
+
+def tv(rng):
+    t = rng.choice(EN_TITLES)
+    s = rng.choice(['.', '.', ' '])
+    se = rng.choice([
+        "S%02d" % rng.randint(1, 12), "S%02dE%02d" % (rng.randint(1, 9), rng.randint(1, 24)),
+        "S01-S%02d" % rng.randint(2, 10), "E%02d" % rng.randint(1, 99), "Ep%02d-Ep%02d" % (1, rng.randint(2, 40)),
+        "Season %d" % rng.randint(1, 8), "S%02d+S%02d" % (1, 2), "Complete", "The Complete Series"])
+    y = str(rng.choice(YEARS)) if rng.random() < 0.5 else ""
+    parts = t.split() + ([y] if rng.random() < 0.5 else []) + se.split() + ([] if y and rng.random() < 0.5 else [y]) + [rng.choice(RES), rng.choice(SRC).replace(' ', s), rng.choice(VC).replace(' ', s), rng.choice(AC).replace(' ', s)]
+    name = sep(parts, s)
+    if rng.random() < 0.85:
+        name += '-' + rng.choice(GROUPS)
+    return name + rng.choice(EXT)
+
+
+def cjk(rng):
+    cn = rng.choice(CN_TITLES)
+    en = rng.choice(EN_TITLES)
+    y = str(rng.choice(YEARS))
+    form = rng.randrange(8)
+    tail = sep([rng.choice(RES), rng.choice(SRC), rng.choice(VC), rng.choice(AC)], ' ')
+    g = rng.choice(GROUPS)
+    season = rng.choice(["", "", "第%d季" % rng.randint(1, 5), "第二季", "全%d集" % rng.randint(10, 60), "S%02d" % rng.randint(1, 5), "第%02d集" % rng.randint(1, 40)])
+    if form == 0:
+        return "[%s].%s.%s.%s-%s" % (cn, en.replace(' ', '.'), y, tail.replace(' ', '.'), g)
+    if form == 1:
+        return "%s %s %s %s %s-%s" % (cn, en, season, y, tail, g)
+    if form == 2:
+        return "【高清影视之家发布 www.hdbthd.com】%s[%s版].%s.%s.%s-%s" % (cn, rng.choice(["国语中字", "高码", "杜比视界", "60帧"]), en.replace(' ', '.'), y, tail.replace(' ', '.'), g)
+    if form == 3:
+        return "%s.%s.%s.%s.%s-%s" % (cn, season or 'S01', y, rng.choice(RES), rng.choice(SRC).replace(' ', '.'), g)
+    if form == 4:
+        return "%s %s" % (cn, season) if season else cn + " " + y
+    if form == 5:
+        return "%s AKA %s %s %s" % (en, cn, y, tail)
+    if form == 6:
+        return "%s / %s %s %s-%s" % (cn, en, y, tail, g)
+    return "%s%s %s %s %s" % (rng.choice(["CCTV1HD ", "BTV ", "HunanTV ", "Jade ", ""]), cn, season, y, tail)
+
+
+ARTISTS = ["Adele", "Taylor Swift", "周杰伦", "王菲", "邓丽君", "Beethoven", "Schubert", "Karajan", "Pink Floyd", "The Beatles", "Various Artists", "Miles Davis", "陈奕迅", "久石让"]
+
+
+def music(rng):
+    a = rng.choice(ARTISTS)
+    alb = rng.choice(["30", "Folklore", "最伟大的作品", "Symphonies", "Kind of Blue", "Abbey Road", "The Dark Side of the Moon", "精选集", "十年", "菲靡靡之音", "Piano Sonatas"])
+    y = str(rng.choice(YEARS))
+    f = rng.randrange(9)
+    if f == 0: return "%s - %s (%s) [FLAC 24-96]" % (a, alb, y)
+    if f == 1: return "%s - %s %dCD FLAC" % (a, alb, rng.randint(1, 6))
+    if f == 2: return "%s - %s %s FLAC" % (a, alb, y)
+    if f == 3: return "%s - %s [MQA] 24Bit-192kHz" % (a, alb)
+    if f == 4: return "%s.-.%s.%s.WEB.FLAC-%s" % (a.replace(' ', '.'), alb.replace(' ', '.'), y, rng.choice(GROUPS))
+    if f == 5: return "%s《%s》%s 整轨 WAV+CUE" % (a, alb, y)
+    if f == 6: return "%s %s 演唱会 %s %s %s-%s" % (a, alb, y, rng.choice(RES), rng.choice(SRC), rng.choice(GROUPS))
+    if f == 7: return "%s - Live at Wembley %s %s BluRay-%s" % (a, y, rng.choice(RES), rng.choice(["PTerMV", "FHDMv", "Melon"]))
+    return "%s - %s (%s) MP3 320kbps" % (a, alb, y)
+
+
+BOOKS = ["三体全集", "金庸作品集", "Python Crash Course 3rd Edition", "明朝那些事儿", "Clean Code", "红楼梦脂评本", "高等数学 第7版", "鲁迅全集", "哈利波特", "时间简史", "The Art of Computer Programming"]
+
+
+def ebook(rng):
+    b = rng.choice(BOOKS)
+    f = rng.randrange(7)
+    if f == 0: return "%s.%s" % (b, rng.choice(["pdf", "epub", "mobi", "azw3", "txt", "chm", "docx"]))
+    if f == 1: return "%s epub mobi azw3" % b
+    if f == 2: return "%s 全%d册" % (b, rng.randint(2, 36))
+    if f == 3: return "%s 精装版 %s" % (b, rng.choice(["PDF版", "修订版", "新修版"]))
+    if f == 4: return "%s (%s) eBook-%s" % (b, rng.choice(YEARS), rng.choice(["BitBook", "DeBTBook", "iBook"]))
+    if f == 5: return "%s %d本 %s" % (b, rng.randint(2, 20), rng.choice(["系列", "作品集", "全集"]))
+    return "%s.%s" % (b, rng.choice(["zip", "7z", "rar"]))
+
+
+def bdmv(rng):
+    t = rng.choice(EN_TITLES + CN_TITLES)
+    y = str(rng.choice(YEARS))
+    f = rng.randrange(6)
+    g = rng.choice(GROUPS)
+    if f == 0: return "%s %s %s UHD Blu-ray %s %s-%s" % (t, y, rng.choice(["2160p", "1080p"]), rng.choice(["HEVC", "AVC"]), rng.choice(AC), g)
+    if f == 1: return "[BDMV] %s %s" % (t, y)
+    if f == 2: return "%s.%s.%s.BluRay.AVC.%s-%s" % (t.replace(' ', '.'), y, rng.choice(["1080p", "2160p", "1080i"]), rng.choice(AC).replace(' ', '.'), g)
+    if f == 3: return "BD-50_%s_%s_BC" % (t.upper().replace(' ', '_'), y)
+    if f == 4: return "%s %s %s" % (t, y, rng.choice(["BD25", "BD50", "BD66", "DVD9", "DVD5", "DVDR"]))
+    return "%s %s 1080p Blu-ray %s BDMV" % (t, y, rng.choice(AC))
+
+
+def other(rng):
+    return rng.choice(["Some Random Software v1.2.3", "Windows 11 23H2 x64 MSDN", "Adobe Photoshop 2024",
+        "Beethoven_-_Symphony_No_9", "MiniSD %s %s" % (rng.choice(EN_TITLES), rng.choice(YEARS)),
+        "%s 电影版 %s" % (rng.choice(CN_TITLES), rng.choice(YEARS)), "%s The Movie %s 1080p WEB-DL" % (rng.choice(EN_TITLES), rng.choice(YEARS)),
+        "%s Bugs!.mp4" % rng.choice(ARTISTS), "%s.Concert.%s.1080p.WEB-DL-%s" % (rng.choice(ARTISTS).replace(' ', '.'), rng.choice(YEARS), rng.choice(GROUPS)),
+        "%s 1080p" % rng.choice(CN_TITLES), "%s" % rng.choice(EN_TITLES), "%s.mpg" % rng.choice(EN_TITLES),
+        "Top 100 Movies Collection", "%s Trilogy %s-%s 1080p BluRay x264" % (rng.choice(EN_TITLES), rng.choice(YEARS), rng.choice(YEARS))])
+
+
+GENS = [(scene, 30), (tv, 22), (cjk, 22), (music, 8), (ebook, 6), (bdmv, 7), (other, 5)]
+
+
+def generate(n=5000, seed=SEED):
+    """Returns `n` distinct names, always the same ones for the same seed."""
+    rng = random.Random(seed)
+    pool = [g for g, w in GENS for _ in range(w)]
+    seen, out = set(), []
+    while len(out) < n:
+        name = rng.choice(pool)(rng).strip()
+        if name and name not in seen:
+            seen.add(name); out.append(name)
+    return out
+
+
+if __name__ == '__main__':
+    for name in generate(int(sys.argv[1]) if len(sys.argv) > 1 else 5000):
+        print(name)
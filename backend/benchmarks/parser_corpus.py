@@ -0,0 +1,73 @@
+"""
+The checked-in parser corpus and the outputs expected for it.
+
+    python benchmarks/parser_corpus.py --write
+
+corpus/names-<VERSION>.txt holds the names, one per line, as made by
+make_corpus.generate(). corpus/expected-<VERSION>.jsonl holds what every
+parser stage returns for each of them; tests/test_parser_corpus.py checks
+the parsers against it. A change that is meant to alter parse results
+regenerates the expected file with --write, and the diff shows exactly
+which names changed. Bump VERSION when the names themselves change.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+import make_corpus
+import torcategory
+import tortitle
+from torinfo import TorrentParser
+
+VERSION = 'v1'
+COUNT = 5000
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+NAMES_PATH = os.path.join(CORPUS_DIR, f'names-{VERSION}.txt')
+EXPECTED_PATH = os.path.join(CORPUS_DIR, f'expected-{VERSION}.jsonl')
+
+
+def load_names():
+    with open(NAMES_PATH, encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def load_expected():
+    with open(EXPECTED_PATH, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def describe(name):
+    """Everything the parser stages make of `name`, as plain JSON values."""
+    tc = torcategory.TorCategory(name)
+    tt = tortitle.TorTitle(name)
+    t = TorrentParser.parse(name)
+    return {
+        'name': name,
+        'category': [tc.ccfcat, tc.group, tc.resolution, tc.quality],
+        'title': tt.to_dict(),
+        'media_info': list(tt.parse_more(name)),
+        'torinfo': {
+            'tmdb_cat': t.tmdb_cat, 'media_title': t.media_title, 'season': t.season, 'episode': t.episode,
+            'year': t.year, 'resolution': t.resolution, 'source': t.source, 'video_codec': t.video_codec,
+            'audio_codec': t.audio_codec, 'group': t.group, 'subtitle': t.subtitle,
+        },
+    }
+
+
+def write():
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    if not os.path.exists(NAMES_PATH):
+        with open(NAMES_PATH, 'w', encoding='utf-8', newline='\n') as f:
+            f.writelines(name + '\n' for name in make_corpus.generate(COUNT))
+    with open(EXPECTED_PATH, 'w', encoding='utf-8', newline='\n') as f:
+        for name in load_names():
+            f.write(json.dumps(describe(name), ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['--write']:
+        sys.exit(__doc__)
+    write()
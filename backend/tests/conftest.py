@@ -0,0 +1,32 @@
+import os
+from sqlalchemy import MetaData, create_engine
+import pytest
+
+# e.g. postgresql+psycopg://postgres@localhost/tpdb_test. Everything in that database is dropped.
+POSTGRES_URL = os.environ.get("TPDB_TEST_POSTGRES_URL")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgresql: runs against the database of TPDB_TEST_POSTGRES_URL")
+
+
+def _drop_everything(url):
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        metadata = MetaData()
+        metadata.reflect(bind=conn)
+        metadata.drop_all(bind=conn)
+    engine.dispose()
+
+
+@pytest.fixture(params=["sqlite", pytest.param("postgresql", marks=pytest.mark.postgresql)])
+def database_url(request, tmp_path):
+    """An empty database: a SQLite file, then PostgreSQL when TPDB_TEST_POSTGRES_URL is set."""
+    if request.param == "sqlite":
+        yield f"sqlite:///{tmp_path}/test.db"
+        return
+    if not POSTGRES_URL:
+        pytest.skip("set TPDB_TEST_POSTGRES_URL to run against PostgreSQL")
+    _drop_everything(POSTGRES_URL)
+    yield POSTGRES_URL
+    _drop_everything(POSTGRES_URL)
@@ -0,0 +1,130 @@
+import sys
+import os
+import asyncio
+import gc
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from asynctmdbsearcher import AsyncTMDbSearcher, TMDB_API_BASE
+from tmdbcache import TMDbCache
+from torinfo import TorrentParser
+from app.utils import format_genres
+
+MATRIX = {"id": 603, "title": "黑客帝国", "original_title": "The Matrix", "release_date": "1999-03-31",
+          "original_language": "en", "popularity": 80.0, "poster_path": "/matrix.jpg", "genre_ids": [28]}
+
+
+def make_searcher(requests, cache=None, speculative=0):
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path == "/3/search/movie":
+            assert request.url.params["query"] in ("The Matrix", "Matrix")
+            return httpx.Response(200, json={"page": 1, "results": [MATRIX]})
+        if request.url.path == "/3/movie/603":
+            return httpx.Response(200, json=dict(MATRIX, overview="...", vote_average=8.2,
+                                                 genres=[{"id": 28, "name": "动作"}],
+                                                 production_countries=[{"iso_3166_1": "US"}]))
+        return httpx.Response(404, json={"success": False, "status_code": 34, "status_message": "Not found"})
+
+    searcher = AsyncTMDbSearcher("key", cache=cache, speculative=speculative)
+    searcher._client = httpx.AsyncClient(base_url=TMDB_API_BASE, transport=httpx.MockTransport(handler))
+    return searcher
+
+
+def test_blind_search_and_details(tmp_path):
+    requests = []
+    searcher = make_searcher(requests, cache=TMDbCache(str(tmp_path / "cache.db")))
+    torinfo = TorrentParser.parse("The.Matrix.1999.1080p.BluRay.x264-SPARKS")
+    assert asyncio.run(searcher.searchTMDb(torinfo))
+    assert (torinfo.tmdb_cat, torinfo.tmdb_id, torinfo.year) == ("movie", 603, 1999)
+    assert torinfo.production_countries == "US"
+    # Only the used part of the details response is kept
+    assert torinfo.tmdbDetails.genres == ((28, "动作"),)
+    assert format_genres(torinfo) == "动作"
+    assert requests == ["/3/search/movie", "/3/movie/603"]
+
+    # Served from the shared response cache the second time
+    torinfo = TorrentParser.parse("The.Matrix.1999.2160p.WEB-DL.x265-FLUX")
+    assert asyncio.run(searcher.searchTMDb(torinfo))
+    assert len(requests) == 2
+
+
+def test_unknown_id_is_not_found():
+    searcher = make_searcher([])
+    torinfo = TorrentParser.parse("Unknown.2020.1080p.WEB-DL")
+    torinfo.tmdb_cat, torinfo.tmdb_id = "movie", "1"
+    assert not asyncio.run(searcher.search_tmdb_by_tmdbid(torinfo))
+
+
+def test_speculative_search_keeps_list_order():
+    requests = []
+    searcher = make_searcher(requests, speculative=3)
+    search_list = [("tv", "The Matrix"), ("movie", "The Matrix"), ("movie", "Matrix")]
+    category, result, match_type, failed = asyncio.run(searcher._run_search_list(search_list, 1999, "1999"))
+    # The tv search finds nothing; the first movie entry wins over the later one
+    assert (category, result.id, failed) == ("movie", 603, True)
+    assert sorted(requests) == ["/3/search/movie", "/3/search/movie", "/3/search/tv"]
+
+
+def test_speculative_losers_are_collected():
+    searcher = make_searcher([], speculative=2)
+    search = searcher._perform_search
+
+    async def perform_search(term, category, year, stryear):
+        if term != "Matrix":
+            return await search(term, category, year, stryear)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # e.g. a connection that fails to close
+            raise RuntimeError("failed while being cancelled")
+
+    searcher._perform_search = perform_search
+    unretrieved = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        found = await searcher._run_search_list([("movie", "The Matrix"), ("movie", "Matrix")], 1999, "1999")
+        await asyncio.sleep(0)
+        gc.collect()
+        return found
+
+    category, result, _, _ = asyncio.run(run())
+    assert (category, result.id) == ("movie", 603)
+    assert unretrieved == []
+
+
+def test_cache_reads_do_not_stall_the_loop(tmp_path):
+    import time
+    cache = TMDbCache(str(tmp_path / "cache.db"))
+    get = cache.get
+
+    def slow_get(*args):
+        time.sleep(0.3)  # like a busy disk
+        return get(*args)
+
+    cache.get = slow_get
+    searcher = make_searcher([], cache=cache)
+
+    async def run():
+        gaps, last = [], time.perf_counter()
+
+        async def heartbeat():
+            nonlocal last
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        beat = asyncio.ensure_future(heartbeat())
+        torinfo = TorrentParser.parse("The.Matrix.1999.1080p.BluRay.x264-SPARKS")
+        found = await searcher.searchTMDb(torinfo)
+        beat.cancel()
+        return found, max(gaps)
+
+    found, longest_gap = asyncio.run(run())
+    assert found
+    assert longest_gap < 0.2
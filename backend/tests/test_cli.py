@@ -0,0 +1,100 @@
+import sys
+import os
+import io
+import json
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from app import cli, crud, models
+
+
+class MatrixSearcher:
+    """Blind search finds The Matrix for anything with Matrix in it."""
+
+    async def identifyTMDb(self, torinfo):
+        await asyncio.sleep(0)
+        if "Matrix" not in torinfo.torname:
+            return False
+        torinfo.tmdb_cat, torinfo.tmdb_id, torinfo.tmdb_title = "movie", 603, "The Matrix"
+        torinfo.confidence = 50
+        return True
+
+    async def fillTMDbDetails(self, torinfo):
+        return torinfo
+
+
+def test_resolve_lines_streams_results_in_order():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    lines = [
+        "The.Matrix.1999.1080p.BluRay.x264-SPARKS\n",
+        "Matrix.Reloaded.2003.1080p.BluRay.x264-SPARKS\n",
+        "\n",
+        "Heat.1995.1080p.BluRay.x264\n",
+        "The.Matrix.1999.1080p.BluRay.x264-SPARKS\n",
+    ]
+    out = io.StringIO()
+    count = asyncio.run(cli.resolve_lines(iter(lines), MatrixSearcher(), session_factory, out, concurrency=3))
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert count == 4
+    assert [r["line"] for r in results] == [0, 1, 3, 4]
+    assert [r["stage"] for r in results] == [crud.STAGE_BLIND_SEARCH, crud.STAGE_BLIND_LOCAL,
+                                             crud.STAGE_NOT_FOUND, crud.STAGE_TORRENT]
+    assert [r["tmdb_id"] for r in results] == [603, 603, None, 603]
+    assert all(r["elapsed_ms"] >= 0 and "error" not in r for r in results)
+
+    # Resuming skips the lines already done
+    out = io.StringIO()
+    asyncio.run(cli.resolve_lines(iter(lines), MatrixSearcher(), session_factory, out, offset=4))
+    assert [json.loads(line)["line"] for line in out.getvalue().splitlines()] == [4]
+
+
+def test_torcp2_modules_are_loaded_once():
+    # A second copy (torinfo and torcp2.torinfo) has its own classes and parse cache
+    import subprocess
+    code = (
+        "import sys\n"
+        "from app import cli, crud, utils\n"
+        "import asynctmdbsearcher, torinfo\n"
+        "assert not [name for name in sys.modules if name.startswith('torcp2.')], sorted(sys.modules)\n"
+        "assert crud.TorrentInfo is torinfo.TorrentInfo\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True,
+                   cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def test_names_of_one_title_in_flight_create_one_media(tmp_path):
+    engine = models.make_engine(f"sqlite:///{tmp_path}/cli.db", models.SQLITE_PRAGMAS)
+    models.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+    class SlowDetails(MatrixSearcher):
+        details = 0
+
+        async def fillTMDbDetails(self, torinfo):
+            self.details += 1
+            await asyncio.sleep(0.05)
+            return torinfo
+
+    searcher = SlowDetails()
+    lines = ["The.Matrix.1999.1080p.BluRay.x264-SPARKS", "Matrix.1999.2160p.WEB-DL.x265-FLUX",
+             "The.Matrix.1999.720p.HDTV.x264-CTU"]
+    out = io.StringIO()
+    asyncio.run(cli.resolve_lines(iter(lines), searcher, session_factory, out, concurrency=3))
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert [r["stage"] for r in results] == [crud.STAGE_BLIND_SEARCH, crud.STAGE_BLIND_LOCAL, crud.STAGE_BLIND_LOCAL]
+    assert len({r["media_id"] for r in results}) == 1
+    assert searcher.details == 1
+    with session_factory() as db:
+        assert db.query(models.Media).count() == 1
+        assert db.query(models.Torrent).count() == 3
+    engine.dispose()
@@ -0,0 +1,269 @@
+import sys
+import os
+import asyncio
+from sqlalchemy.orm import sessionmaker
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from app import crud, models, schemas
+from torinfo import TorrentParser
+
+
+@pytest.fixture
+def db(database_url):
+    engine = models.make_engine(database_url, models.SQLITE_PRAGMAS)
+    models.Base.metadata.create_all(bind=engine)
+    # Like SessionLocal
+    session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class FakeSearcher:
+    """Blind search always finds The Matrix."""
+
+    def __init__(self):
+        self.calls = []
+        self.details = []
+
+    def _found(self, torinfo):
+        self.calls.append(torinfo.torname)
+        torinfo.tmdb_cat, torinfo.tmdb_id, torinfo.tmdb_title = "movie", 603, "The Matrix"
+        torinfo.confidence = 50
+        return True
+
+    def identifyTMDb(self, torinfo):
+        return self._found(torinfo)
+
+    def fillTMDbDetails(self, torinfo):
+        self.details.append(torinfo.torname)
+        return torinfo
+
+    search_tmdb_by_tmdbid = searchTMDbByIMDbId = identifyTMDb
+
+
+class AsyncFakeSearcher(FakeSearcher):
+    async def identifyTMDb(self, torinfo):
+        await asyncio.sleep(0)
+        return self._found(torinfo)
+
+    search_tmdb_by_tmdbid = searchTMDbByIMDbId = identifyTMDb
+
+
+def test_blocking_and_async_pipeline(db):
+    searcher = FakeSearcher()
+    media = crud.search_and_create_media(db, TorrentParser.parse("The.Matrix.1999.1080p.BluRay.x264-SPARKS"), searcher)
+    assert media.tmdb_id == 603
+    assert searcher.details == ["The.Matrix.1999.1080p.BluRay.x264-SPARKS"]
+    # Known torrent name, no search
+    crud.search_and_create_media(db, TorrentParser.parse("The.Matrix.1999.1080p.BluRay.x264-SPARKS"), searcher)
+    assert len(searcher.calls) == 1
+
+    searcher = AsyncFakeSearcher()
+    torinfo = TorrentParser.parse("Matrix.Reloaded.2003.1080p.BluRay.x264-SPARKS")
+    assert asyncio.run(crud.search_and_create_media_async(db, torinfo, searcher)).id == media.id
+    assert len(media.torrents) == 2
+    # Identified as media that already exists, so the details were never fetched
+    assert searcher.details == []
+
+    with pytest.raises(RuntimeError):
+        crud.search_and_create_media(db, TorrentParser.parse("Heat.1995.1080p.BluRay.x264"), searcher)
+
+
+def test_resolve_local_many(db):
+    matrix = crud.create_media(db, schemas.MediaCreate(torname_regex="The Matrix", tmdb_id=603, tmdb_cat="movie", imdb_id="tt0133093"))
+    heat = crud.create_media(db, schemas.MediaCreate(torname_regex="Heat", tmdb_id=949, tmdb_cat="movie"))
+    crud.create_torrent(db, TorrentParser.parse("Heat.1995.1080p.BluRay.x264-KNOWN"), heat.id)
+
+    def torinfo(name, tmdb=None, imdb=None):
+        t = TorrentParser.parse(name)
+        if tmdb:
+            t.tmdb_cat, t.tmdb_id = tmdb
+        if imdb:
+            t.tmdb_cat, t.imdb_id = "movie", imdb
+        return t
+
+    torinfos = [
+        torinfo("Heat.1995.1080p.BluRay.x264-KNOWN"),
+        torinfo("Some.Name.2000.1080p.WEB-DL", tmdb=("movie", "949")),
+        torinfo("Other.Name.2001.1080p.WEB-DL", imdb="tt0133093"),
+        torinfo("The.Matrix.1999.2160p.WEB-DL.x265-FLUX"),
+        torinfo("Unknown.Name.2002.1080p.WEB-DL", tmdb=("tv", "1")),
+        torinfo("Nothing.Here.2003.1080p.WEB-DL"),
+    ]
+    results = crud.resolve_local_many(db, torinfos)
+    assert [(m.id if m else None, stage) for m, stage in results] == [
+        (heat.id, crud.STAGE_TORRENT),
+        (heat.id, crud.STAGE_TMDB_ID),
+        (matrix.id, crud.STAGE_IMDB_ID),
+        (matrix.id, crud.STAGE_REGEX),
+        (None, None),
+        (None, None),
+    ]
+    # The local hits were recorded like single queries record them
+    assert crud.find_torrent_by_name(db, "Some.Name.2000.1080p.WEB-DL").media_id == heat.id
+    assert crud.find_torrent_by_name(db, "Nothing.Here.2003.1080p.WEB-DL") is None
+
+
+def test_one_commit_per_resolution(db):
+    from sqlalchemy import event
+    from app.regex_index import get_regex_index
+
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(1))
+    index = get_regex_index(db)
+
+    media = crud.search_and_create_media(db, TorrentParser.parse("The.Matrix.1999.1080p.BluRay.x264-SPARKS"), FakeSearcher())
+    assert len(commits) == 1
+    assert list(index.matches("The Matrix")) == [media.id]
+
+    # Left to the caller: nothing is visible to the index until it commits, nothing stays on rollback
+    class HeatSearcher(FakeSearcher):
+        def identifyTMDb(self, torinfo):
+            super().identifyTMDb(torinfo)
+            torinfo.tmdb_id, torinfo.tmdb_title = 949, "Heat"
+            return True
+
+    heat = crud.search_and_create_media(db, TorrentParser.parse("Heat.1995.1080p.BluRay.x264"), HeatSearcher(), commit=False)
+    assert heat.id and len(commits) == 1
+    assert list(index.matches("Heat")) == []
+    db.rollback()
+    assert db.query(models.Media).count() == 1
+    assert db.query(models.Torrent).count() == 1
+    assert len(index) == 1
+
+
+def test_create_torrent_keeps_first_media(db):
+    matrix = crud.create_media(db, schemas.MediaCreate(torname_regex="The Matrix", tmdb_id=603, tmdb_cat="movie"))
+    heat = crud.create_media(db, schemas.MediaCreate(torname_regex="Heat", tmdb_id=949, tmdb_cat="movie"))
+    torinfo = TorrentParser.parse("Heat.1995.1080p.BluRay.x264")
+    torinfo.infolink = "https://example.org/1"
+    first = crud.create_torrent(db, torinfo, matrix.id)
+    # Same name again, e.g. from a second worker: no IntegrityError, the first answer stays
+    torinfo.infolink = None
+    second = crud.create_torrent(db, torinfo, heat.id)
+    assert second.id == first.id and second.media_id == matrix.id
+    assert second.infolink == "https://example.org/1"
+    assert db.query(models.Torrent).count() == 1
+    assert [t.name for t in crud.get_media(db, heat.id, with_torrents=True).torrents] == []
+
+
+def test_media_pages_by_cursor(db):
+    for tmdb_id in [5, 3, 3, 9, 1, 7]:
+        crud.create_media(db, schemas.MediaCreate(torname_regex=f"Title {tmdb_id}", tmdb_id=tmdb_id, tmdb_cat="movie"))
+    crud.create_media(db, schemas.MediaCreate(torname_regex="No TMDb id"))
+
+    by_skip = [[m.tmdb_id for m in crud.get_all_media(db, skip=skip, limit=2)["items"]] for skip in (0, 2, 4)]
+    assert by_skip == [[1, 3, 3], [5, 7], [9]]
+
+    pages, cursor = [], None
+    while True:
+        page = crud.get_all_media(db, limit=2, after=cursor)
+        assert page["total"] == 5
+        pages.append([m.tmdb_id for m in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == by_skip
+
+    with pytest.raises(ValueError):
+        crud.get_all_media(db, after="not-a-cursor")
+
+
+def test_media_listing_query_count(db):
+    for tmdb_id in range(1, 9):
+        media = crud.create_media(db, schemas.MediaCreate(torname_regex=f"Title {tmdb_id}", tmdb_id=tmdb_id, tmdb_cat="movie"))
+        for n in range(2):
+            crud.create_torrent(db, TorrentParser.parse(f"Title.{tmdb_id}.{n}.1080p.WEB-DL"), media.id)
+    db.expire_all()
+
+    def listing(limit):
+        # What read_all_media does, serialization included
+        db.expire_all()
+        with models.count_queries(db.get_bind()) as statements:
+            page = schemas.MediaPage.model_validate(crud.get_all_media(db, limit=limit))
+        assert sum(len(m.torrents) for m in page.items) == 2 * len(page.items)
+        return len(statements)
+
+    # total, tmdb_ids, media, torrents: the same for 2 items or 8
+    assert listing(2) == listing(8) == 4
+
+    media_id = media.id
+    db.expire_all()
+    with models.count_queries(db.get_bind()) as statements:
+        schemas.Media.model_validate(crud.get_media(db, media_id, with_torrents=True))
+    assert len(statements) == 2
+
+    db.expire_all()
+    with models.count_queries(db.get_bind()) as statements:
+        found = crud.get_media_many(db, range(1, 9))
+        [schemas.Media.model_validate(m) for m in found.values()]
+    assert len(found) == 8 and len(statements) == 2
+
+
+def test_media_group_total_matches_recount(db):
+    from sqlalchemy import func
+
+    def check():
+        recount = db.query(func.count(models.Media.tmdb_id.distinct())).scalar()
+        assert crud.count_media_groups(db) == recount
+        assert crud.get_all_media(db)["total"] == recount
+        per_group = dict(db.query(models.Media.tmdb_id, func.count())
+                         .filter(models.Media.tmdb_id != None).group_by(models.Media.tmdb_id))
+        assert dict(db.query(models.MediaGroup.tmdb_id, models.MediaGroup.media_count)) == per_group
+        return recount
+
+    ids = [crud.create_media(db, schemas.MediaCreate(torname_regex=f"T{i}", tmdb_id=tmdb_id, tmdb_cat="movie")).id
+           for i, tmdb_id in enumerate([1, 1, 2, 3, None])]
+    assert check() == 3
+    crud.update_media(db, ids[2], schemas.MediaUpdate(tmdb_id=1))
+    assert check() == 2
+    crud.update_media(db, ids[4], schemas.MediaUpdate(tmdb_id=4))
+    crud.update_media(db, ids[3], schemas.MediaUpdate(torname_regex="Other"))
+    assert check() == 3
+    crud.delete_media(db, ids[0])
+    crud.delete_media(db, ids[3])
+    assert check() == 2
+    # Not committed, not counted
+    crud.create_media(db, schemas.MediaCreate(torname_regex="T5", tmdb_id=5), commit=False)
+    db.rollback()
+    assert check() == 2
+
+
+def test_media_groups_kept_without_crud(database_url):
+    # Writes that never import crud, like a script using the models alone
+    import subprocess
+    code = (
+        "import sys\n"
+        "from sqlalchemy import create_engine\n"
+        "from sqlalchemy.orm import Session\n"
+        "from app import models\n"
+        "engine = create_engine(sys.argv[1])\n"
+        "models.Base.metadata.create_all(bind=engine)\n"
+        "with Session(engine) as db:\n"
+        "    db.add_all([models.Media(torname_regex='A', tmdb_id=1), models.Media(torname_regex='B', tmdb_id=1)])\n"
+        "    db.commit()\n"
+        "    assert db.get(models.MediaGroup, 1).media_count == 2\n"
+        "assert 'app.crud' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code, database_url], check=True,
+                   cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def test_writes_are_serialized_without_select(db):
+    def serialized(media):
+        with models.count_queries(db.get_bind()) as statements:
+            schemas.Media.model_validate(media)
+        return statements
+
+    media = crud.create_media(db, schemas.MediaCreate(torname_regex="Heat", tmdb_id=949, tmdb_cat="movie"))
+    assert serialized(media) == []
+    media = crud.update_media(db, media.id, schemas.MediaUpdate(custom_title="Heat (1995)"))
+    assert serialized(media) == []
+
+    media = crud.search_and_create_media(db, TorrentParser.parse("The.Matrix.1999.1080p.BluRay.x264-SPARKS"), FakeSearcher())
+    assert serialized(media) == []
+    assert [t.name for t in media.torrents] == ["The.Matrix.1999.1080p.BluRay.x264-SPARKS"]
@@ -0,0 +1,79 @@
+import sys
+import os
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from app import crud, migrations, models
+
+# The schema create_all made before schema_version existed
+OLD_SCHEMA = [
+    "CREATE TABLE media (id INTEGER PRIMARY KEY, torname_regex VARCHAR NOT NULL, tmdb_id INTEGER, imdb_id VARCHAR,"
+    " tmdb_title VARCHAR, tmdb_cat VARCHAR, tmdb_poster VARCHAR, tmdb_year INTEGER, tmdb_genres VARCHAR,"
+    " tmdb_overview VARCHAR, original_language VARCHAR, release_air_date VARCHAR, origin_country VARCHAR,"
+    " original_title VARCHAR, production_countries VARCHAR, custom_title VARCHAR, custom_path VARCHAR)",
+    "CREATE INDEX ix_media_id ON media (id)",
+    "CREATE INDEX ix_media_torname_regex ON media (torname_regex)",
+    "CREATE INDEX ix_media_tmdb_id ON media (tmdb_id)",
+    "CREATE INDEX ix_media_imdb_id ON media (imdb_id)",
+    "CREATE TABLE torrents (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, infolink VARCHAR,"
+    " subtitle VARCHAR(200), media_id INTEGER NOT NULL REFERENCES media (id))",
+    "CREATE INDEX ix_torrents_id ON torrents (id)",
+    "INSERT INTO media (torname_regex, tmdb_id, tmdb_cat) VALUES ('The Matrix', 603, 'movie'),"
+    " ('Matrix', 603, 'movie'), ('Heat', 949, 'movie'), ('Unknown', NULL, NULL)",
+    "INSERT INTO torrents (name, media_id) VALUES ('The.Matrix.1999.1080p', 1)",
+]
+
+
+def version(engine):
+    with engine.connect() as conn:
+        return conn.execute(migrations.schema_version.select()).scalar()
+
+
+def test_old_database_is_upgraded(database_url):
+    engine = models.make_engine(database_url, models.SQLITE_PRAGMAS)
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            conn.execute(text(statement if sqlite else statement.replace("INTEGER PRIMARY KEY", "SERIAL PRIMARY KEY")))
+    if sqlite:
+        problems = migrations.check_query_plans(engine)
+        assert [p.split(" does not")[0] for p in problems] == ["torrents of media", "media by tmdb id"]
+
+    assert migrations.upgrade(engine) == 0
+    assert version(engine) == migrations.LATEST
+    assert migrations.check_query_plans(engine) == []
+    indexes = {index["name"] for index in inspect(engine).get_indexes("media")}
+    assert "ix_media_tmdb_cat_tmdb_id" in indexes
+    with models.sessionmaker(bind=engine)() as db:
+        assert crud.count_media_groups(db) == 2
+        assert db.get(models.MediaGroup, 603).media_count == 2
+
+    # Already up to date: nothing runs again
+    assert migrations.upgrade(engine) == migrations.LATEST
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_version")).scalar() == 1
+    engine.dispose()
+
+
+def test_new_database_starts_at_latest(database_url):
+    engine = models.make_engine(database_url, models.SQLITE_PRAGMAS)
+    assert migrations.upgrade(engine) is None
+    assert version(engine) == migrations.LATEST
+    assert set(inspect(engine).get_table_names()) == {"media", "torrents", "media_groups", "schema_version"}
+    assert migrations.check_query_plans(engine) == []
+    engine.dispose()
+
+
+def test_workers_starting_together_migrate_once(database_url):
+    from concurrent.futures import ThreadPoolExecutor
+    engines = [models.make_engine(database_url, models.SQLITE_PRAGMAS) for _ in range(4)]
+    with ThreadPoolExecutor(len(engines)) as pool:
+        started_at = list(pool.map(migrations.upgrade, engines))
+    # One created the database, the others found it at LATEST
+    assert sorted(started_at, key=str) == [migrations.LATEST] * 3 + [None]
+    with engines[0].connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_version")).scalar() == 1
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,38 @@
+import sys
+import os
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from app import models
+
+
+def pragmas(engine):
+    with engine.connect() as conn:
+        return {name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "busy_timeout", "synchronous")}
+
+
+def test_connections_get_the_pragmas(tmp_path):
+    engine = models.make_engine(f"sqlite:///{tmp_path}/pragmas.db", models.SQLITE_PRAGMAS)
+    # synchronous reads back as a number, 1 is NORMAL
+    assert pragmas(engine) == {"journal_mode": "wal", "busy_timeout": 5000, "synchronous": 1}
+    # Every pooled connection, not just the first
+    with engine.connect(), engine.connect() as second:
+        assert second.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_configure_engine_rebinds_sessions(tmp_path):
+    original = models.engine
+    try:
+        engine = models.configure_engine(f"sqlite:///{tmp_path}/configured.db", {"busy_timeout": 1234})
+        assert models.engine is engine
+        with models.SessionLocal() as db:
+            assert db.get_bind() is engine
+            assert db.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+    finally:
+        models.engine.dispose()
+        models.engine = original
+        models.SessionLocal.configure(bind=original)
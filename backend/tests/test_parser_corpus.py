@@ -0,0 +1,16 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import parser_corpus
+
+
+def test_corpus_parses_as_expected():
+    names = parser_corpus.load_names()
+    expected = parser_corpus.load_expected()
+    assert [e['name'] for e in expected] == names
+
+    changed = [(e, got) for e in expected if (got := parser_corpus.describe(e['name'])) != e]
+    # Show a few, a regression usually touches many names at once
+    assert not changed, f"{len(changed)} of {len(names)} names parse differently, e.g. {changed[:3]}"
@@ -0,0 +1,150 @@
+import sys
+import os
+import asyncio
+from sqlalchemy.orm import sessionmaker
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+# app.main reads config.ini (TMDb API key) on import
+if not os.path.isfile(os.path.join(os.path.dirname(__file__), '..', 'config.ini')):
+    pytest.skip("needs backend/config.ini", allow_module_level=True)
+
+from app import main, models, schemas
+
+
+@pytest.fixture
+def db(tmp_path):
+    # A file, so the sessions of concurrent items each get a connection
+    engine = models.make_engine(f"sqlite:///{tmp_path}/api.db", models.SQLITE_PRAGMAS)
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class SlowSearcher:
+    """Finds every title under its own id after `delay` seconds; "Broken" titles get cancelled."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.searches = []
+
+    async def identifyTMDb(self, torinfo):
+        self.searches.append(torinfo.torname)
+        tmdb_id = len(self.searches)
+        await asyncio.sleep(self.delay)
+        if torinfo.media_title.startswith("Broken"):
+            raise asyncio.CancelledError()
+        torinfo.tmdb_cat, torinfo.tmdb_id, torinfo.tmdb_title = "movie", tmdb_id, torinfo.media_title
+        torinfo.confidence = 100
+        return True
+
+    async def fillTMDbDetails(self, torinfo):
+        return torinfo
+
+
+def query(name):
+    return schemas.Query(torname=name)
+
+
+def test_batch_items_fail_alone(db, monkeypatch):
+    monkeypatch.setattr(main, "searcher", SlowSearcher(0.05))
+
+    async def run():
+        # Another request leads the Heat search and gives up before it ends
+        leader = asyncio.ensure_future(asyncio.wait_for(
+            main.resolve_query(db, query("Heat.1995.1080p.BluRay.x264"), main.torinfo_from_query(query("Heat.1995.1080p.BluRay.x264"))),
+            0.01))
+        await asyncio.sleep(0)
+        batch = await main.search_media_by_torname_batch(
+            [query("Heat.1995.1080p.BluRay.x264"), query("Broken.Arrow.1996.1080p.BluRay.x264"),
+             query("Ronin.1998.1080p.BluRay.x264")], db)
+        return await asyncio.gather(leader, return_exceptions=True), batch
+
+    (leader,), batch = asyncio.run(run())
+    assert isinstance(leader, asyncio.TimeoutError)
+    assert [(r.status, r.media.tmdb_title if r.media else r.error) for r in batch] == [
+        (200, "Heat"), (500, "Cancelled"), (200, "Ronin")]
+    # Heat was searched once, by the leader, and the batch got its result
+    assert main.searcher.searches.count("Heat.1995.1080p.BluRay.x264") == 1
+
+
+def test_database_waits_do_not_stall_the_loop(db, monkeypatch):
+    import time
+    from app import crud
+    monkeypatch.setattr(main, "searcher", SlowSearcher(0))
+    media_of_torrent = crud._media_of_torrent
+
+    def locked(session, name):
+        time.sleep(0.3)  # like waiting out busy_timeout for the write lock
+        return media_of_torrent(session, name)
+
+    monkeypatch.setattr(crud, "_media_of_torrent", locked)
+
+    async def run():
+        gaps, last = [], time.perf_counter()
+
+        async def heartbeat():
+            nonlocal last
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        beat = asyncio.ensure_future(heartbeat())
+        name = "Heat.1995.1080p.BluRay.x264"
+        media = await main.resolve_query(db, query(name), main.torinfo_from_query(query(name)))
+        beat.cancel()
+        return media, max(gaps)
+
+    media, longest_gap = asyncio.run(run())
+    assert media.tmdb_title == "Heat"
+    assert longest_gap < 0.2
+
+
+def test_duplicate_torrent_is_rejected(db):
+    from fastapi import HTTPException
+    from app import crud
+    matrix = crud.create_media(db, schemas.MediaCreate(torname_regex="The Matrix", tmdb_id=603, tmdb_cat="movie"))
+    heat = crud.create_media(db, schemas.MediaCreate(torname_regex="Heat", tmdb_id=949, tmdb_cat="movie"))
+    torrent = schemas.TorrentCreate(name="The.Matrix.1999.1080p.BluRay.x264")
+    assert main.create_torrent_for_media(matrix.id, torrent, db).media_id == matrix.id
+    with pytest.raises(HTTPException) as e:
+        main.create_torrent_for_media(heat.id, torrent, db)
+    assert e.value.status_code == 409
+    assert crud.find_torrent_by_name(db, torrent.name).media_id == matrix.id
+
+
+def test_batch_keys_match_single_queries(db, monkeypatch):
+    from app import crud
+    monkeypatch.setattr(main, "searcher", SlowSearcher(0))
+    heat = crud.create_media(db, schemas.MediaCreate(torname_regex="Heat", tmdb_id=949, tmdb_cat="movie"))
+    matrix = crud.create_media(db, schemas.MediaCreate(torname_regex="The Matrix", tmdb_id=603, tmdb_cat="movie"))
+    name = "Some.Name.2000.1080p.WEB-DL"
+    batch = asyncio.run(main.search_media_by_torname_batch([
+        schemas.Query(torname=name, tmdbstr="movie-949"), schemas.Query(torname=name, tmdbstr="movie-603"),
+        query("Ronin.1998.1080p.BluRay.x264"), query(" Ronin.1998.1080p.BluRay.x264 ")], db))
+    assert [(r.torname, r.media.id) for r in batch[:2]] == [(name, heat.id), (name, matrix.id)]
+    # Same key, searched once, each with its own name
+    assert [r.torname for r in batch[2:]] == ["Ronin.1998.1080p.BluRay.x264", " Ronin.1998.1080p.BluRay.x264 "]
+    assert batch[2].media == batch[3].media
+    assert main.searcher.searches == ["Ronin.1998.1080p.BluRay.x264"]
+
+
+def test_cancelled_batch_stops(db, monkeypatch):
+    monkeypatch.setattr(main, "searcher", SlowSearcher(10))
+
+    async def run():
+        batch = asyncio.ensure_future(main.search_media_by_torname_batch(
+            [query("Heat.1995.1080p.BluRay.x264"), query("Ronin.1998.1080p.BluRay.x264")], db))
+        await asyncio.sleep(0.05)
+        batch.cancel()
+        # Not turned into per-item "Cancelled" results
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(batch, 1)
+
+    asyncio.run(run())
@@ -0,0 +1,66 @@
+import sys
+import os
+import asyncio
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from ratelimit import RateLimiter, TMDbThrottled, retry_delay
+from asynctmdbsearcher import AsyncTMDbSearcher, TMDB_API_BASE
+from tmdbcache import TMDbCache
+from torinfo import TorrentParser
+
+
+def test_token_bucket_reservations():
+    limiter = RateLimiter(rate=10, burst=2)
+    delays = [limiter.reserve() for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.01)
+    assert delays[3] == pytest.approx(0.2, abs=0.01)
+
+    limiter.pause(1.0)
+    assert limiter.reserve() == pytest.approx(1.1, abs=0.02)
+    stats = limiter.stats()
+    assert (stats["requests"], stats["waited"], stats["throttled"]) == (5, 3, 1)
+
+    # No rate limit, but pauses still apply
+    limiter = RateLimiter(rate=0)
+    assert [limiter.reserve() for _ in range(100)] == [0.0] * 100
+    limiter.pause(0.5)
+    assert limiter.reserve() == pytest.approx(0.5, abs=0.01)
+
+
+def test_retry_delay():
+    assert retry_delay({"Retry-After": "3"}, 0) == 3.0
+    assert retry_delay({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0) == 0.0
+    assert [retry_delay({}, attempt) for attempt in range(3)] == [1.0, 2.0, 4.0]
+
+
+def make_searcher(statuses, cache=None):
+    """Answers searches with the next status in `statuses` (429s) and then with no results."""
+    def handler(request):
+        if statuses:
+            return httpx.Response(statuses.pop(0), headers={"Retry-After": "0"}, json={})
+        return httpx.Response(200, json={"page": 1, "results": []})
+
+    searcher = AsyncTMDbSearcher("key", cache=cache, limiter=RateLimiter(rate=0), max_retries=2)
+    searcher._client = httpx.AsyncClient(base_url=TMDB_API_BASE, transport=httpx.MockTransport(handler))
+    return searcher
+
+
+def test_429_is_retried():
+    statuses = [429, 429]
+    searcher = make_searcher(statuses)
+    assert asyncio.run(searcher._get("search/movie", {}, "/search/movie", key="results")).page == 1
+    assert searcher.limiter.stats()["throttled"] == 2
+
+
+def test_throttled_is_not_a_miss(tmp_path):
+    cache = TMDbCache(str(tmp_path / "cache.db"))
+    searcher = make_searcher([429] * 100, cache=cache)
+    torinfo = TorrentParser.parse("The.Matrix.1999.1080p.BluRay.x264-SPARKS")
+    with pytest.raises(TMDbThrottled):
+        asyncio.run(searcher.searchTMDb(torinfo))
+    assert cache.stats()["negative_entries"] == 0
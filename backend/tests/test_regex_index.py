@@ -0,0 +1,95 @@
+import sys
+import os
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from app import crud, models, schemas
+from app.regex_index import get_regex_index
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def add_media(db, regex, tmdb_id):
+    return crud.create_media(db, schemas.MediaCreate(torname_regex=regex, tmdb_id=tmdb_id, tmdb_cat="movie"))
+
+
+def test_first_match_in_id_order(db):
+    add_media(db, "Matrix", 1)
+    add_media(db, "The Matrix", 2)
+    assert crud.find_media_by_torname_regex(db, "the matrix").tmdb_id == 1
+
+
+def test_invalid_pattern_is_skipped(db):
+    add_media(db, "Dune(", 1)
+    add_media(db, "Dune", 2)
+    assert crud.find_media_by_torname_regex(db, "Dune Part Two").tmdb_id == 2
+
+
+def test_index_follows_writes(db):
+    media = add_media(db, "Alien", 1)
+    assert crud.find_media_by_torname_regex(db, "Alien") is not None
+
+    crud.update_media(db, media.id, schemas.MediaUpdate(torname_regex="Aliens"))
+    assert crud.find_media_by_torname_regex(db, "Alien") is None
+    assert crud.find_media_by_torname_regex(db, "Aliens").id == media.id
+
+    crud.delete_media(db, media.id)
+    assert crud.find_media_by_torname_regex(db, "Aliens") is None
+    assert len(get_regex_index(db)) == 0
+
+
+def test_stale_entry_is_resynced(db):
+    media = add_media(db, "Heat", 1)
+    crud.find_media_by_torname_regex(db, "Heat")
+    # Change the row without going through crud
+    db.query(models.Media).filter(models.Media.id == media.id).update({"torname_regex": "Collateral"})
+    db.commit()
+    assert crud.find_media_by_torname_regex(db, "Heat") is None
+    assert get_regex_index(db).get(media.id) == "Collateral"
+
+
+def test_required_literals():
+    from app.regex_index import required_literals
+    assert required_literals("The Matrix") == ["The Matrix"]
+    assert required_literals(r"Star\.?Wars") == ["Star", "Wars"]
+    assert required_literals("Alien(s)? 19[0-9]{2}") == ["Alien", " 19"]
+    assert required_literals("Heat|Collateral") == []
+    assert required_literals("(?x) Heat") == []
+
+
+def test_prefilter_keeps_first_match(db):
+    add_media(db, "a.*b", 1)
+    add_media(db, "Blue Eye Samurai", 2)
+    add_media(db, "samurai", 3)
+    index = get_regex_index(db)
+    assert crud.find_media_by_torname_regex(db, "BLUE EYE SAMURAI").tmdb_id == 2
+    assert crud.find_media_by_torname_regex(db, "Seven Samurai").tmdb_id == 3
+    assert len(index.candidates("Seven Samurai")) < len(index)
+
+
+def test_rows_of_other_processes_are_picked_up(db, monkeypatch):
+    from app import regex_index
+    add_media(db, "Alien", 1)
+    assert crud.find_media_by_torname_regex(db, "Heat") is None
+    # Another worker adds a row, this process' index never hears of it
+    db.add(models.Media(torname_regex="Heat", tmdb_id=949, tmdb_cat="movie"))
+    db.commit()
+    assert crud.find_media_by_torname_regex(db, "Heat").tmdb_id == 949
+
+    # Deleted elsewhere: gone from the index at the next full reload
+    db.query(models.Media).filter(models.Media.tmdb_id == 1).delete()
+    db.commit()
+    monkeypatch.setattr(regex_index, "RELOAD_INTERVAL", -1)
+    assert len(get_regex_index(db)) == 1
@@ -0,0 +1,67 @@
+import sys
+import os
+import asyncio
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    runs = []
+
+    async def work(name):
+        runs.append(name)
+        await asyncio.sleep(0.01)
+        return name.upper()
+
+    async def main():
+        same = [flight.do("a", lambda: work("a")) for _ in range(5)]
+        return await asyncio.gather(*same, flight.do("b", lambda: work("b")))
+
+    assert asyncio.run(main()) == ["A"] * 5 + ["B"]
+    assert runs == ["a", "b"]
+    assert flight.stats() == {"calls": 2, "shared": 4, "in_flight": 0}
+
+    # Finished calls are not cached
+    asyncio.run(flight.do("a", lambda: work("a")))
+    assert runs == ["a", "b", "a"]
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    assert [type(r) for r in asyncio.run(main())] == [ValueError] * 3
+    assert len(flight) == 0
+    with pytest.raises(ValueError):
+        asyncio.run(flight.do("k", fail))
+
+
+def test_leader_leaving_does_not_cancel_followers():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(asyncio.wait_for(flight.do("k", work), 0.01))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(main())
+    assert isinstance(leader, asyncio.TimeoutError)
+    assert follower == "done"
+    assert runs == [1] and len(flight) == 0
@@ -0,0 +1,106 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from tmdbv3api.as_obj import AsObj
+from tmdbcache import TMDbCache
+from tmdbsearcher import TMDbSearcher
+
+
+def test_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TMDbCache(path)
+    cache.set("movie", {"id": "603"}, "zh-CN", {"id": 603, "title": "黑客帝国"})
+    cache.close()
+
+    cache = TMDbCache(path)
+    assert cache.get("movie", {"id": "603"}, "zh-CN")["title"] == "黑客帝国"
+    assert cache.get("movie", {"id": "603"}, "en-US") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_per_endpoint_kind(tmp_path):
+    cache = TMDbCache(str(tmp_path / "cache.db"), ttls={"search": -1, "movie": 1})
+    cache.set("search/movie", {"query": "Heat"}, None, {"results": []})
+    cache.set("movie", {"id": "949"}, None, {"id": 949})
+    assert cache.get("search/movie", {"query": "Heat"}, None) is None
+    assert cache.get("movie", {"id": "949"}, None) == {"id": 949}
+    time.sleep(1.1)
+    assert cache.get("movie", {"id": "949"}, None) is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = TMDbCache(str(tmp_path / "cache.db"), max_entries=10)
+    for i in range(10):
+        cache.set("movie", {"id": str(i)}, None, {"id": i})
+    cache.get("movie", {"id": "0"}, None)
+    cache.set("movie", {"id": "10"}, None, {"id": 10})
+    assert cache.stats()["entries"] <= 10
+    assert cache.get("movie", {"id": "0"}, None) == {"id": 0}
+    assert cache.get("movie", {"id": "1"}, None) is None
+
+
+def test_searcher_requests_once(tmp_path):
+    searcher = TMDbSearcher(None, cache=TMDbCache(str(tmp_path / "cache.db")))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return AsObj({"results": [{"id": 1, "title": "Heat"}]}, key="results")
+
+    for _ in range(3):
+        results = searcher._request("search/movie", {"query": "Heat", "year": None}, fetch, key="results")
+        assert results[0].title == "Heat"
+    assert len(calls) == 1
+
+
+def test_blind_search_miss_is_remembered(tmp_path):
+    from torinfo import TorrentParser
+    searcher = TMDbSearcher(None, cache=TMDbCache(str(tmp_path / "cache.db")))
+    calls = []
+
+    def perform_search(term, category, year, stryear):
+        calls.append(term)
+        return None, 'error' if len(calls) == 1 else None
+
+    searcher._perform_search = perform_search
+    name = "Some Random Software v1.2.3"
+    # A failed request is not a miss
+    assert not searcher.searchTMDb(TorrentParser.parse(name))
+    searched = len(calls)
+    assert not searcher.searchTMDb(TorrentParser.parse(name))
+    assert len(calls) == 2 * searched
+    # A clean miss is
+    assert not searcher.searchTMDb(TorrentParser.parse(name))
+    assert len(calls) == 2 * searched
+    assert searcher.cache.stats()["negative_hits"] == 1
+
+    assert searcher.cache.clear_misses() == 1
+    assert not searcher.searchTMDb(TorrentParser.parse(name))
+    assert len(calls) == 3 * searched
+
+
+def test_misses_are_remembered_without_the_cache():
+    from torinfo import TorrentParser
+    searcher = TMDbSearcher(None)
+    calls = []
+
+    def perform_search(term, category, year, stryear):
+        calls.append(term)
+        return None, None
+
+    searcher._perform_search = perform_search
+    name = "Some Random Software v1.2.3"
+    assert not searcher.searchTMDb(TorrentParser.parse(name))
+    searched = len(calls)
+    assert not searcher.searchTMDb(TorrentParser.parse(name))
+    assert len(calls) == searched
+    assert searcher.misses.stats() == {"negative_entries": 1, "negative_hits": 1}
+
+    assert searcher.misses.clear_misses() == 1
+    assert not searcher.searchTMDb(TorrentParser.parse(name))
+    assert len(calls) == 2 * searched
@@ -0,0 +1,80 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'torcp2')))
+
+from torinfo import TorrentParser
+
+NAMES = [
+    "The.Matrix.1999.1080p.BluRay.x264-SPARKS",
+    "Breaking.Bad.S05E14.1080p.WEB-DL.DDP5.1.H.264-NTb",
+    "流浪地球 The Wandering Earth 2019 2160p WEB-DL H.265 AAC-CHDWEB",
+    "庆余年 第二季 2024 1080p WEB-DL H.264 AAC-HHWEB",
+    "Adele - 30 (2021) [FLAC 24-96]",
+    "三体全集.epub",
+] * 9
+
+
+def test_parse_many_keeps_input_order():
+    expected = [TorrentParser.parse(name) for name in NAMES]
+    assert TorrentParser.parse_many(NAMES, workers=2, chunksize=4) == expected
+    assert TorrentParser.parse_many(NAMES, workers=1) == expected
+
+
+def test_iparse_many_is_lazy():
+    def names():
+        yield from NAMES
+        raise AssertionError("read past what was needed")
+
+    results = TorrentParser.iparse_many(names(), workers=2, chunksize=3)
+    first = [next(results) for _ in range(5)]
+    results.close()
+    assert [t.torname for t in first] == NAMES[:5]
+
+
+def test_shared_tokens_match_separate_parsers():
+    import torcategory
+    import tortitle
+    import tortoken
+
+    for name in set(NAMES):
+        tokens = tortoken.NameTokens(name)
+        shared = torcategory.TorCategory(name, tokens), tortitle.TorTitle(name, tokens)
+        alone = torcategory.TorCategory(name), tortitle.TorTitle(name)
+        assert (shared[0].ccfcat, shared[0].group, shared[0].resolution) == (alone[0].ccfcat, alone[0].group, alone[0].resolution)
+        assert shared[1].to_dict() == alone[1].to_dict()
+        assert tokens.media_info == alone[1].parse_more(name)
+
+
+def test_parse_cached_returns_private_copies():
+    TorrentParser.configure_cache(16)
+    name = NAMES[1]
+    first = TorrentParser.parse_cached(name)
+    first.subtitle = 'changed'
+    first.tmdb_id = '1396'
+
+    again = TorrentParser.parse_cached(name)
+    assert again == TorrentParser.parse(name)
+    assert again is not first
+    stats = TorrentParser.cache_stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_category_stats_count_every_lookup():
+    from concurrent.futures import ThreadPoolExecutor
+    from torcategory import TorCategory, category_stats
+
+    cats = [TorCategory(name).ccfcat for name in NAMES * 20]
+    TorrentParser.configure_cache(len(NAMES))
+    category_stats.reset()
+    # Parse cache hits count too: the stats are lookups, whatever the cache size
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(TorrentParser.parse_cached, NAMES * 10))
+    for name in NAMES * 10:
+        TorrentParser.parse(name)
+
+    snapshot = category_stats.snapshot()
+    assert snapshot['total'] == len(cats)
+    assert {cat: c['count'] for cat, c in snapshot['categories'].items()} == {cat: cats.count(cat) for cat in set(cats)}
+    assert all(count == 0 for _, _, count, _ in TorCategory.CATEGORIES.values())
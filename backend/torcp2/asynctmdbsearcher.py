@@ -0,0 +1,218 @@
+import asyncio
+import httpx
+from tmdbv3api.as_obj import AsObj
+from tmdbv3api.exceptions import TMDbException
+from loguru import logger
+from ratelimit import TMDbThrottled, retry_delay
+from tmdbsearcher import TMDbSearcher
+
+TMDB_API_BASE = 'https://api.themoviedb.org/3'
+# Same defaults as tmdbv3api's Movie().details and TV().details
+MOVIE_APPEND = 'videos,trailers,images,casts,translations,keywords,release_dates'
+TV_APPEND = 'videos,trailers,images,credits,translations'
+
+
+class AsyncTMDbSearcher(TMDbSearcher):
+    """
+    asyncio version of TMDbSearcher on a shared, keep-alive HTTP/2 connection pool.
+
+    searchTMDb, identifyTMDb, search_tmdb_by_tmdbid, searchTMDbByIMDbId and
+    fillTMDbDetails are coroutines that behave like their TMDbSearcher counterparts; result
+    handling and the response cache are shared with the blocking class.
+    `max_concurrency` bounds the requests in flight, which on HTTP/2 can
+    exceed the number of connections.
+    """
+
+    def __init__(self, tmdb_api_key, tmdb_lang='zh-CN', cache=None, speculative=0, limiter=None, max_retries=3,
+                 max_connections=20, max_concurrency=50, timeout=10.0, http2=True, misses=None):
+        super().__init__(tmdb_api_key, tmdb_lang, cache, speculative, limiter, max_retries, misses)
+        self.api_key = tmdb_api_key
+        self.language = tmdb_lang
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._timeout = httpx.Timeout(timeout)
+        self._http2 = http2
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=TMDB_API_BASE, http2=self._http2,
+                                             limits=self._limits, timeout=self._timeout)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get(self, endpoint, params, path, query=None, key=None):
+        """
+        GETs `path` through the response cache, which is keyed by `endpoint` and `params`.
+        The cache's SQLite reads and writes and the JSON decoding run on a
+        thread, so a slow disk or a large details response does not stall
+        the event loop.
+        """
+        if self.cache:
+            body = await asyncio.to_thread(self.cache.get, endpoint, params, self.language)
+            if body is not None:
+                return AsObj(body, key=key)
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async()
+            async with self._semaphore:
+                resp = await self.client.get(path, params={'api_key': self.api_key, 'language': self.language,
+                                                           **(query or {})})
+            if resp.status_code != 429:
+                break
+            delay = retry_delay(resp.headers, attempt)
+            logger.warning(f"TMDb rate limit hit, retrying in {delay:.1f}s")
+            self.limiter.pause(delay)
+        else:
+            raise TMDbThrottled(f"TMDb rate limit still exceeded after {self.max_retries} retries", delay)
+        body = await asyncio.to_thread(resp.json)
+        if 'errors' in body:
+            raise TMDbException(body['errors'])
+        if body.get('success') is False:
+            raise TMDbException(body.get('status_message'))
+
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, endpoint, params, self.language, body)
+        return AsObj(body, key=key)
+
+    async def _details(self, tmdb_cat, tmdb_id):
+        if tmdb_cat == 'tv':
+            return await self._get('tv', {'id': str(tmdb_id)}, f'/tv/{tmdb_id}', {'append_to_response': TV_APPEND})
+        elif tmdb_cat == 'movie':
+            return await self._get('movie', {'id': str(tmdb_id)}, f'/movie/{tmdb_id}', {'append_to_response': MOVIE_APPEND})
+        return None
+
+    async def search_tmdb_by_tmdbid(self, torinfo):
+        """Fetches details by TMDb ID and populates torinfo."""
+        if not torinfo.tmdb_id or not torinfo.tmdb_cat:
+            logger.error("TMDb ID or category missing for TMDb search.")
+            return False
+        try:
+            details = await self._details(torinfo.tmdb_cat, torinfo.tmdb_id)
+            if details:
+                self._save_tmdb_result(torinfo, details, torinfo.tmdb_cat)
+                self._apply_details(torinfo, details)
+                return True
+        except TMDbThrottled:
+            raise
+        except Exception as e:
+            logger.error(f"Error searching TMDb by ID {torinfo.tmdb_id}: {e}")
+        return False
+
+    async def searchTMDbByIMDbId(self, torinfo):
+        if not torinfo.imdb_id.startswith('tt'):
+            logger.error(f"Invalid IMDb ID: {torinfo.imdb_id}")
+            return False
+        try:
+            results = await self._get('find', {'imdb_id': torinfo.imdb_id}, f'/find/{torinfo.imdb_id}',
+                                      {'external_source': 'imdb_id'})
+            if self._accept_find_result(torinfo, results):
+                await self.fillTMDbDetails(torinfo)
+                return True
+        except TMDbThrottled:
+            raise
+        except Exception as e:
+            logger.error(f"Error searching TMDb by IMDb ID {torinfo.imdb_id}: {e}")
+        return False
+
+    async def _perform_search(self, search_term, search_cat, year, stryear):
+        endpoint, params = self._search_request(search_cat, search_term, stryear)
+        query = {'query': search_term, 'page': 1, 'include_adult': 'true'}
+        if stryear and search_cat == 'tv':
+            query['first_air_date_year'] = stryear
+        elif stryear and search_cat == 'movie':
+            query['year'] = stryear
+
+        logger.info(f'Searching for "{search_term}" in [{search_cat}] with year: {year or "any"}')
+
+        try:
+            results = await self._get(endpoint, params, '/' + endpoint, query, key='results')
+        except TMDbThrottled:
+            raise
+        except Exception as e:
+            logger.error(f"TMDb API search failed for '{search_term}': {e}")
+            return None, 'error'
+
+        return self._pick_result(results, year)
+
+    async def _identifyTMDb(self, torinfo):
+        miss_key = self._miss_key(torinfo)
+        if await asyncio.to_thread(self._is_known_miss, torinfo, miss_key):
+            return False
+        stryear, intyear = self.fixYear(torinfo)
+        search_list = self._prepare_search(torinfo)
+
+        category, result, match_type, failed = await self._run_search_list(search_list, intyear, stryear)
+        if result:
+            self._accept_search_result(torinfo, category, result, match_type)
+            return True
+
+        await asyncio.to_thread(self._record_miss, torinfo, miss_key, failed)
+        return False
+
+    async def _run_search_list(self, search_list, intyear, stryear):
+        failed = False
+        head = search_list[:self.speculative] if self.speculative > 1 else []
+        if head:
+            tasks = [asyncio.create_task(self._perform_search(term, category, intyear, stryear))
+                     for category, term in head]
+            try:
+                for (category, _), task in zip(head, tasks):
+                    result, match_type = await task
+                    failed = failed or match_type == 'error'
+                    if result:
+                        return category, result, match_type, failed
+            finally:
+                # The answer is known, drop the requests still in flight. Waiting
+                # for them retrieves what the losers raised, which asyncio would
+                # otherwise log as "Task exception was never retrieved".
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        for category, term in search_list[len(head):]:
+            result, match_type = await self._perform_search(term, category, intyear, stryear)
+            failed = failed or match_type == 'error'
+            if result:
+                return category, result, match_type, failed
+        return None, None, None, failed
+
+    async def identifyTMDb(self, torinfo):
+        try:
+            return await self._identifyTMDb(torinfo)
+        except TMDbThrottled:
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during TMDb search: {e}", exc_info=True)
+            return False
+
+    async def searchTMDb(self, torinfo):
+        if not await self.identifyTMDb(torinfo):
+            return False
+        await self.fillTMDbDetails(torinfo)
+        return True
+
+    async def fillTMDbDetails(self, torinfo, details=None):
+        if not torinfo.tmdb_id:
+            return torinfo
+
+        if not details:
+            if torinfo.tmdbDetails:  # Already filled
+                return torinfo
+            else:
+                try:
+                    details = await self._details(torinfo.tmdb_cat, torinfo.tmdb_id)
+                    if details is None:
+                        return torinfo  # Cannot fetch details without a category
+                except TMDbThrottled:
+                    raise
+                except Exception as e:
+                    logger.error(f"Failed to fetch TMDb details for {torinfo.tmdb_cat}-{torinfo.tmdb_id}: {e}")
+                    return torinfo
+
+        return self._apply_details(torinfo, details)
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from loguru import logger
+
+
+class TMDbThrottled(Exception):
+    """TMDb still answered 429 Too Many Requests after all retries."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all requests to one API, usable from threads and coroutines.
+
+    `rate` tokens per second are added up to `burst`. Each request reserves
+    a token and sleeps until it is due, so callers are served in arrival
+    order. `pause()` stops handing out tokens for a while, after a 429.
+    A `rate` of 0 disables the limit but still honours pauses.
+    """
+
+    def __init__(self, rate=40.0, burst=None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.throttled = 0
+
+    def reserve(self) -> float:
+        """Takes a token and returns the number of seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                if self.rate > 0:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            ready = self._updated
+            if self.rate > 0:
+                self._tokens -= 1
+                if self._tokens < 0:
+                    ready += -self._tokens / self.rate
+            delay = max(0.0, ready - now)
+
+            self.requests += 1
+            if delay > 0:
+                self.waited += 1
+                self.wait_total += delay
+                self.wait_max = max(self.wait_max, delay)
+            return delay
+
+    def acquire(self):
+        if delay := self.reserve():
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        if delay := self.reserve():
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Hands out no tokens for `seconds`, e.g. the Retry-After of a 429."""
+        with self._lock:
+            self.throttled += 1
+            until = time.monotonic() + seconds
+            if until > self._updated:
+                self._tokens = 0
+                self._updated = until
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'requests': self.requests,
+            'waited': self.waited,
+            'wait_avg_ms': round(self.wait_total / self.requests * 1000, 1) if self.requests else 0.0,
+            'wait_max_ms': round(self.wait_max * 1000, 1),
+            'throttled': self.throttled,
+        }
+
+
+def retry_delay(headers, attempt, backoff=1.0, max_delay=60.0):
+    """Seconds to wait before retrying a 429: Retry-After if given, else exponential backoff."""
+    value = headers.get('Retry-After')
+    if value:
+        try:
+            return min(max_delay, max(0.0, float(value)))
+        except ValueError:
+            try:
+                return min(max_delay, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return min(max_delay, backoff * 2 ** attempt)
+
+
+class ThrottledSession(requests.Session):
+    """requests.Session for tmdbv3api that goes through a RateLimiter and retries 429s."""
+
+    def __init__(self, limiter, max_retries=3):
+        super().__init__()
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    def request(self, method, url, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            resp = super().request(method, url, *args, **kwargs)
+            if resp.status_code != 429:
+                return resp
+            delay = retry_delay(resp.headers, attempt)
+            logger.warning(f"TMDb rate limit hit, retrying in {delay:.1f}s")
+            self.limiter.pause(delay)
+        raise TMDbThrottled(f"TMDb rate limit still exceeded after {self.max_retries} retries", delay)
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+
+class TMDbCache:
+    """
+    Persistent cache of TMDb JSON responses in a local SQLite file.
+
+    Entries are keyed by endpoint, parameters and language. Each kind of
+    endpoint (the first path segment: search, movie, tv, find) has its own
+    TTL, and the least recently used entries are evicted once the cache
+    holds more than `max_entries`.
+
+    Blind searches that found nothing are remembered separately, with the
+    shorter 'miss' TTL, so the same junk name doesn't repeat them.
+    """
+    DEFAULT_TTLS = {
+        'search': 24 * 3600,
+        'movie': 7 * 24 * 3600,
+        'tv': 24 * 3600,        # new seasons and episodes show up in tv details
+        'find': 30 * 24 * 3600,
+        'miss': 6 * 3600,
+    }
+
+    def __init__(self, path='tmdb_cache.db', ttls=None, max_entries=100000):
+        self.path = path
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                           'key TEXT PRIMARY KEY, kind TEXT, body TEXT, expires_at REAL, accessed_at REAL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS misses (key TEXT PRIMARY KEY, expires_at REAL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_misses_expires_at ON misses (expires_at)')
+        self._count = self._conn.execute('SELECT count(*) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def make_key(endpoint, params, language):
+        return json.dumps([endpoint, params, language], sort_keys=True, ensure_ascii=False)
+
+    @staticmethod
+    def kind_of(endpoint):
+        return endpoint.split('/', 1)[0]
+
+    def get(self, endpoint, params, language):
+        """Returns the cached JSON body, or None on a miss or an expired entry."""
+        key = self.make_key(endpoint, params, language)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT body, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row and row[1] > now:
+                self._conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+                self.hits += 1
+                return json.loads(row[0])
+            if row:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._count -= 1
+            self.misses += 1
+        return None
+
+    def set(self, endpoint, params, language, body):
+        kind = self.kind_of(endpoint)
+        ttl = self.ttls.get(kind, self.ttls['search'])
+        if ttl <= 0:
+            return
+        key = self.make_key(endpoint, params, language)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, kind, body, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, kind, json.dumps(body, ensure_ascii=False), now + ttl, now))
+            # Approximate (a replace counts too), recounted on every eviction pass
+            self._count += 1
+            if self._count > self.max_entries:
+                self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+        self._count = self._conn.execute('SELECT count(*) FROM responses').fetchone()[0]
+        # Evict down to 90% so the next few inserts don't trigger another pass
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute('DELETE FROM responses WHERE key IN '
+                               '(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)', (excess,))
+            self._count -= excess
+            logger.info(f'TMDb cache evicted {excess} entries')
+
+    def is_miss(self, parts):
+        """True if a blind search for `parts` found nothing within the 'miss' TTL."""
+        key = json.dumps(parts, ensure_ascii=False)
+        with self._lock:
+            row = self._conn.execute('SELECT expires_at FROM misses WHERE key = ?', (key,)).fetchone()
+            if row and row[0] > time.time():
+                self.negative_hits += 1
+                return True
+        return False
+
+    def add_miss(self, parts):
+        ttl = self.ttls['miss']
+        if ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO misses (key, expires_at) VALUES (?, ?)',
+                               (json.dumps(parts, ensure_ascii=False), now + ttl))
+            self._conn.execute('DELETE FROM misses WHERE expires_at <= ?', (now,))
+
+    def clear_misses(self):
+        with self._lock:
+            return self._conn.execute('DELETE FROM misses').rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.execute('DELETE FROM misses')
+            self._count = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            negative_entries = self._conn.execute('SELECT count(*) FROM misses').fetchone()[0]
+        return {
+            'entries': self._count,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'negative_entries': negative_entries,
+            'negative_hits': self.negative_hits,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MissCache:
+    """
+    In-memory stand-in for the blind-search misses of TMDbCache, used when
+    the response cache is disabled: the same junk name is not searched
+    again within `ttl` seconds, until the process restarts. At most
+    `max_entries` are kept, the oldest go first.
+    """
+
+    def __init__(self, ttl=TMDbCache.DEFAULT_TTLS['miss'], max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.negative_hits = 0
+        self._lock = threading.Lock()
+        self._misses = {}   # key -> expires_at, oldest first
+
+    def is_miss(self, parts):
+        key = json.dumps(parts, ensure_ascii=False)
+        with self._lock:
+            expires_at = self._misses.get(key)
+            if expires_at is not None and expires_at > time.time():
+                self.negative_hits += 1
+                return True
+        return False
+
+    def add_miss(self, parts):
+        if self.ttl <= 0:
+            return
+        key = json.dumps(parts, ensure_ascii=False)
+        with self._lock:
+            self._misses.pop(key, None)
+            self._misses[key] = time.time() + self.ttl
+            while len(self._misses) > self.max_entries:
+                del self._misses[next(iter(self._misses))]
+
+    def clear_misses(self):
+        with self._lock:
+            cleared = len(self._misses)
+            self._misses.clear()
+        return cleared
+
+    def stats(self):
+        with self._lock:
+            return {'negative_entries': len(self._misses), 'negative_hits': self.negative_hits}
@@ -1,9 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
 from tmdbv3api import TMDb, Movie, TV, Search, Find
+from tmdbv3api.as_obj import AsObj
 from imdb import Cinemagoer
+from ratelimit import RateLimiter, ThrottledSession, TMDbThrottled
+from tmdbcache import MissCache
+from torinfo import TMDbDetails
 import re
 import time
 from loguru import logger
 
+# --- Rule tables, compiled once at import ---
+
+TRAILING_NUMBER_RE = re.compile(r'^(.+?)(\d+)')
+YEAR_RE = re.compile(r'\b(19\d{2}|20\d{2})\b')
+CJK_RE = re.compile(r'[\u4e00-\u9fa5]')
+
+# Applied in order by _clean_title
+CLEAN_TITLE_RULES = [re.compile(pattern, re.I) for pattern in [
+    r'^(Jade|\w{2,3}TV)\s+',
+    r'\b(Extended|Anthology|Trilogy|Quadrilogy|Tetralogy|Collections?)\s*$',
+    r'\b(HD|S\d+|E\d+|V\d+|4K|DVD|CORRECTED|UnCut|SP)\s*$',
+    r'^\s*(剧集|BBC：?|TLOTR|Jade|Documentary|【[^】]*】)',
+    r'(\d+部曲|全\d+集.*|原盘|系列|\s[^\s]*压制.*)\s*$',
+    r'(\b国粤双语|[\b\(]?\w+版|\b\d+集全).*$',
+    r'(The[\s\.]*(Complete\w*|Drama\w*|Animate\w*)?[\s\.]*Series|The\s*Movie)\s*$',
+    r'\b(Season\s?\d+)\b',
+]]
+
+ROMAN_NUMERALS = {'II': '2', 'III': '3', 'IV': '4', 'V': '5', 'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9',
+                  'XI': '11', 'XII': '12', 'XIII': '13', 'XIV': '14', 'XV': '15', 'XVI': '16'}
+# One pass for all numerals; whole words only, so the order of the alternatives doesn't matter
+ROMAN_RE = re.compile(r'\b(' + '|'.join(ROMAN_NUMERALS) + r')\b', re.I)
+
 def tryint(instr):
     try:
         return int(instr)
@@ -11,13 +39,49 @@ def tryint(instr):
         return 0
 
 class TMDbSearcher:
-    def __init__(self, tmdb_api_key, tmdb_lang='zh-CN'):
+    def __init__(self, tmdb_api_key, tmdb_lang='zh-CN', cache=None, speculative=0, limiter=None, max_retries=3,
+                 misses=None):
+        # Every TMDb request waits for the limiter; a 429 pauses it and is retried
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
         if tmdb_api_key:
-            self.tmdb = TMDb()
+            # tmdbv3api keeps the session on the class, so it is shared by Movie(), TV(), Search() ...
+            self.tmdb = TMDb(session=ThrottledSession(self.limiter, max_retries))
             self.tmdb.api_key = tmdb_api_key
             self.tmdb.language = tmdb_lang
+            # tmdbv3api's own cache bypasses the session; TMDbCache, if given, takes its place
+            self.tmdb.cache = False
         else:
             self.tmdb = None
+        self.cache = cache
+        # Blind searches that found nothing: in the response cache, or in memory without one
+        self.misses = misses or cache or MissCache()
+        # Number of blind-search candidates sent at once, 0 or 1 searches one at a time.
+        # Here they run on a thread pool, which cannot stop a request once it started:
+        # the losers still finish, and count against the rate limit, after the winner
+        # is returned. AsyncTMDbSearcher does cancel them.
+        self.speculative = speculative
+        self._executor = None
+
+    def _request(self, endpoint, params, fetch, key=None):
+        """Runs a tmdbv3api call through the response cache, if there is one."""
+        if not self.cache:
+            return fetch()
+        language = self.tmdb.language if self.tmdb else None
+        body = self.cache.get(endpoint, params, language)
+        if body is not None:
+            return AsObj(body, key=key)
+        result = fetch()
+        if result is not None:
+            self.cache.set(endpoint, params, language, result._json)
+        return result
+
+    def _details(self, tmdb_cat, tmdb_id):
+        if tmdb_cat == 'tv':
+            return self._request('tv', {'id': str(tmdb_id)}, lambda: TV().details(tmdb_id))
+        elif tmdb_cat == 'movie':
+            return self._request('movie', {'id': str(tmdb_id)}, lambda: Movie().details(tmdb_id))
+        return None
 
     def _save_tmdb_result(self, torinfo, result, media_type=None):
         if not result:
@@ -65,18 +129,15 @@ class TMDbSearcher:
             logger.error("TMDb ID or category missing for TMDb search.")
             return False
         try:
-            details = None
-            if torinfo.tmdb_cat == 'tv':
-                details = TV().details(torinfo.tmdb_id)
-            elif torinfo.tmdb_cat == 'movie':
-                details = Movie().details(torinfo.tmdb_id)
-
+            details = self._details(torinfo.tmdb_cat, torinfo.tmdb_id)
             if details:
                 # Overwrite torinfo with full details
                 self._save_tmdb_result(torinfo, details, torinfo.tmdb_cat)
                 self.fillTMDbDetails(torinfo, details) # Pass details to avoid re-fetching
                 return True
 
+        except TMDbThrottled:
+            raise
         except Exception as e:
             logger.error(f"Error searching TMDb by ID {torinfo.tmdb_id}: {e}")
         return False
@@ -86,43 +147,60 @@ class TMDbSearcher:
             logger.error(f"Invalid IMDb ID: {torinfo.imdb_id}")
             return False
         try:
-            find = Find()
-            results = find.find_by_imdb_id(imdb_id=torinfo.imdb_id)
-            
-            # Prefer the category if it's already known
-            preferred_results = 'tv_results' if torinfo.tmdb_cat == 'tv' else 'movie_results'
-            other_results = 'movie_results' if torinfo.tmdb_cat == 'tv' else 'tv_results'
-
-            if results[preferred_results]:
-                self._save_tmdb_result(torinfo, results[preferred_results][0])
-                self.fillTMDbDetails(torinfo)
-                return True
-            elif results[other_results]:
-                self._save_tmdb_result(torinfo, results[other_results][0])
+            results = self._request('find', {'imdb_id': torinfo.imdb_id},
+                                    lambda: Find().find_by_imdb_id(imdb_id=torinfo.imdb_id))
+            if self._accept_find_result(torinfo, results):
                 self.fillTMDbDetails(torinfo)
                 return True
+        except TMDbThrottled:
+            raise
         except Exception as e:
             logger.error(f"Error searching TMDb by IMDb ID {torinfo.imdb_id}: {e}")
         
         return False
 
+    def _search_request(self, search_cat, search_term, stryear):
+        """Cache endpoint and parameters of a search, shared with AsyncTMDbSearcher."""
+        if search_cat == 'tv':
+            return 'search/tv', {'query': search_term, 'year': stryear}
+        elif search_cat == 'movie':
+            return 'search/movie', {'query': search_term, 'year': stryear}
+        return 'search/multi', {'query': search_term} # year not supported in multi
+
+    def _accept_find_result(self, torinfo, results):
+        # Prefer the category if it's already known
+        preferred_results = 'tv_results' if torinfo.tmdb_cat == 'tv' else 'movie_results'
+        other_results = 'movie_results' if torinfo.tmdb_cat == 'tv' else 'tv_results'
+
+        if results[preferred_results]:
+            return self._save_tmdb_result(torinfo, results[preferred_results][0])
+        elif results[other_results]:
+            return self._save_tmdb_result(torinfo, results[other_results][0])
+        return False
+
     def _perform_search(self, search_term, search_cat, year, stryear):
         search = Search()
-        results = []
+        endpoint, params = self._search_request(search_cat, search_term, stryear)
         
         logger.info(f'Searching for "{search_term}" in [{search_cat}] with year: {year or "any"}')
 
         try:
             if search_cat == 'tv':
-                results = search.tv_shows(term=search_term, adult=True, release_year=stryear)
+                fetch = lambda: search.tv_shows(term=search_term, adult=True, release_year=stryear)
             elif search_cat == 'movie':
-                results = search.movies(term=search_term, adult=True, year=stryear)
+                fetch = lambda: search.movies(term=search_term, adult=True, year=stryear)
             else: # multi
-                results = search.multi(term=search_term, adult=True, page=1) # year not supported in multi
+                fetch = lambda: search.multi(term=search_term, adult=True, page=1)
+            results = self._request(endpoint, params, fetch, key='results')
+        except TMDbThrottled:
+            raise
         except Exception as e:
             logger.error(f"TMDb API search failed for '{search_term}': {e}")
-            return None, None
+            return None, 'error'
 
+        return self._pick_result(results, year)
+
+    def _pick_result(self, results, year):
         if not results:
             return None, None
 
@@ -155,7 +233,7 @@ class TMDbSearcher:
         if '《' in cntitle:
             return cntitle.split('《', 1)[1].split('》')[0]
         # Case 3: Title with trailing numbers like "中文123"
-        match = re.match(r'^(.+?)(\d+)', cntitle)
+        match = TRAILING_NUMBER_RE.match(cntitle)
         if match:
             return match.group(1).strip()
         # Case 4:  攻壳机动队真人版, 阿拉丁真人版
@@ -164,11 +242,30 @@ class TMDbSearcher:
 
         return ''
 
-    def _searchTMDb(self, torinfo):
+    def _miss_key(self, torinfo):
+        # Normalized search input; the season changes which searches are made
+        def norm(s):
+            return ' '.join(str(s or '').lower().split())
+        return [norm(torinfo.media_title), norm(torinfo.subtitle), self.fixYear(torinfo)[1],
+                norm(torinfo.tmdb_cat), norm(torinfo.season)]
+
+    def _is_known_miss(self, torinfo, miss_key):
+        if miss_key and self.misses.is_miss(miss_key):
+            logger.info(f'TMDb known miss: [{torinfo.media_title}] [{torinfo.subtitle}]')
+            return True
+        return False
+
+    def _record_miss(self, torinfo, miss_key, failed):
+        logger.warning(f'TMDb Not found: [{torinfo.media_title}] [{torinfo.subtitle}]')
+        # Only a clean miss is remembered, not one caused by a failed request
+        if miss_key and not failed:
+            self.misses.add_miss(miss_key)
+
+    def _prepare_search(self, torinfo):
+        """Sets the base confidence and returns the ordered (category, term) list to search."""
         torinfo.confidence = 0
         title = torinfo.media_title
         cntitle = torinfo.subtitle
-        stryear, intyear = self.fixYear(torinfo)
 
         # Title cleaning
         cuttitle = self._clean_title(title)
@@ -186,45 +283,72 @@ class TMDbSearcher:
         if cntitle:
             torinfo.confidence += 10
 
+        return [item for item in self._build_search_list(torinfo, cntitle, cuttitle, cntitle2) if item[1]]
 
-        search_list = self._build_search_list(torinfo, cntitle, cuttitle, cntitle2)
-
-        for category, term in search_list:
-            if not term:
-                continue
+    def _accept_search_result(self, torinfo, category, result, match_type):
+        if category == 'multi':
+            self._save_tmdb_result(torinfo, result)
+        else:
+            self._save_tmdb_result(torinfo, result, media_type=category)
+        
+        # Update confidence
+        if match_type == 'strict':
+            torinfo.confidence += 20
+        elif match_type == 'fuzzy':
+            torinfo.confidence += 10
+        if category != 'multi':
+            torinfo.confidence += 5
 
-            result, match_type = self._perform_search(term, category, intyear, stryear)
+    def _identifyTMDb(self, torinfo):
+        miss_key = self._miss_key(torinfo)
+        if self._is_known_miss(torinfo, miss_key):
+            return False
+        stryear, intyear = self.fixYear(torinfo)
+        search_list = self._prepare_search(torinfo)
 
-            if result:
-                if category == 'multi':
-                    self._save_tmdb_result(torinfo, result)
-                else:
-                    self._save_tmdb_result(torinfo, result, media_type=category)
-                
-                # Update confidence
-                if match_type == 'strict':
-                    torinfo.confidence += 20
-                elif match_type == 'fuzzy':
-                    torinfo.confidence += 10
-                if category != 'multi':
-                    torinfo.confidence += 5
-                
-                self.fillTMDbDetails(torinfo)
-                return True
+        category, result, match_type, failed = self._run_search_list(search_list, intyear, stryear)
+        if result:
+            self._accept_search_result(torinfo, category, result, match_type)
+            return True
 
-        logger.warning(f'TMDb Not found: [{title}] [{cntitle}]')
+        self._record_miss(torinfo, miss_key, failed)
         return False
 
+    def _run_search_list(self, search_list, intyear, stryear):
+        """
+        Returns (category, result, match_type, failed) of the first entry in
+        `search_list` that finds something. In speculative mode the first
+        `self.speculative` entries are searched at once; list order still decides.
+        """
+        failed = False
+        head = search_list[:self.speculative] if self.speculative > 1 else []
+        if head:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.speculative * 4, thread_name_prefix='tmdb-search')
+            futures = [self._executor.submit(self._perform_search, term, category, intyear, stryear)
+                       for category, term in head]
+            try:
+                for (category, _), future in zip(head, futures):
+                    result, match_type = future.result()
+                    failed = failed or match_type == 'error'
+                    if result:
+                        return category, result, match_type, failed
+            finally:
+                # Only drops searches still queued; running ones finish in the background
+                for future in futures:
+                    future.cancel()
+
+        for category, term in search_list[len(head):]:
+            result, match_type = self._perform_search(term, category, intyear, stryear)
+            failed = failed or match_type == 'error'
+            if result:
+                return category, result, match_type, failed
+        return None, None, None, failed
+
     def _clean_title(self, title):
         # A helper to consolidate title cleaning regex
-        title = re.sub(r'^(Jade|\w{2,3}TV)\s+', '', title, flags=re.I)
-        title = re.sub(r'\b(Extended|Anthology|Trilogy|Quadrilogy|Tetralogy|Collections?)\s*$', '', title, flags=re.I)
-        title = re.sub(r'\b(HD|S\d+|E\d+|V\d+|4K|DVD|CORRECTED|UnCut|SP)\s*$', '', title, flags=re.I)
-        title = re.sub(r'^\s*(剧集|BBC：?|TLOTR|Jade|Documentary|【[^】]*】)', '', title, flags=re.I)
-        title = re.sub(r'(\d+部曲|全\d+集.*|原盘|系列|\s[^\s]*压制.*)\s*$', '', title, flags=re.I)
-        title = re.sub(r'(\b国粤双语|[\b\(]?\w+版|\b\d+集全).*$', '', title, flags=re.I)
-        title = re.sub(r'(The[\s\.]*(Complete\w*|Drama\w*|Animate\w*)?[\s\.]*Series|The\s*Movie)\s*$', '', title, flags=re.I)
-        title = re.sub(r'\b(Season\s?\d+)\b', '', title, flags=re.I)
+        for pattern in CLEAN_TITLE_RULES:
+            title = pattern.sub('', title)
         title = self.replaceRomanNum(title)
         return title.strip()
 
@@ -251,18 +375,31 @@ class TMDbSearcher:
             return sorted(unique_list, key=lambda x: x[1] != cuttitle)
         return unique_list
 
-    def searchTMDb(self, torinfo):
+    def identifyTMDb(self, torinfo):
+        """
+        Blind search that only fills in what the search result itself carries
+        (tmdb_cat, tmdb_id, title, year, ...), without fetching the details.
+        Call fillTMDbDetails() afterwards if the details are needed.
+        """
         try:
-            return self._searchTMDb(torinfo)
+            return self._identifyTMDb(torinfo)
+        except TMDbThrottled:
+            raise
         except Exception as e:
             logger.error(f"An unexpected error occurred during TMDb search: {e}", exc_info=True)
             return False
 
+    def searchTMDb(self, torinfo):
+        if not self.identifyTMDb(torinfo):
+            return False
+        self.fillTMDbDetails(torinfo)
+        return True
+
     # --- Utility Functions ---
     
     def getYear(self, datestr):
         if not datestr: return 0
-        m = re.search(r'\b(19\d{2}|20\d{2})\b', str(datestr))
+        m = YEAR_RE.search(str(datestr))
         return tryint(m.group(1)) if m else 0
 
     def getTitle(self, result):
@@ -270,13 +407,10 @@ class TMDbSearcher:
 
     def containsCJK(self, text):
         if not text: return False
-        return re.search(r'[\u4e00-\u9fa5]', text)
+        return CJK_RE.search(text)
 
     def replaceRomanNum(self, titlestr):
-        roman_map = {'II': '2', 'III': '3', 'IV': '4', 'V': '5', 'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'XI': '11', 'XII': '12', 'XIII': '13', 'XIV': '14', 'XV': '15', 'XVI': '16'}
-        for roman, arabic in roman_map.items():
-            titlestr = re.sub(f'\\b{roman}\\b', arabic, titlestr, flags=re.IGNORECASE)
-        return titlestr
+        return ROMAN_RE.sub(lambda m: ROMAN_NUMERALS[m.group(1).upper()], titlestr)
 
     def findYearMatch(self, results, year, strict=True):
         matchList = []
@@ -347,23 +481,26 @@ class TMDbSearcher:
         # If details are not passed in, fetch them
         if not details:
             if torinfo.tmdbDetails:  # Already filled
-                details = torinfo.tmdbDetails
+                return torinfo
             else:
                 try:
-                    if torinfo.tmdb_cat == 'movie':
-                        details = Movie().details(torinfo.tmdb_id)
-                    elif torinfo.tmdb_cat == 'tv':
-                        details = TV().details(torinfo.tmdb_id)
-                    else:
+                    details = self._details(torinfo.tmdb_cat, torinfo.tmdb_id)
+                    if details is None:
                         return torinfo  # Cannot fetch details without a category
+                except TMDbThrottled:
+                    raise
                 except Exception as e:
                     logger.error(f"Failed to fetch TMDb details for {torinfo.tmdb_cat}-{torinfo.tmdb_id}: {e}")
                     return torinfo
 
+        return self._apply_details(torinfo, details)
+
+    def _apply_details(self, torinfo, details):
         if not details:
             return torinfo
 
-        torinfo.tmdbDetails = details
+        # Keep only what is used, not the whole response with its cast, seasons, images...
+        torinfo.tmdbDetails = TMDbDetails.from_tmdb(details)
 
         # Fill in additional details
         if hasattr(details, 'origin_country') and details.origin_country:
@@ -372,4 +509,5 @@ class TMDbSearcher:
         torinfo.overview = getattr(details, 'overview', '')
         torinfo.vote_average = getattr(details, 'vote_average', 0)
         if hasattr(details, 'production_countries') and details.production_countries:
-            torinfo.production_countries = details.production_countries[0].get('iso_3166_1', '')
\ No newline at end of file
+            torinfo.production_countries = details.production_countries[0].get('iso_3166_1', '')
+        return torinfo
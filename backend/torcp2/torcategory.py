@@ -1,28 +1,113 @@
 # -*- coding: utf-8 -*-
 import re
 import os
+import threading
+import time
+from collections import Counter
+from tortoken import NameTokens
+
+# --- Rule tables, compiled once at import ---
+# (words, pattern, category): the first match wins. A pattern only runs if
+# one of its lower-case `words` occurs in the name (see NameTokens.has);
+# NON_ASCII is for patterns that only match CJK text, None means always run.
+
+NON_ASCII = 'non-ascii'
+
+EXT_RULES = [
+    (('pdf', 'epub', 'mobi', 'txt', 'chm', 'azw3', 'ebook-', 'doc'),
+     re.compile(r'(pdf|epub|mobi|txt|chm|azw3|eBook-\w{4,8}|mobi|doc|docx).?$', re.I), 'eBook'),
+    (('zip', '7z', 'rar'), re.compile(r'(zip|7z|rar).?$', re.I), 'Archive'),
+    (('.mpg',), re.compile(r'\.(mpg)\b', re.I), 'MV'),
+    (('flac', 'dsf', 'dsd'), re.compile(r'(\b|_)(FLAC.{0,3}|DSF.{0,3}|DSD(\d{1,3})?)$', re.I), 'Music'),
+    (('bd',), re.compile(r'(\b|_)(BD25\b|BD50\b|BD66\b|BD$)', re.I), 'MovieBDMV'),
+    (('dvd',), re.compile(r'(\b|_)(DVDR|DVD(\d+)?)\b', re.I), 'MovieDVD'),
+]
+
+KEYWORD_RULES = [
+    (NON_ASCII, re.compile(r'(上下册|全.{1,4}册|精装版|修订版|第\d版|共\d本|文集|新修版|PDF版|课本|课件|出版社)'), 'eBook'),
+    (NON_ASCII, re.compile(r'(\d+册|\d+期|\d+版|\d+本|\d+年|\d+月|系列|全集|作品集).?$'), 'eBook'),
+    (('concert', '演唱会', '音乐会', 'live'), re.compile(r'(\bConcert|演唱会|音乐会|\bLive[. ](At|in))\b', re.A | re.I), 'MV'),
+    (('bugs!',), re.compile(r'\bBugs!.?\.mp4', re.I), 'MV'),
+    (('various artists', 'mqa', '整轨', '分轨', '分軌', '无损', 'lpcd', 'sacd', 'mp3', 'xrcd'),
+     re.compile(r'(\bVarious Artists|\bMQA\b|整轨|\b分轨|\b分軌|\b无损|\bLPCD|\bSACD|\bMP3|XRCD\d{1,3})', re.A | re.I), 'Music'),
+    (None, re.compile(r'(\b\d+ ?CD|(\[|\()\s*(16|24)\b|\-(44\.1|88.2|48|192)|24Bit|44\s*\]|FLAC.*(16|24|48|CUE|WEB|Album)|WAV.*CUE|CD.*FLAC|(\[|\()\s*FLAC)', re.A | re.I), 'Music'),
+    # (None, re.compile(r'(\b\d+ ?CD|24\-|\-44\.1|24Bit|\[[\d\s]*44\s*\]|FLAC.*44|FLAC.*48|WAV.*CUE|FLAC.*CUE|\[.*FLAC\]|FLAC.+WEB\b|FLAC.*Album|CD[\s-]+FLAC|FLAC[\s-]+CD)', re.A | re.I), 'Music'),
+    (('beethoven', 'schubert'), re.compile(r'^(Beethoven|Schubert)\s*[\-_]', re.I), 'Music'),
+    # (NON_ASCII, re.compile(r'(乐团|交响曲|协奏曲|奏鸣曲|[二三四]重奏|专辑\b)'), 'Music'),
+    (('[bdmv]',), re.compile(r'(\[BDMV\])', re.I), 'MovieBDMV'),
+]
+# Checked after KEYWORD_RULES; Movie versions of series, categorized by source
+THE_MOVIE_RULE = (('movie', '电影版'), re.compile(r'(\bThe.Movie.\d{4}|电影版)\b', re.A | re.I))
+
+TV_RULES = [
+    (None, re.compile(r'(\b(S\d+)(E\d+)?|(Ep?\d+-Ep?\d+))\b', re.A | re.I)),
+    # (('season',), re.compile(r'\b(Season\s?\d+)\b', re.A | re.I)),
+    (('季',), re.compile(r'(第\s*(\d+)(-\d+)?季)\b', re.I)),
+    (('-s',), re.compile(r'(\bS\d+(-S\d+))\b', re.A | re.I)),
+    (None, re.compile(r'\W[ES]\d+\W|EP\d+\W|\d+季|第\w{1,3}季\W', re.A | re.I)),
+    # (('hdtv',), re.compile(r'\bHDTV\b')),
+    (('complete', 'full', 'series', '集'),
+     re.compile(r'(Complete.+Web-?dl|Full.Season|The[\s\.]*(Complete\w*|Drama\w*|Animate\w*)?[\s\.]*Series|\d+集)', re.A | re.I)),
+]
+
+REMUX_RULE = (('remux',), re.compile(r'\WREMUX\W', re.I))
+X26X_RULE = (('x26',), re.compile(r'\b(x265|x264)\b', re.I))
+MINI_RULE = (('mini',), re.compile(r'\bMiniSD|MiniFHD\b', re.I))
 
 
 def cutExt(torName):
-    if not torName:
-        return ''
-    tortup = os.path.splitext(torName)
-    torext = tortup[1].lower()
-    if re.match(r'\.[0-9a-z]{2,8}$', torext, flags=re.I):
-    # mvext = ['.mkv', '.ts', '.m2ts', '.vob', '.mpg', '.mp4', '.3gp', '.mov', '.tp', '.zip', '.pdf', '.iso', '.ass', '.srt', '.7z', '.rar']
-    # if torext.lower() in mvext:
-        return tortup[0].strip()
-    else:
-        return torName
+    return NameTokens(torName).stem
 
 
 class CategoryItem:
-    def __init__(label, number):
-        label = label
-        number = number
+    def __init__(self, label, number):
+        self.label = label
+        self.number = number
         # size = 0
 
 
+class CategoryStats:
+    """
+    Names looked up per category in this process by TorrentParser.parse()
+    and parse_cached(), parse cache hits included, safe to update from
+    request threads. Fixed size: one counter per category.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._started = time.monotonic()
+
+    def record(self, category):
+        with self._lock:
+            self._counts[category] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._started = time.monotonic()
+
+    def snapshot(self):
+        """{'total', 'seconds', 'per_second', 'categories': {name: {'count', 'per_second'}}}"""
+        with self._lock:
+            counts = dict(self._counts)
+            seconds = time.monotonic() - self._started
+        def per_second(n):
+            return round(n / seconds, 3) if seconds > 0 else 0.0
+
+        total = sum(counts.values())
+        return {
+            'total': total,
+            'seconds': round(seconds, 1),
+            'per_second': per_second(total),
+            'categories': {cat: {'count': n, 'per_second': per_second(n)} for cat, n in sorted(counts.items())},
+        }
+
+
+# Shared by every TorCategory in this process
+category_stats = CategoryStats()
+
+
 class TorCategory:
     # def __init__(self):
     # 有些组生产 TV Series，但是在种子名上不显示 S01 这些
@@ -64,87 +149,55 @@ class TorCategory:
     group = ''
     resolution = ''
     quality = ''
-    CategorySummary = []
 
-    def __init__(self, torName):
+    def __init__(self, torName, tokens=None):
+        self.tokens = tokens or NameTokens(torName)
         self.ccfcat, self.group = self.guessByName(torName)
 
 
     def setCategory(self, category):
+        # Only sets this instance's category, counting is left to category_stats
         self.category = category
-        self.CATEGORIES[category][2] += 1
 
-    def categoryByExt(self, torName):
-        if re.search(
-                r'(pdf|epub|mobi|txt|chm|azw3|eBook-\w{4,8}|mobi|doc|docx).?$',
-                torName, re.I):
-            self.setCategory('eBook')
-        elif re.search(
-                r'(zip|7z|rar).?$',
-                torName, re.I):
-            self.setCategory('Archive')
-        elif re.search(r'\.(mpg)\b', torName, re.I):
-            self.setCategory('MV')
-        elif re.search(r'(\b|_)(FLAC.{0,3}|DSF.{0,3}|DSD(\d{1,3})?)$', torName, re.I):
-            self.setCategory('Music')
-        elif re.search(r'(\b|_)(BD25\b|BD50\b|BD66\b|BD$)', torName, re.I):
-            self.setCategory('MovieBDMV')
-        elif re.search(r'(\b|_)(DVDR|DVD(\d+)?)\b', torName, re.I):
-            self.setCategory('MovieDVD')
-        else:
+    def _tokens(self, torName):
+        return self.tokens if torName == self.tokens.name else NameTokens(torName)
+
+    def _matches(self, tokens, words, pattern):
+        if words == NON_ASCII:
+            if tokens.ascii:
+                return False
+        elif not tokens.has(words):
             return False
-        return True
+        return pattern.search(tokens.name)
+
+    def _categoryByRules(self, torName, rules):
+        tokens = self._tokens(torName)
+        for words, pattern, category in rules:
+            if self._matches(tokens, words, pattern):
+                self.setCategory(category)
+                return True
+        return False
+
+    def categoryByExt(self, torName):
+        return self._categoryByRules(torName, EXT_RULES)
 
     def categoryByKeyword(self, torName):
-        if re.search(r'(上下册|全.{1,4}册|精装版|修订版|第\d版|共\d本|文集|新修版|PDF版|课本|课件|出版社)',
-                     torName):
-            self.setCategory('eBook')
-        elif re.search(r'(\d+册|\d+期|\d+版|\d+本|\d+年|\d+月|系列|全集|作品集).?$',
-                       torName):
-            self.setCategory('eBook')
-        elif re.search(r'(\bConcert|演唱会|音乐会|\bLive[. ](At|in))\b', torName, re.A | re.I):
-            self.setCategory('MV')
-        elif re.search(r'\bBugs!.?\.mp4', torName, re.I):
-            self.setCategory('MV')
-        elif re.search(r'(\bVarious Artists|\bMQA\b|整轨|\b分轨|\b分軌|\b无损|\bLPCD|\bSACD|\bMP3|XRCD\d{1,3})',
-                       torName, re.A | re.I):
-            self.setCategory('Music')
-        elif re.search(r'(\b\d+ ?CD|(\[|\()\s*(16|24)\b|\-(44\.1|88.2|48|192)|24Bit|44\s*\]|FLAC.*(16|24|48|CUE|WEB|Album)|WAV.*CUE|CD.*FLAC|(\[|\()\s*FLAC)', torName, re.A | re.I):
-        # elif re.search(r'(\b\d+ ?CD|24\-|\-44\.1|24Bit|\[[\d\s]*44\s*\]|FLAC.*44|FLAC.*48|WAV.*CUE|FLAC.*CUE|\[.*FLAC\]|FLAC.+WEB\b|FLAC.*Album|CD[\s-]+FLAC|FLAC[\s-]+CD)', torName, re.A | re.I):
-            self.setCategory('Music')
-        elif re.search(r'^(Beethoven|Schubert)\s*[\-_]', torName, re.I):
-            self.setCategory('Music')
-        # elif re.search(r'(乐团|交响曲|协奏曲|奏鸣曲|[二三四]重奏|专辑\b)', torName):
-        #     self.setCategory('Music')
-        elif re.search(r'(\[BDMV\])', torName, re.I):
-            self.setCategory('MovieBDMV')
-        elif re.search(r'(\bThe.Movie.\d{4}|电影版)\b', torName, flags=re.A | re.I):
+        if self._categoryByRules(torName, KEYWORD_RULES):
+            return True
+        if self._matches(self._tokens(torName), *THE_MOVIE_RULE):
             if self.quality == 'WEBDL':
                 self.setCategory('MovieWebdl')
             else:
                 self.setCategory('MovieEncode')
-        else:
-            return False
-        return True
+            return True
+        return False
 
     def categoryTvByName(self, torName):
-        if re.search(r'(\b(S\d+)(E\d+)?|(Ep?\d+-Ep?\d+))\b', torName, flags=re.A | re.I):
-            self.setCategory('TV')
-        # elif re.search(r'\b(Season\s?\d+)\b', torName, flags=re.A | re.I):
-        #     self.setCategory('TV')
-        elif re.search(r'(第\s*(\d+)(-\d+)?季)\b', torName, flags=re.I):
+        tokens = self._tokens(torName)
+        if any(self._matches(tokens, words, pattern) for words, pattern in TV_RULES):
             self.setCategory('TV')
-        elif re.search(r'(\bS\d+(-S\d+))\b', torName, flags=re.A | re.I):
-            self.setCategory('TV')
-        elif re.search(r'\W[ES]\d+\W|EP\d+\W|\d+季|第\w{1,3}季\W', torName, re.A | re.I):
-            self.setCategory('TV')
-        # elif re.search(r'\bHDTV\b', torName):
-        #     self.setCategory('HDTV')
-        elif re.search(r'(Complete.+Web-?dl|Full.Season|The[\s\.]*(Complete\w*|Drama\w*|Animate\w*)?[\s\.]*Series|\d+集)', torName, re.A | re.I):
-            self.setCategory('TV')
-        else:
-            return False
-        return True
+            return True
+        return False
 
     def categoryMVAudioGroup(self, torName, group):
         if group in self.MV_GROUPS:
@@ -170,57 +223,32 @@ class TorCategory:
         return True
 
     def parseGroup(self, torName):
-        sstr = cutExt(torName)
-        match = re.search(r'[@\-￡]\s?(\w+)(?!.*[@\-￡].*)$', sstr, re.I)
-        if match:
-            groupName = match.group(1).strip()
-            # # TODO: BD-50_A_PORTRAIT_OF_SHUNKIN_1976_BC
-            if match.span(1)[0] < 4:
-                return None
-            if groupName.startswith('CMCT') and not groupName.startswith('CMCTV'):
-                groupName = 'CMCT'
-            return groupName
-
-        return None
+        return self._tokens(torName).group
 
     def getResolution(self, torName):
-        match = re.search(r'\b(4K|2160p|1080[pi]|720p|576p|480p)\b', torName, re.A | re.I)
-        if match:
-            r = match.group(0).strip().lower()
-            if r == '4k':
-                r = '2160p'
-            return r
-        else:
-            return ''
+        return self._tokens(torName).resolution
 
     def getSource(self, torName):
-        match = re.search(r'\b(Blu[\-\. ]?Ray|WEB[\-\. ]?DL|WEB|WEBRip|^BD([-. ]\d)*|\d+[. ](BD|BDRip)|BD[. ].Audio|MiniSD|MiniFHD)\b', torName, re.A | re.I)
-        if match:
-            # mediaSource = match.group(0).strip().lower()
-            if re.search(r'WEB', match.group(0), flags=re.A | re.I):
-                return 'WEBDL'
-            else:
-                return 'BLURAY'
-        else:
-            return ''
+        return self._tokens(torName).quality
 
     def categoryByQuality(self, torName):
+        tokens = self._tokens(torName)
         # 来源为原盘的
         if self.quality == 'BLURAY':
             # Remux, 压制 还是 原盘
-            if re.search(r'\WREMUX\W', torName, re.I):
+            if self._matches(tokens, *REMUX_RULE):
                 # if self.resolution == '2160p':
                 #     self.setCategory('Movie4K')
                 # else:
                 #     self.setCategory('MovieRemux')
                 self.setCategory('MovieRemux')
-            elif re.search(r'\b(x265|x264)\b', torName, re.I):
+            elif self._matches(tokens, *X26X_RULE):
                 # if self.resolution == '2160p':
                 #     self.setCategory('Movie4K')
                 # else:
                 #     self.setCategory('MovieEncode')
                 self.setCategory('MovieEncode')
-            elif re.search(r'\bMiniSD|MiniFHD\b', torName, re.I):
+            elif self._matches(tokens, *MINI_RULE):
                 self.setCategory('MovieEncode')
             else:
                 if self.resolution == '2160p':
@@ -235,9 +263,9 @@ class TorCategory:
             #     self.setCategory('MovieWebdl')
             self.setCategory('MovieWebdl')
         else:
-            if re.search(r'\WREMUX\W', torName, re.I):
+            if self._matches(tokens, *REMUX_RULE):
                 self.setCategory('MovieRemux')
-            elif re.search(r'\b(x265|x264)\b', torName, re.I):
+            elif self._matches(tokens, *X26X_RULE):
                 self.setCategory('MovieEncode')
             else:
                 return False
@@ -275,8 +303,6 @@ class TorCategory:
             return self.category, self.group
 
     def getSummary(self):
-        for cat in self.CATEGORIES.keys():
-            ic = CategoryItem(self.CATEGORIES[cat][0],
-                              self.CATEGORIES[cat][2])
-            self.CategorySummary.append(ic)
-        return self.CategorySummary
+        counts = category_stats.snapshot()['categories']
+        return [CategoryItem(self.CATEGORIES[cat][0], counts.get(cat, {}).get('count', 0))
+                for cat in self.CATEGORIES.keys()]
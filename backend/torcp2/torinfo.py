@@ -1,10 +1,25 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
-import os, re, sys
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+import copy, os, re, sys
 import tortitle
 import torcategory
+import tortoken
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class TMDbDetails:
+    """What TorrentInfo keeps of a TMDb details response, instead of the whole response."""
+    genres: Tuple[Tuple[int, str], ...] = ()    # (id, name)
+
+    @classmethod
+    def from_tmdb(cls, details):
+        return cls(genres=tuple((g['id'], g['name']) for g in getattr(details, 'genres', None) or ()))
+
+
+@dataclass(slots=True)
 class TorrentInfo:
     # 基本信息
     torname: str = ''             # 种子文件名
@@ -15,7 +30,7 @@ class TorrentInfo:
     year: Optional[int] = 0      # 年份
     # infolink
     infolink: str = ''
-    subtitle: str = ''
+    subtitle: str = ''              # 副标题信息
     # 技术参数
     resolution: Optional[str] = ''   # 分辨率 (1080p, 2160p等)
     source: Optional[str] = ''      # 来源 (WEB-DL, BluRay等)
@@ -23,7 +38,6 @@ class TorrentInfo:
     audio_codec: Optional[str] = ''  # 音频编码 (AAC, AC3等)
     # 发布信息
     group: Optional[str] = ''       # 发布组名
-    subtitle: str = ''              # 副标题信息
 
     # 查询得到的
     tmdb_cat: str = ''          # 类型 (movie, tv)
@@ -35,14 +49,14 @@ class TorrentInfo:
     poster_path: Optional[str] = ''        # 
     release_air_date: Optional[str] = ''     # 
 
-    genre_ids =[]
-    tmdbDetails = None
-    origin_country = ''
-    original_title = ''
-    overview = ''
-    vote_average = 0
-    production_countries = ''
-    confidence = 0
+    genre_ids: Sequence[int] = ()
+    tmdbDetails: Optional[TMDbDetails] = None    # 详情, 只保留用到的部分
+    origin_country: str = ''
+    original_title: str = ''
+    overview: str = ''
+    vote_average: float = 0
+    production_countries: str = ''
+    confidence: int = 0
 
     def __str__(self) -> str:
         """美化输出格式"""
@@ -74,23 +88,39 @@ def tryint(instr):
     return string_int
 
 
+MOVIE_CAT_RE = re.compile(r'(Movie)', re.I)
+TV_CAT_RE = re.compile(r'(TV)', re.I)
+
 def transFromCCFCat(cat):
-    if re.match(r'(Movie)', cat, re.I):
+    if MOVIE_CAT_RE.match(cat):
         return 'movie'
-    elif re.match(r'(TV)', cat, re.I):
+    elif TV_CAT_RE.match(cat):
         return 'tv'
     else:
         return cat
 
 
+def _parse_chunk(names):
+    # Runs in a worker process
+    return [TorrentParser.parse(name) for name in names]
+
+
 class TorrentParser:
     """种子文件名解析器"""
     @classmethod
     def parse(cls, torname: str) -> Optional[TorrentInfo]:
-        tc = torcategory.TorCategory(torname)
-        tt = tortitle.TorTitle(torname)
+        torinfo, category = cls._parse(torname)
+        torcategory.category_stats.record(category)
+        return torinfo
+
+    @classmethod
+    def _parse(cls, torname: str) -> Tuple[TorrentInfo, str]:
+        """The parse and the category it counts under in category_stats."""
+        tokens = tortoken.NameTokens(torname)
+        tc = torcategory.TorCategory(torname, tokens)
+        tt = tortitle.TorTitle(torname, tokens)
         title, parseYear, season, episode, cntitle = tt.title, tt.year, tt.season, tt.episode, tt.cntitle 
-        mediaSource, videoCodec, audioCodec = tt.parse_more(torname)
+        mediaSource, videoCodec, audioCodec = tokens.media_info
         year = tryint(parseYear)
 
         t= TorrentInfo()
@@ -107,5 +137,73 @@ class TorrentParser:
         t.audio_codec=audioCodec
         t.group=tc.group
         t.subtitle=cntitle
-        return t
-    
\ No newline at end of file
+        return t, tc.ccfcat
+    
+
+    # _parse() behind an LRU cache keyed by the raw name, see parse_cached()
+    _memo = None
+
+    @classmethod
+    def configure_cache(cls, maxsize: int = 4096):
+        """(Re)creates the parse cache with room for `maxsize` names, 0 disables it."""
+        cls._memo = lru_cache(maxsize=maxsize)(cls._parse)
+
+    @classmethod
+    def parse_cached(cls, torname: str) -> Optional[TorrentInfo]:
+        """
+        parse() for names seen before. The cached TorrentInfo never leaves
+        the cache: callers get a copy, which they are free to change.
+        Cache hits count in category_stats like parses do.
+        """
+        if cls._memo is None:
+            cls.configure_cache()
+        torinfo, category = cls._memo(torname)
+        torcategory.category_stats.record(category)
+        return copy.copy(torinfo)
+
+    @classmethod
+    def cache_stats(cls):
+        if cls._memo is None:
+            cls.configure_cache()
+        info = cls._memo.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': round(info.hits / lookups, 3) if lookups else 0.0,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+        }
+
+    @classmethod
+    def parse_many(cls, names: Iterable[str], workers: Optional[int] = None, chunksize: int = 1000) -> List[TorrentInfo]:
+        """Parses `names` on `workers` processes (default: one per CPU), results in input order."""
+        return list(cls.iparse_many(names, workers, chunksize))
+
+    @classmethod
+    def iparse_many(cls, names: Iterable[str], workers: Optional[int] = None, chunksize: int = 1000) -> Iterator[TorrentInfo]:
+        """
+        Streaming parse_many: yields results in input order as their chunk
+        finishes. `names` is read lazily and at most two chunks per worker are
+        in flight, so memory stays flat however long the input is.
+        With `workers` <= 1 everything runs in this process.
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            for name in names:
+                yield cls.parse(name)
+            return
+
+        names = iter(names)
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = deque()
+            while chunk := list(islice(names, chunksize)):
+                pending.append(pool.submit(_parse_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Also reached when the caller stops iterating early
+            pool.shutdown(cancel_futures=True)
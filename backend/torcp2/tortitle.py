@@ -1,5 +1,53 @@
 import re
 import os
+from tortoken import NameTokens
+
+# --- Rule tables, compiled once at import ---
+
+EXT_RE = re.compile(r'\.[0-9a-z]{2,5}$', re.I)
+DELIMITERS = str.maketrans({c: ' ' for c in '[].{}_,()'})
+CJK_RE = re.compile(r'[\u4e00-\u9fa5\u3041-\u30fc]')
+AKA_RE = re.compile(r'\s(/|AKA)\s', re.I)
+ZERODAY_RE = re.compile(r'^\w+.*\b(BluRay|Blu-?ray|720p|1080[pi]|[xh].?26\d|2160p|576i|WEB-DL|DVD|WEBRip|HDTV)\b.*', re.A | re.I)
+
+LEADING_TAG_RE = re.compile(r'^【.*】', re.I)
+YEAR_RE = re.compile(r'(19\d{2}|20\d{2})(?:\d{4})?\b')
+
+# Checked in order, the first match decides the type. Like the rules in
+# torcategory, a pattern only runs if one of its words (None: any name)
+# occurs in the name the title was cut from.
+TYPE_RULES = [(key, words, re.compile(pattern, re.I)) for key, words, pattern in [
+    ('s_e', None, r'\b(S\d+)(E\d+)\b'),
+    ('season_only', None, r'(S\d+([\-\+]S?\d+)?)\b(?!.*\bS\d+)'),
+    ('season_word', ('season',), r'\bSeason (\d+)\b'),
+    ('ep_only', None, r'\bEp?(\d+)(-Ep?\d+)?\b'),
+    ('cn_season', ('季',), r'第([一二三四五六七八九十]|\d+)季'),
+    ('cn_episode', ('集',), r'第([一二三四五六七八九十]+|\d+)集'),
+]]
+
+KEYWORD_TAGS = [
+    '2160p', '1080p', '720p', '480p', 'BluRay', r'(4K)?\s*Remux',
+    r'WEB-?(DL)?', r'(?<![a-z])4K', r'(?<=\w\s)BDMV',
+]
+KEYWORD_WORDS = ('2160p', '1080p', '720p', '480p', 'bluray', 'remux', 'web', '4k', 'bdmv')
+KEYWORD_TAIL_RE = re.compile(r'(' + '|'.join(KEYWORD_TAGS) + r')\b.*$', re.I)
+
+CN_EN_RE = re.compile(r"([一-鿆]+[\-0-9a-zA-Z]*)[ :：]+([^一-鿆]+\b)", re.I)
+CN_LEADING_ASCII_RE = re.compile(r'^([^一-鿆]*)[\s\(\[]+[一-鿆]', re.I)
+CN_FIRST_WORD_RE = re.compile(r'^([^ \-\(\[]*)')
+LETTER_RE = re.compile('[a-zA-Z]')
+
+POLISH_SEP_RE = re.compile(r'[\._\+]')
+POLISH_TAGS = [
+    'BTV', r'CCTV\s*\d+(HD|\+)?', 'HunanTV', r'Top\s*\d+',
+    r'\b\w+版', r'全\d+集', 'BDMV',
+    'COMPLETE', 'REPACK', 'PROPER', r'REMASTER\w*',
+    'iNTERNAL', 'LIMITED', 'EXTENDED', 'UNRATED',
+    "Director's Cut"
+]
+POLISH_WORDS = ('btv', 'cctv', 'hunantv', 'top', '版', '全', 'bdmv', 'complete', 'repack', 'proper',
+                'remaster', 'internal', 'limited', 'extended', 'unrated', "director's")
+POLISH_TAGS_RE = re.compile(r'\b(' + '|'.join(POLISH_TAGS) + r')\b', re.I)
 
 
 def cut_ext(tor_name):
@@ -7,7 +55,7 @@ def cut_ext(tor_name):
         return ''
     tortup = os.path.splitext(tor_name)
     # torext = tortup[1].lower()
-    if re.match(r'\.[0-9a-z]{2,5}$', tortup[1], flags=re.I):
+    if EXT_RE.match(tortup[1]):
     # mvext = ['.mkv', '.ts', '.m2ts', '.vob', '.mpg', '.mp4', '.3gp', '.mov', '.tp', '.zip', '.pdf', '.iso', '.ass', '.srt', '.7z', '.rar']
     # if torext.lower() in mvext:
         return tortup[0].strip()
@@ -15,10 +63,7 @@ def cut_ext(tor_name):
         return tor_name
 
 def delimer_to_space(sstr):
-    dilimers = ['[', ']', '.', '{', '}', '_', ',', '(', ')' ]
-    for dchar in dilimers:
-        sstr = sstr.replace(dchar, ' ')
-    return sstr
+    return sstr.translate(DELIMITERS)
 
 def hyphen_to_space(sstr):
     return sstr.replace('-', ' ')
@@ -29,10 +74,10 @@ def cutspan(sstr, ifrom, ito):
     return sstr
 
 def contains_cjk(str):
-    return re.search(r'[\u4e00-\u9fa5\u3041-\u30fc]', str)
+    return CJK_RE.search(str)
 
 def cut_aka(titlestr):
-    m = re.search(r'\s(/|AKA)\s', titlestr, re.I)
+    m = AKA_RE.search(titlestr)
     if m:
         titlestr = titlestr.split(m.group(0))[0]
     return titlestr.strip()
@@ -48,12 +93,13 @@ def tryint(str):
 
 def is_0day_name(itemstr):
     # CoComelon.S03.1080p.NF.WEB-DL.DDP2.0.H.264-NPMS
-    m = re.match(r'^\w+.*\b(BluRay|Blu-?ray|720p|1080[pi]|[xh].?26\d|2160p|576i|WEB-DL|DVD|WEBRip|HDTV)\b.*', itemstr, flags=re.A | re.I)
+    m = ZERODAY_RE.match(itemstr)
     return m
 
 class TorTitle:
-    def __init__(self, name):
+    def __init__(self, name, tokens=None):
         self.raw_name = name
+        self.tokens = tokens or NameTokens(name)
         self.title = name
         self.cntitle = ''
         self.year = ''
@@ -75,33 +121,16 @@ class TorTitle:
         # self._handle_special_cases()
 
     def parse_more(self, torName):
-        mediaSource, video, audio = '', '', ''
-        if m := re.search(r"(?<=(1080p|2160p)\s)(((\w+)\s+)?WEB(-DL)?)|\bWEB(-DL)?\b|\bHDTV\b|((UHD )?(BluRay|Blu-ray))", torName, re.I):
-            m0 = m[0].strip()
-            if re.search(r'WEB[-]?(DL)?', m0, re.I):
-                mediaSource = 'webdl'
-            elif re.search(r'BLURAY|BLU-RAY', m0, re.I):
-                if re.search(r'x26[45]', torName, re.I):
-                    mediaSource = 'encode'
-                elif re.search(r'remux', torName, re.I):
-                    mediaSource = 'remux'
-                else:
-                    mediaSource = 'bluray'
-            else:
-                mediaSource = m0
-        if m := re.search(r"AVC|HEVC(\s(DV|HDR))?|H\.?26[456](\s(HDR|DV))?|x26[45]\s?(10bit)?(HDR)?|DoVi (HDR(10)?)? (HEVC)?", torName, re.I):
-            video = m[0].strip()
-        if m := re.search(r"DTS-HD MA \d.\d|LPCM\s?\d.\d|TrueHD\s?\d\.\d( Atmos)?|DDP[\s\.]*\d\.\d( Atmos)?|(AAC|FLAC)(\s*\d\.\d)?( Atmos)?|DTS(?!-\w+)|DD\+? \d\.\d", torName, re.I):
-            audio = m[0].strip()
-        return mediaSource, video, audio
-    
+        tokens = self.tokens if torName == self.tokens.name else NameTokens(torName)
+        return tokens.media_info
+
     def _prepare_title(self):
         self.title = cut_ext(self.title)
-        self.title = re.sub(r'^【.*】', '', self.title, flags=re.I)
+        self.title = LEADING_TAG_RE.sub('', self.title)
         self.title = delimer_to_space(self.title)
 
     def _extract_year(self):
-        potential_years = re.findall(r'(19\d{2}|20\d{2})(?:\d{4})?\b', self.title)
+        potential_years = YEAR_RE.findall(self.title)
         if potential_years:
             self.year = potential_years[-1]
             self._year_pos = self.title.rfind(self.year)
@@ -109,17 +138,8 @@ class TorTitle:
             #     self.title = self.title.replace(self.year, ' ')
 
     def _extract_type(self):
-        patterns = {
-            's_e': r'\b(S\d+)(E\d+)\b',
-            'season_only': r'(S\d+([\-\+]S?\d+)?)\b(?!.*\bS\d+)',
-            'season_word': r'\bSeason (\d+)\b',
-            'ep_only': r'\bEp?(\d+)(-Ep?\d+)?\b',
-            'cn_season': r'第([一二三四五六七八九十]|\d+)季',
-            'cn_episode': r'第([一二三四五六七八九十]+|\d+)集'
-        }
-
-        for key, pattern in patterns.items():
-            match = re.search(pattern, self.title, flags=re.IGNORECASE)
+        for key, words, pattern in TYPE_RULES:
+            match = self.tokens.has(words) and pattern.search(self.title)
             if match:
                 self.type = 'tv'
                 if key == 's_e':
@@ -149,12 +169,8 @@ class TorTitle:
         self.title = self.title.strip()
 
     def _cut_s_keyword(self):
-        tags = [
-            '2160p', '1080p', '720p', '480p', 'BluRay', r'(4K)?\s*Remux', 
-            r'WEB-?(DL)?', r'(?<![a-z])4K', r'(?<=\w\s)BDMV',
-        ]
-        pattern = r'(' + '|'.join(tag for tag in tags) + r')\b.*$'
-        self.title = re.sub(pattern, '', self.title, flags=re.IGNORECASE)
+        if self.tokens.has(KEYWORD_WORDS):
+            self.title = KEYWORD_TAIL_RE.sub('', self.title)
         self.title = self.title.strip()
 
     def _extract_titles(self):
@@ -164,18 +180,18 @@ class TorTitle:
         self._cut_s_keyword()
 
         self.cntitle = ''
-        if contains_cjk(self.title):
+        if not self.tokens.ascii and contains_cjk(self.title):
             self.cntitle = self.title
-            if m := re.search(r"([一-鿆]+[\-0-9a-zA-Z]*)[ :：]+([^一-鿆]+\b)", self.title, flags=re.I):
+            if m := CN_EN_RE.search(self.title):
                 self.cntitle = self.cntitle[:m.span(1)[1]]
                 self.title = m.group(2)
 
             # 删去：汉字之前，有空格分隔的 ascii 字符串
-            if m1 := re.match(r'^([^一-鿆]*)[\s\(\[]+[一-鿆]', self.cntitle, flags=re.I):
+            if m1 := CN_LEADING_ASCII_RE.match(self.cntitle):
                 self.cntitle = self.cntitle.replace(m1.group(1), '').strip()
 
             # 取汉字串中第一个空格前部分
-            self.cntitle = re.match(r'^([^ \-\(\[]*)', self.cntitle).group()
+            self.cntitle = CN_FIRST_WORD_RE.match(self.cntitle).group()
 
         self.title = self.title.strip()
         if not self.title:
@@ -183,23 +199,16 @@ class TorTitle:
         return
 
     def _check_title(self):
-        m1 = re.search('[a-zA-Z]', self.title)
+        m1 = LETTER_RE.search(self.title)
         if len(self.title) > 2 and m1:
             return True
         else:
             return False
 
     def _polish_title(self):
-        self.title = re.sub(r'[\._\+]', ' ', self.title)
-        tags = [
-            'BTV', r'CCTV\s*\d+(HD|\+)?', 'HunanTV', r'Top\s*\d+',
-            r'\b\w+版', r'全\d+集', 'BDMV',
-            'COMPLETE', 'REPACK', 'PROPER', 'REMASTER\w*',
-            'iNTERNAL', 'LIMITED', 'EXTENDED', 'UNRATED', 
-            "Director's Cut"
-        ]
-        pattern = r'\b(' + '|'.join(tag for tag in tags) + r')\b'
-        self.title = re.sub(pattern, '', self.title, flags=re.IGNORECASE)
+        self.title = POLISH_SEP_RE.sub(' ', self.title)
+        if self.tokens.has(POLISH_WORDS):
+            self.title = POLISH_TAGS_RE.sub('', self.title)
         self.title = self.title.strip()
 
         self.title = hyphen_to_space(self.title)
@@ -0,0 +1,123 @@
+import os
+import re
+from functools import cached_property
+
+# Characters that re.IGNORECASE matches to an ASCII letter but str.lower() does not map onto it
+FOLD_TABLE = str.maketrans({'ı': 'i', 'İ': 'i', 'ſ': 's', 'K': 'k'})
+
+EXT_RE = re.compile(r'\.[0-9a-z]{2,8}$', re.I)
+GROUP_RE = re.compile(r'[@\-￡]\s?(\w+)(?!.*[@\-￡].*)$', re.I)
+RESOLUTION_RE = re.compile(r'\b(4K|2160p|1080[pi]|720p|576p|480p)\b', re.A | re.I)
+QUALITY_RE = re.compile(r'\b(Blu[\-\. ]?Ray|WEB[\-\. ]?DL|WEB|WEBRip|^BD([-. ]\d)*|\d+[. ](BD|BDRip)|BD[. ].Audio|MiniSD|MiniFHD)\b', re.A | re.I)
+WEB_RE = re.compile(r'WEB', re.A | re.I)
+
+MEDIA_SOURCE_RE = re.compile(r"(?<=(1080p|2160p)\s)(((\w+)\s+)?WEB(-DL)?)|\bWEB(-DL)?\b|\bHDTV\b|((UHD )?(BluRay|Blu-ray))", re.I)
+WEBDL_RE = re.compile(r'WEB[-]?(DL)?', re.I)
+BLURAY_RE = re.compile(r'BLURAY|BLU-RAY', re.I)
+X26X_RE = re.compile(r'x26[45]', re.I)
+REMUX_RE = re.compile(r'remux', re.I)
+VIDEO_RE = re.compile(r"AVC|HEVC(\s(DV|HDR))?|H\.?26[456](\s(HDR|DV))?|x26[45]\s?(10bit)?(HDR)?|DoVi (HDR(10)?)? (HEVC)?", re.I)
+AUDIO_RE = re.compile(r"DTS-HD MA \d.\d|LPCM\s?\d.\d|TrueHD\s?\d\.\d( Atmos)?|DDP[\s\.]*\d\.\d( Atmos)?|(AAC|FLAC)(\s*\d\.\d)?( Atmos)?|DTS(?!-\w+)|DD\+? \d\.\d", re.I)
+
+# Lower-case literals at least one of which every match of the pattern contains
+RESOLUTION_WORDS = ('4k', '2160p', '1080', '720p', '576p', '480p')
+QUALITY_WORDS = ('blu', 'web', 'bd', 'mini')
+MEDIA_SOURCE_WORDS = ('web', 'hdtv', 'blu')
+VIDEO_WORDS = ('avc', 'hevc', 'h26', 'h.26', 'x26', 'dovi')
+AUDIO_WORDS = ('dts', 'lpcm', 'truehd', 'dd', 'aac', 'flac')
+
+
+class NameTokens:
+    """
+    A torrent name folded once and shared by TorCategory, TorTitle and TorrentParser.
+
+    This is not a lexer: there is no typed token stream, and each parser
+    still runs its own regexes. What is shared is the folded name, which
+    `has()` uses as a word gate so a pattern is skipped when the literals
+    it needs are missing, and the extension split, release group,
+    resolution, source and codecs, each worked out once, on first use.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.ascii = name.isascii()
+        # Lower-cased the way re.IGNORECASE compares ASCII letters
+        self.folded = name.lower() if self.ascii else name.translate(FOLD_TABLE).lower()
+
+    def has(self, words):
+        """False if none of `words` occurs in the name; None means "can't tell"."""
+        if words is None:
+            return True
+        return any(map(self.folded.__contains__, words))
+
+    @cached_property
+    def splitext(self):
+        return os.path.splitext(self.name)
+
+    @cached_property
+    def stem(self):
+        """The name without a 2 to 8 character extension."""
+        if not self.name:
+            return ''
+        root, ext = self.splitext
+        return root.strip() if EXT_RE.match(ext.lower()) else self.name
+
+    @cached_property
+    def group(self):
+        sstr = self.stem
+        if not any(c in sstr for c in '@-￡'):
+            return None
+        match = GROUP_RE.search(sstr)
+        if match:
+            groupName = match.group(1).strip()
+            # # TODO: BD-50_A_PORTRAIT_OF_SHUNKIN_1976_BC
+            if match.span(1)[0] < 4:
+                return None
+            if groupName.startswith('CMCT') and not groupName.startswith('CMCTV'):
+                groupName = 'CMCT'
+            return groupName
+        return None
+
+    @cached_property
+    def resolution(self):
+        match = self.has(RESOLUTION_WORDS) and RESOLUTION_RE.search(self.name)
+        if match:
+            r = match.group(0).strip().lower()
+            if r == '4k':
+                r = '2160p'
+            return r
+        return ''
+
+    @cached_property
+    def quality(self):
+        """BLURAY, WEBDL or '', as TorCategory uses it."""
+        match = self.has(QUALITY_WORDS) and QUALITY_RE.search(self.name)
+        if match:
+            if WEB_RE.search(match.group(0)):
+                return 'WEBDL'
+            return 'BLURAY'
+        return ''
+
+    @cached_property
+    def media_info(self):
+        """(source, video codec, audio codec), as TorTitle.parse_more returns them."""
+        torName = self.name
+        mediaSource, video, audio = '', '', ''
+        if self.has(MEDIA_SOURCE_WORDS) and (m := MEDIA_SOURCE_RE.search(torName)):
+            m0 = m[0].strip()
+            if WEBDL_RE.search(m0):
+                mediaSource = 'webdl'
+            elif BLURAY_RE.search(m0):
+                if X26X_RE.search(torName):
+                    mediaSource = 'encode'
+                elif REMUX_RE.search(torName):
+                    mediaSource = 'remux'
+                else:
+                    mediaSource = 'bluray'
+            else:
+                mediaSource = m0
+        if self.has(VIDEO_WORDS) and (m := VIDEO_RE.search(torName)):
+            video = m[0].strip()
+        if self.has(AUDIO_WORDS) and (m := AUDIO_RE.search(torName)):
+            audio = m[0].strip()
+        return mediaSource, video, audio
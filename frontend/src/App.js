@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import axios from 'axios';
 import 'bootstrap/dist/css/bootstrap.min.css';
 import { Button, Container, Row, Col, InputGroup, FormControl, Alert, Pagination } from 'react-bootstrap';
@@ -119,6 +119,8 @@ function App() {
   // Pagination State
   const [currentPage, setCurrentPage] = useState(1);
   const [totalGroups, setTotalGroups] = useState(0);
+  // page number -> `after` cursor that starts it, learnt from the page before
+  const pageCursors = useRef({});
 
   // Modal State
   const [showModal, setShowModal] = useState(false);
@@ -148,11 +150,17 @@ function App() {
 
   const fetchMedia = (page) => {
     setLoading(true);
+    // Pages reached with Next use the cursor, jumps fall back to skip
+    const cursor = pageCursors.current[page];
     const skip = (page - 1) * GROUPS_PER_PAGE;
-    axios.get(`/api/media/?skip=${skip}&limit=${GROUPS_PER_PAGE}`)
+    const params = cursor ? `after=${encodeURIComponent(cursor)}` : `skip=${skip}`;
+    axios.get(`/api/media/?${params}&limit=${GROUPS_PER_PAGE}`)
       .then(response => {
         setMediaList(response.data.items);
         setTotalGroups(response.data.total);
+        if (response.data.next_cursor) {
+          pageCursors.current[page + 1] = response.data.next_cursor;
+        }
         setLoading(false);
       })
       .catch(error => {
@@ -166,9 +174,15 @@ function App() {
     fetchMedia(currentPage);
   }, [currentPage]);
 
+  // After a write or a search pages start at other rows, the cursors learnt so far are stale
+  const reloadMedia = (page) => {
+    pageCursors.current = {};
+    fetchMedia(page);
+  };
+
   const handleSearch = () => {
     if (!searchQuery.trim()) {
-      fetchMedia(1); // Reload the first page if search is cleared
+      reloadMedia(1); // Reload the first page if search is cleared
       return;
     }
     setLoading(true);
@@ -176,9 +190,10 @@ function App() {
     axios.post(`/api/query`, { torname: searchQuery })
       .then(response => {
         if (currentPage !== 1) {
+            pageCursors.current = {};
             setCurrentPage(1);
         } else {
-            fetchMedia(1);
+            reloadMedia(1);
         }
       })
       .catch(err => {
@@ -214,7 +229,7 @@ function App() {
     request
       .then(() => {
         handleCloseModal();
-        fetchMedia(currentPage);
+        reloadMedia(currentPage);
       })
       .catch(err => {
         setError(`Failed to save media: ${err.response?.data?.detail || err.message}`);
@@ -224,7 +239,7 @@ function App() {
   const handleDeleteMedia = (mediaId) => {
     if (window.confirm('Are you sure you want to delete this media item?')) {
       axios.delete(`/api/media/${mediaId}`)
-        .then(() => fetchMedia(currentPage))
+        .then(() => reloadMedia(currentPage))
         .catch(err => {
           setError(`Failed to delete media: ${err.response?.data?.detail || err.message}`);
         });